@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template_string, Response
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import cv2
 import numpy as np
 import json
@@ -7,15 +8,217 @@ from PIL import Image
 import io
 import base64
 import os
+import time
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, FIRST_COMPLETED, wait
 import torch
 from transformers import pipeline, AutoImageProcessor, AutoModelForImageClassification
 import pytesseract
 import requests
 from torchvision import transforms
+from utils.batching import BatchingQueue
+from utils.model_manager import ModelManager
+from utils.result_cache import ResultCache, content_key
+from utils.preprocessing import ScanContext, ANALYSIS_SIZE, WORKSPACES, pipeline_for
+from utils.near_duplicates import NearDuplicateIndex, perceptual_hashes, pixel_thumbnail
+from utils.scan_router import ScanTypeRouter
+from utils.decoding import decode_image
+from utils.uploads import SpooledRequest, spool_stream, upload_storage, upload_view
+from utils.dicom import DICOM_UNAVAILABLE, dicom_available, is_dicom, decode_dicom, open_dicom_frames
+from utils.volume import (load_npy_volume, iter_array_chunks, iter_frame_chunks, gray_stack,
+                          resize_stack, mri_slice_metrics, large_contour_counts, robust_outliers)
+from utils.video import HEART_REGION, WALL_REGION, is_video, open_video_frames, heart_frame_metrics
+from utils.onnx_backend import parse_backends, build_onnx_classifier
+from utils.shared_weights import map_shared_weights, process_memory
+from utils.metrics import (stage_timer, render_metrics, REQUESTS, CACHE_LOOKUPS, ROUTER_DECISIONS, TIER_REQUESTS,
+                           TIER_CHANGES, TIER_LEVEL, UPLOAD_BYTES, REQUEST_MEMORY, INFLIGHT_MEMORY, BATCH_SIZE,
+                           JOB_SECONDS, JOB_QUEUE_DEPTH, JOB_WORKERS_BUSY, SCHEDULER_WAIT, SCHEDULER_REJECTED,
+                           SCHEDULER_QUEUED, SCHEDULER_RUNNING)
+from utils.jobs import JobQueue, JobQueueFull
+from utils.scheduler import PriorityScheduler, SchedulerBusy, parse_class_map
+from utils.tiling import TILED_SCAN_TYPES, tile_grid, aggregate_tiles
+from utils.tiers import TIER_CV, TierController, expand_tier_specs, tier_key, tier_ladder
 
 app = Flask(__name__)
 CORS(app)
 
+# Micro-batching knobs for the HF pipelines (latency vs. throughput)
+BATCH_WINDOW_MS = float(os.getenv('SCANS_BATCH_WINDOW_MS', '20'))
+BATCH_MAX_SIZE = int(os.getenv('SCANS_BATCH_MAX_SIZE', '8'))
+
+# Models load lazily on first use; cold ones are evicted past the RAM budget (0 = unlimited)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv('SCANS_MODEL_MEMORY_BUDGET_MB', '0'))
+PRELOAD_MODELS = [t for t in os.getenv('SCANS_PRELOAD_MODELS', '').split(',') if t]
+
+# Shared pool for work that runs alongside the main analysis (OCR validation, ...)
+WORKER_THREADS = int(os.getenv('SCANS_WORKER_THREADS', str(os.cpu_count() or 4)))
+
+# OpenCV CLAHE objects and scratch buffers are checked out per analysis; idle sets kept
+CV_WORKSPACES = int(os.getenv('SCANS_CV_WORKSPACES', '32'))
+
+# OCR validation runs on a downscaled copy and is skipped past the time budget (0 = wait)
+OCR_MAX_SIDE = int(os.getenv('SCANS_OCR_MAX_SIDE', '1600'))
+OCR_TIMEOUT_S = float(os.getenv('SCANS_OCR_TIMEOUT_S', '2.0'))
+
+# scan_type=auto: nearest-centroid router on cheap image features (heuristics without a
+# model file). SCANS_SCAN_VALIDATOR=router also replaces OCR validation for explicit types
+ROUTER_MODEL_PATH = os.getenv('SCANS_ROUTER_MODEL', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'router_centroids.json'))
+ROUTER_MIN_CONFIDENCE = float(os.getenv('SCANS_ROUTER_MIN_CONFIDENCE', '0.6'))
+SCAN_VALIDATOR = os.getenv('SCANS_SCAN_VALIDATOR', 'ocr')
+
+# /analyze/batch: worker pool size and per-request file limit. Zip members are checked
+# against their declared uncompressed size before anything is inflated (zip bombs)
+BATCH_WORKERS = int(os.getenv('SCANS_BATCH_WORKERS', '4'))
+BATCH_MAX_FILES = int(os.getenv('SCANS_BATCH_MAX_FILES', '500'))
+BATCH_MAX_MEMBER_MB = float(os.getenv('SCANS_BATCH_MAX_MEMBER_MB', '64'))  # per uncompressed zip member
+BATCH_MAX_UNZIPPED_MB = float(os.getenv('SCANS_BATCH_MAX_UNZIPPED_MB', '2048'))  # per request, all members
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp', '.dcm', '.mp4', '.avi', '.mov')
+
+# /jobs: async analysis workers, queue bound, how long finished jobs stay pollable
+JOB_WORKERS = int(os.getenv('SCANS_JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.getenv('SCANS_JOB_QUEUE_SIZE', '100'))
+JOB_RESULT_TTL_S = float(os.getenv('SCANS_JOB_RESULT_TTL_S', '3600'))
+JOB_WEBHOOK_TIMEOUT_S = float(os.getenv('SCANS_JOB_WEBHOOK_TIMEOUT_S', '5'))
+# sqlite file holding job states for every process (serve.py sets one up for its workers)
+JOB_DB_PATH = os.getenv('SCANS_JOB_DB', '')
+# Webhooks may only target public addresses; these hosts are allowed regardless (internal receivers)
+JOB_WEBHOOK_ALLOW_HOSTS = [host.strip() for host in os.getenv('SCANS_JOB_WEBHOOK_ALLOW_HOSTS', '').split(',') if host.strip()]
+
+# Priority scheduler in front of the analyzers: SCHEDULER_SLOTS analyses at once (0 = off),
+# each class (urgent > normal > bulk) capped at its concurrency with a bounded waiting queue.
+# A full queue or a wait past SCHEDULER_MAX_WAIT_S is answered 429 with Retry-After.
+# The class comes from the X-Scan-Priority header, else from the scan type
+SCHEDULER_SLOTS = int(os.getenv('SCANS_SCHEDULER_SLOTS', str(WORKER_THREADS)))
+PRIORITY_SCAN_TYPES = parse_class_map(os.getenv('SCANS_PRIORITY_SCAN_TYPES', 'chest:urgent,xray:urgent,skin:bulk'))
+PRIORITY_CONCURRENCY = {
+    'bulk': max(1, SCHEDULER_SLOTS // 2),  # bulk never takes every slot from urgent work
+    **parse_class_map(os.getenv('SCANS_PRIORITY_CONCURRENCY', ''), int)
+}
+PRIORITY_QUEUE = parse_class_map(os.getenv('SCANS_PRIORITY_QUEUE', 'urgent:64,normal:32,bulk:16'), int)
+SCHEDULER_MAX_WAIT_S = float(os.getenv('SCANS_SCHEDULER_MAX_WAIT_S', '30'))
+
+# Uploads: request bodies over MAX_UPLOAD_MB are rejected from Content-Length before any
+# of the body is read; files above UPLOAD_SPOOL_MB roll over to a temp file and are memory-mapped
+MAX_UPLOAD_MB = float(os.getenv('SCANS_MAX_UPLOAD_MB', '512'))
+UPLOAD_SPOOL_MB = float(os.getenv('SCANS_UPLOAD_SPOOL_MB', '1'))
+UPLOAD_TMP_DIR = os.getenv('SCANS_UPLOAD_TMP_DIR') or None
+SpooledRequest.spool_max_size = int(UPLOAD_SPOOL_MB * 1024 * 1024)
+SpooledRequest.spool_dir = UPLOAD_TMP_DIR
+app.request_class = SpooledRequest
+app.config['MAX_CONTENT_LENGTH'] = int(MAX_UPLOAD_MB * 1024 * 1024) or None
+
+# Oversized uploads are decoded at 1/2, 1/4 or 1/8 scale as long as the short side
+# stays >= the largest model input and the long side still covers OCR
+DECODE_MIN_SIDE = int(os.getenv('SCANS_DECODE_MIN_SIDE', '384'))
+
+# Per-scan-type inference backend: torch (default), onnx or onnx-int8
+# e.g. SCANS_INFERENCE_BACKENDS=skin:onnx-int8,chest:onnx
+INFERENCE_BACKENDS = parse_backends(os.getenv('SCANS_INFERENCE_BACKENDS', ''))
+ONNX_CACHE_DIR = os.getenv('SCANS_ONNX_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'onnx_cache'))
+ONNX_PARITY_TOLERANCE = float(os.getenv('SCANS_ONNX_PARITY_TOLERANCE', '0.1'))
+
+# torch weights are saved once under WEIGHTS_CACHE_DIR and memory-mapped back, so every
+# worker process maps the same page-cache pages instead of holding a private copy
+SHARED_WEIGHTS = os.getenv('SCANS_SHARED_WEIGHTS', '1').lower() not in ('0', 'false', 'no')
+WEIGHTS_CACHE_DIR = os.getenv('SCANS_WEIGHTS_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weights_cache'))
+
+# /analyze/volume: MRI slice stacks (.npy or multi-frame DICOM) processed in chunks;
+# a volume-level finding needs at least VOLUME_MIN_SLICES slices
+VOLUME_MAX_SLICES = int(os.getenv('SCANS_VOLUME_MAX_SLICES', '512'))
+VOLUME_CHUNK = int(os.getenv('SCANS_VOLUME_CHUNK', '64'))
+VOLUME_MIN_SLICES = int(os.getenv('SCANS_VOLUME_MIN_SLICES', '2'))
+
+# Heart cine / echo clips (MP4, AVI, ...): every VIDEO_FRAME_STRIDE-th frame is analyzed,
+# at most VIDEO_MAX_FRAMES, VIDEO_CHUNK frames at a time; a clip-level finding needs
+# VIDEO_MIN_FRAMES frames
+VIDEO_FRAME_STRIDE = int(os.getenv('SCANS_VIDEO_FRAME_STRIDE', '2'))
+VIDEO_MAX_FRAMES = int(os.getenv('SCANS_VIDEO_MAX_FRAMES', '300'))
+VIDEO_CHUNK = int(os.getenv('SCANS_VIDEO_CHUNK', '32'))
+VIDEO_MIN_FRAMES = int(os.getenv('SCANS_VIDEO_MIN_FRAMES', '2'))
+
+# Tiled mode for skin/xray: analyzers run on overlapping full-resolution tiles.
+# Requested per call with tiled=1, or on by default for SCANS_TILED_SCAN_TYPES
+TILE_SIZE = int(os.getenv('SCANS_TILE_SIZE', '512'))
+TILE_OVERLAP = float(os.getenv('SCANS_TILE_OVERLAP', '0.25'))
+TILE_MAX_TILES = int(os.getenv('SCANS_TILE_MAX_TILES', '16'))
+# Tile workers mostly wait on the batching queue; one full batch by default
+TILE_WORKERS = int(os.getenv('SCANS_TILE_WORKERS', str(BATCH_MAX_SIZE)))
+TILE_MIN_STD = float(os.getenv('SCANS_TILE_MIN_STD', '4'))  # blank background tiles are skipped
+TILED_BY_DEFAULT = [t for t in os.getenv('SCANS_TILED_SCAN_TYPES', '').split(',') if t in TILED_SCAN_TYPES]
+
+# Load-adaptive model tiers (e.g. skin: large -> base -> cv): a scan type steps down one
+# tier when its queue depth (in flight + waiting in the scheduler for its priority class)
+# reaches TIER_QUEUE_HIGH or its p95 reaches TIER_P95_HIGH_MS, and back up after
+# TIER_COOLDOWN_S under both low marks. Degraded results are not cached.
+# The scheduler caps in-flight analyses at SCHEDULER_SLOTS, so the default marks follow it
+TIERING_ENABLED = os.getenv('SCANS_TIERING', '1').lower() not in ('0', 'false', 'no')
+TIER_QUEUE_HIGH = int(os.getenv('SCANS_TIER_QUEUE_HIGH', str(2 * SCHEDULER_SLOTS if SCHEDULER_SLOTS else 4 * BATCH_MAX_SIZE)))
+TIER_QUEUE_LOW = int(os.getenv('SCANS_TIER_QUEUE_LOW', str(max(1, SCHEDULER_SLOTS // 2) if SCHEDULER_SLOTS else BATCH_MAX_SIZE)))
+TIER_P95_HIGH_MS = float(os.getenv('SCANS_TIER_P95_HIGH_MS', '5000'))
+TIER_P95_LOW_MS = float(os.getenv('SCANS_TIER_P95_LOW_MS', '1500'))
+TIER_WINDOW_S = float(os.getenv('SCANS_TIER_WINDOW_S', '30'))
+TIER_COOLDOWN_S = float(os.getenv('SCANS_TIER_COOLDOWN_S', '30'))
+
+# Warm-up at startup: /ready returns 503 until it has finished
+WARMUP_ENABLED = os.getenv('SCANS_WARMUP', '1').lower() not in ('0', 'false', 'no')
+# Set by serve.py: the pre-fork parent only loads models, each worker warms up after fork
+PREFORK_PARENT = os.getenv('SCANS_PREFORK_PARENT') == '1'
+WARMUP_SIZES = [int(size) for size in os.getenv('SCANS_WARMUP_SIZES', '224,512,1024').split(',') if size]
+# Models warm-up loads before readiness: 'primary' (every scan type's full model), 'none'
+# (only warm what is already resident) or a list; /ready stays 503 until all are resident
+WARMUP_MODELS = os.getenv('SCANS_WARMUP_MODELS', 'primary')
+WARMUP_RETRY_S = float(os.getenv('SCANS_WARMUP_RETRY_S', '30'))
+
+# Near-duplicate uploads (re-encoded, resized, screenshotted) matched by perceptual hash.
+# reference: re-analyze and link the earlier result; return: serve the earlier result, but
+# only for a much closer match that also agrees pixel by pixel (a small new lesion can stay
+# within the reference radius, so those thresholds must never decide a served result)
+NEAR_DUP_MAX_DISTANCE = int(os.getenv('SCANS_NEAR_DUP_MAX_DISTANCE', '6'))  # pHash bits, 0 = off
+NEAR_DUP_MAX_DHASH_DISTANCE = int(os.getenv('SCANS_NEAR_DUP_MAX_DHASH_DISTANCE', '10'))
+NEAR_DUP_MAX_ENTRIES = int(os.getenv('SCANS_NEAR_DUP_MAX_ENTRIES', '10000'))
+NEAR_DUP_MODE = os.getenv('SCANS_NEAR_DUP_MODE', 'reference')
+NEAR_DUP_RETURN_MAX_DISTANCE = int(os.getenv('SCANS_NEAR_DUP_RETURN_MAX_DISTANCE', '2'))  # pHash bits
+NEAR_DUP_RETURN_MAX_DHASH_DISTANCE = int(os.getenv('SCANS_NEAR_DUP_RETURN_MAX_DHASH_DISTANCE', '4'))
+NEAR_DUP_RETURN_MAX_MSE = float(os.getenv('SCANS_NEAR_DUP_RETURN_MAX_MSE', '4'))  # on 32x32 gray thumbnails
+
+# Bump when the CV heuristics change so cached results are not reused
+ANALYZER_VERSION = '2'
+
+# Result cache: in-memory LRU plus optional sqlite tier
+CACHE_MAX_ENTRIES = int(os.getenv('SCANS_CACHE_MAX_ENTRIES', '512'))
+CACHE_DB_PATH = os.getenv('SCANS_CACHE_DB', '')
+CACHE_TTL_S = float(os.getenv('SCANS_CACHE_TTL_S', '86400'))
+
+MODEL_SPECS = {
+    # Working Chest X-Ray Pneumonia Detection
+    'chest': {
+        'candidates': ["Borjamg/pneumonia_model"],
+        'description': 'Borjamg/pneumonia_model (Pneumonia Detection)',
+        'fallback': 'Advanced Computer Vision'
+    },
+    # Working Skin Lesion Classification (12 lesion types); ViT-base HAM10000 under load
+    'skin': {
+        'candidates': ["actavkid/vit-large-patch32-384-finetuned-skin-lesion-classification"],
+        'tier': 'large',
+        'lighter_tiers': [('base', ["Anwarkh1/Skin_Cancer-Image_Classification"])],
+        'description': 'ViT Skin Lesion Classifier (12 types)',
+        'fallback': 'ABCDE Analysis + Computer Vision'
+    },
+    # Alternative brain models, tried in order
+    'mri': {
+        'candidates': [
+            "microsoft/resnet-50",  # General vision model for brain analysis
+            "google/vit-base-patch16-224"  # Vision transformer
+        ],
+        'description': 'Vision Transformer (Brain Analysis)',
+        'fallback': 'Advanced Computer Vision'
+    }
+}
+
+# Model manager / batcher entries: every scan type plus its lighter tiers ('skin@base')
+MODEL_TIER_SPECS = expand_tier_specs(MODEL_SPECS)
+
 class ScansAnalyzer:
     def __init__(self):
         self.scan_types = {
@@ -27,78 +230,368 @@ class ScansAnalyzer:
             'skin': 'Skin Analysis',
             'liver': 'Liver Scan'
         }
-        self.models = {}
-        self.load_models()
+        self.backend_reports = {}
+        self.weight_reports = {}
+        self.prefork_parent = PREFORK_PARENT
+        self.model_manager = ModelManager(
+            MODEL_TIER_SPECS,
+            self.load_model,
+            memory_budget_mb=MODEL_MEMORY_BUDGET_MB
+        )
+        self.batchers = {}
+        WORKSPACES.max_idle = CV_WORKSPACES
+        self.scan_router = ScanTypeRouter(ROUTER_MODEL_PATH)
+        self.init_workers()
+        if PRELOAD_MODELS:
+            self.load_models(PRELOAD_MODELS)
+        
+        self.ready = threading.Event()
+        self.warmup_report = {'state': 'pending'}
     
-    def load_models(self):
-        """Load working Hugging Face models"""
-        print("\n🤖 Loading AI Models for Medical Scan Analysis...")
-        print("=" * 60)
-        
-        try:
-            # Working Chest X-Ray Pneumonia Detection
-            try:
-                print("👨‍⚕️ Loading Chest X-Ray Pneumonia Detection Model...")
-                self.models['chest'] = pipeline(
-                    "image-classification",
-                    model="Borjamg/pneumonia_model",
-                    device=-1
-                )
-                print("✅ Chest X-Ray Model: LOADED (Pneumonia Detection)")
-            except Exception as e:
-                print(f"❌ Chest X-Ray Model: FAILED - {e}")
-            
-            # Working Skin Lesion Classification
+    def init_workers(self):
+        """Thread pools, batching queues, job workers and the result cache (per process)"""
+        self.executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix='scans-worker')
+        # Separate pool so batch items never wait behind their own OCR futures
+        self.batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='scans-batch')
+        # Tiles get their own pool: they are submitted from batch and job workers
+        self.tile_executor = ThreadPoolExecutor(max_workers=TILE_WORKERS, thread_name_prefix='scans-tile')
+        # Lighter tier models load one at a time, off the OCR pool they would otherwise hold up
+        self.tier_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scans-tier-loader')
+        self.init_batchers()
+        self.jobs = JobQueue(
+            self.run_job,
+            workers=JOB_WORKERS,
+            max_queue=JOB_QUEUE_SIZE,
+            result_ttl_s=JOB_RESULT_TTL_S,
+            webhook_timeout_s=JOB_WEBHOOK_TIMEOUT_S,
+            webhook_allow_hosts=JOB_WEBHOOK_ALLOW_HOSTS,
+            db_path=JOB_DB_PATH or None,
+            on_phase=lambda phase, seconds: JOB_SECONDS.labels(phase=phase).observe(seconds),
+            on_state=lambda depth, busy: (JOB_QUEUE_DEPTH.set(depth), JOB_WORKERS_BUSY.set(busy))
+        )  # its worker threads start with the first job, so never in the pre-fork parent
+        self.scheduler = PriorityScheduler(
+            SCHEDULER_SLOTS,
+            concurrency=PRIORITY_CONCURRENCY,
+            queue_limits=PRIORITY_QUEUE,
+            scan_type_classes=PRIORITY_SCAN_TYPES,
+            max_wait_s=SCHEDULER_MAX_WAIT_S,
+            on_wait=lambda priority, seconds: SCHEDULER_WAIT.labels(priority=priority).observe(seconds),
+            on_state=lambda priority, queued, running: (
+                SCHEDULER_QUEUED.labels(priority=priority).set(queued),
+                SCHEDULER_RUNNING.labels(priority=priority).set(running)
+            ),
+            on_reject=lambda priority, reason: SCHEDULER_REJECTED.labels(priority=priority, reason=reason).inc()
+        )
+        self.result_cache = ResultCache(
+            max_entries=CACHE_MAX_ENTRIES,
+            db_path=CACHE_DB_PATH or None,
+            ttl_s=CACHE_TTL_S
+        )
+        self.near_duplicates = NearDuplicateIndex(
+            max_distance=NEAR_DUP_MAX_DISTANCE,
+            max_dhash_distance=NEAR_DUP_MAX_DHASH_DISTANCE,
+            max_entries=NEAR_DUP_MAX_ENTRIES
+        )
+        self.tiers = TierController(
+            {scan_type: tier_ladder(spec) for scan_type, spec in MODEL_SPECS.items()},
+            queue_high=TIER_QUEUE_HIGH,
+            queue_low=TIER_QUEUE_LOW,
+            p95_high_ms=TIER_P95_HIGH_MS,
+            p95_low_ms=TIER_P95_LOW_MS,
+            window_s=TIER_WINDOW_S,
+            cooldown_s=TIER_COOLDOWN_S,
+            enabled=TIERING_ENABLED,
+            on_change=lambda scan_type, level, direction: (
+                TIER_LEVEL.labels(scan_type=scan_type).set(level),
+                TIER_CHANGES.labels(scan_type=scan_type, direction=direction).inc()
+            ),
+            backlog=lambda scan_type: self.scheduler.queued_for(scan_type)
+        )
+        self.tier_loads = set()  # lighter tier models being loaded in the background
+    
+    def reset_after_fork(self, torch_threads=None):
+        """Rebuild per-process state in a serve.py worker: threads, ORT thread pools
+        and sqlite connections do not survive fork(), model weights stay shared"""
+        if torch_threads:
+            torch.set_num_threads(torch_threads)
+        self.init_workers()
+        self.prefork_parent = False
+        for scan_type, model in self.model_manager.models().items():
+            if self.backend_reports.get(scan_type, {}).get('deferred'):
+                model_name = self.model_manager.model_name(scan_type)
+                self.model_manager.replace(scan_type, self.build_backend(scan_type, model_name, model))
+            elif hasattr(model, 'reset_after_fork'):
+                model.reset_after_fork(torch_threads)
+        self.ready = threading.Event()
+        self.warmup_report = {'state': 'pending'}
+    
+    def start_warm_up(self):
+        """Warm up in the background; readiness flips once it is done"""
+        if not WARMUP_ENABLED:
+            self.warmup_report = {'state': 'disabled'}
+            self.ready.set()
+            return
+        threading.Thread(target=self.warm_up_until_ready, name='scans-warmup', daemon=True).start()
+    
+    def warm_up_until_ready(self):
+        """Warm up, then retry the models that failed to load until all are resident"""
+        self.warm_up()
+        while not self.ready.is_set():
+            time.sleep(WARMUP_RETRY_S)
+            self.warm_up()
+    
+    def warmup_models(self):
+        """Scan types whose models must be resident before /ready"""
+        if WARMUP_MODELS == 'primary':
+            return list(MODEL_SPECS)
+        return [scan_type for scan_type in WARMUP_MODELS.split(',') if scan_type in MODEL_TIER_SPECS]
+    
+    def warm_up(self, sizes=None):
+        """Load the warm-up models, then run every resident model and analyzer on
+        synthetic inputs so kernels, allocators and image processors are hot before
+        real traffic arrives. Readiness is only set once the warm-up models are all
+        resident."""
+        sizes = sizes or WARMUP_SIZES
+        started = time.perf_counter()
+        steps = {}
+        errors = []
+        self.warmup_report = {'state': 'running', 'steps': steps}
+        print(f"🔥 Warming up (sizes {sizes})...")
+        
+        def step(name, fn):
+            t0 = time.perf_counter()
             try:
-                print("🔍 Loading Skin Lesion Classification Model...")
-                self.models['skin'] = pipeline(
-                    "image-classification",
-                    model="actavkid/vit-large-patch32-384-finetuned-skin-lesion-classification",
-                    device=-1
-                )
-                print("✅ Skin Analysis Model: LOADED (12 Lesion Types)")
+                fn()
             except Exception as e:
-                print(f"❌ Skin Analysis Model: FAILED - {e}")
+                errors.append(f"{name}: {e}")
+            steps[name] = round((time.perf_counter() - t0) * 1000, 1)
+        
+        # A model the memory budget evicted again still loaded fine: only failures count
+        missing = []
+        for scan_type in self.warmup_models():
+            if self.model_manager.is_resident(scan_type):
+                continue
+            t0 = time.perf_counter()
+            if self.model_manager.get(scan_type) is None:
+                missing.append(scan_type)
+            steps[f"load_{scan_type}"] = round((time.perf_counter() - t0) * 1000, 1)
+        
+        rng = np.random.RandomState(0)
+        for size in sizes:
+            image = cv2.GaussianBlur(rng.randint(0, 255, (size, size, 3), dtype=np.uint8), (5, 5), 0)
+            encoded = cv2.imencode('.jpg', image)[1].tobytes()
+            step(f"decode_{size}", lambda: self.decode(encoded))
             
-            # Try alternative brain models
-            brain_models = [
-                "microsoft/resnet-50",  # General vision model for brain analysis
-                "google/vit-base-patch16-224"  # Vision transformer
-            ]
+            # Models: single and full-batch calls for every resident model (the
+            # warm-up models and anything preloaded; lighter tiers stay lazy)
+            resident = self.model_manager.resident()
+            pil_image = ScanContext(image).rgb_pil
+            for scan_type in resident:
+                model = self.model_manager.get(scan_type)
+                step(f"model_{scan_type}_{size}", lambda: model([pil_image], batch_size=1))
+                step(f"model_{scan_type}_{size}_batch{BATCH_MAX_SIZE}",
+                     lambda: model([pil_image] * BATCH_MAX_SIZE, batch_size=BATCH_MAX_SIZE))
             
-            for model_name in brain_models:
-                try:
-                    print(f"🧠 Loading Brain MRI Model: {model_name}...")
-                    self.models['mri'] = pipeline(
-                        "image-classification",
-                        model=model_name,
-                        device=-1
-                    )
-                    print(f"✅ Brain MRI Model: LOADED ({model_name})")
-                    break
-                except Exception as e:
-                    print(f"❌ Brain MRI Model {model_name}: FAILED - {e}")
+            # Analyzers, bypassing the result cache
+            for scan_type in self.scan_types:
+                if self.has_model(scan_type) and scan_type not in resident:
                     continue
+                analyze = getattr(self, f"analyze_{scan_type}")
+                step(f"analyze_{scan_type}_{size}", lambda: WORKSPACES.run(analyze, ScanContext(image)))
+        
+        step("validate_scan_type", lambda: self.validate_scan_type(ScanContext(image), 'mri'))
+        step("scan_router", lambda: self.scan_router.route(image))
+        
+        self.warmup_report = {
+            'state': 'waiting_for_models' if missing else 'done',
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+            'warmed_models': self.model_manager.resident(),
+            'missing_models': missing,
+            'steps': steps,
+            'errors': errors
+        }
+        if missing:
+            print(f"⏳ Warm-up done, not ready: {', '.join(missing)} not loaded (retrying every {WARMUP_RETRY_S:.0f} s)")
+            return self.warmup_report
+        self.ready.set()
+        print(f"✅ Warm-up complete in {self.warmup_report['total_ms']:.0f} ms ({len(errors)} errors)")
+        return self.warmup_report
+    
+    def load_model(self, scan_type, model_name):
+        """Build one Hugging Face image-classification pipeline on CPU"""
+        model = pipeline(
+            "image-classification",
+            model=model_name,
+            device=-1
+        )
+        
+        backend = INFERENCE_BACKENDS.get(scan_type, 'torch')
+        if backend == 'torch':
+            return self.share_weights(scan_type, model_name, model)
+        if self.prefork_parent:
+            # The parity check runs torch and ORT inference, whose thread pools
+            # must not exist before fork(): each worker builds it after forking
+            self.backend_reports[scan_type] = {'backend': backend, 'active_backend': 'torch', 'deferred': True}
+            return self.share_weights(scan_type, model_name, model)
+        return self.build_backend(scan_type, model_name, model)
+    
+    def build_backend(self, scan_type, model_name, model):
+        """Swap in an ONNX Runtime session when it matches the torch output"""
+        backend = INFERENCE_BACKENDS.get(scan_type, 'torch')
+        try:
+            classifier, report = build_onnx_classifier(
+                model,
+                model_name,
+                ONNX_CACHE_DIR,
+                quantize=backend == 'onnx-int8',
+                tolerance=ONNX_PARITY_TOLERANCE
+            )
+            if classifier is None:
+                print(f"⚠️ {scan_type} {backend} parity check failed (max diff {report['max_abs_diff']}), using torch")
+        except Exception as e:
+            print(f"❌ {scan_type} {backend} backend: FAILED - {e}, using torch")
+            classifier, report = None, {'backend': backend, 'error': str(e)}
+        
+        report['active_backend'] = backend if classifier is not None else 'torch'
+        self.backend_reports[scan_type] = report
+        return classifier or self.share_weights(scan_type, model_name, model)
+    
+    def share_weights(self, scan_type, model_name, model):
+        """Swap a torch pipeline's weights for the memory-mapped copy shared by all workers"""
+        if not SHARED_WEIGHTS:
+            return model
+        try:
+            self.weight_reports[scan_type] = map_shared_weights(model, model_name, WEIGHTS_CACHE_DIR)
+        except Exception as e:
+            print(f"⚠️ {scan_type} shared weights: FAILED - {e}, keeping a private copy")
+            self.weight_reports[scan_type] = {'error': str(e)}
+        return model
+    
+    def active_backend(self, scan_type):
+        report = self.backend_reports.get(scan_type)
+        return report['active_backend'] if report else INFERENCE_BACKENDS.get(scan_type, 'torch')
+    
+    def load_models(self, scan_types=None):
+        """Eagerly load Hugging Face models (by default they load on first use)"""
+        print("\n🤖 Loading AI Models for Medical Scan Analysis...")
+        print("=" * 60)
+        
+        try:
+            self.model_manager.preload(scan_types)
             
             print("=" * 60)
-            print(f"🎆 MODEL LOADING COMPLETE: {len(self.models)}/7 AI models loaded")
-            print(f"📊 Loaded Models: {list(self.models.keys())}")
+            print(f"🎆 MODEL LOADING COMPLETE: {len(self.model_manager.resident())}/{len(MODEL_TIER_SPECS)} AI models resident")
+            print(f"📊 Loaded Models: {self.model_manager.resident()}")
             print(f"🛠️ Fallback: Advanced Computer Vision for remaining scan types")
             print("=" * 60)
             
         except Exception as e:
             print(f"❌ Critical Error loading models: {e}")
-            self.models = {}
+    
+    def init_batchers(self):
+        """Put a micro-batching queue in front of every configured HF model (and tier)"""
+        for scan_type in MODEL_TIER_SPECS:
+            self.batchers[scan_type] = BatchingQueue(
+                scan_type,
+                lambda images, scan_type=scan_type: self._run_model(scan_type, images),
+                window_ms=BATCH_WINDOW_MS,
+                max_batch=BATCH_MAX_SIZE
+            )
+        print(f"📦 Batching: window={BATCH_WINDOW_MS}ms, max_batch={BATCH_MAX_SIZE}")
+    
+    def _run_model(self, scan_type, images):
+        model = self.model_manager.get(scan_type)
+        if model is None:
+            raise RuntimeError(f"{scan_type} model unavailable")
+        BATCH_SIZE.labels(scan_type=scan_type).observe(len(images))
+        with stage_timer('model_batch', scan_type):
+            return model(images, batch_size=len(images))
+    
+    def has_model(self, scan_type):
+        return self.model_manager.has_model(scan_type)
+    
+    def model_version(self, scan_type, model_name=None):
+        """Identify the analyzer + model combination that produces a result.
+        `model_name` is the model that ran; by default the resident primary model.
+        None when a model scan type has no resident model: there is nothing to
+        look a result up under, and a CV-only fallback must not be cached."""
+        if scan_type not in MODEL_SPECS:
+            return f"{ANALYZER_VERSION}:cv"
+        model_name = model_name or self.model_manager.model_name(scan_type)
+        if model_name is None:
+            return None
+        return f"{ANALYZER_VERSION}:{model_name}:{self.active_backend(scan_type)}"
+    
+    def servable_duplicate(self, match):
+        """Whether a near-duplicate is close enough to serve its result ('return' mode)"""
+        return (
+            match['phash_distance'] <= NEAR_DUP_RETURN_MAX_DISTANCE
+            and match['dhash_distance'] <= NEAR_DUP_RETURN_MAX_DHASH_DISTANCE
+            and match['pixel_mse'] is not None
+            and match['pixel_mse'] <= NEAR_DUP_RETURN_MAX_MSE
+        )
+    
+    def classify(self, scan_type, pil_image, timings=None, tier=None):
+        """Run the HF model for a scan type (and tier), batched with concurrent requests"""
+        with stage_timer('model', scan_type, timings):
+            return self.batchers[tier_key(scan_type, tier, MODEL_SPECS)](pil_image)
+    
+    def classify_scan(self, scan_type, ctx, pil_image):
+        """classify() for one analysis, recording on ctx the model that produced the predictions"""
+        predictions = self.classify(scan_type, pil_image, ctx.timings, ctx.model_tier)
+        ctx.model_used = self.model_manager.model_name(tier_key(scan_type, ctx.model_tier, MODEL_SPECS))
+        return predictions
+    
+    def model_enabled(self, scan_type, ctx):
+        """Whether an analysis runs the AI model: the scan type has one and the
+        request was not stepped down to the CV-only tier"""
+        if ctx.model_tier == TIER_CV:
+            return False
+        return self.has_model(tier_key(scan_type, ctx.model_tier, MODEL_SPECS))
+    
+    def primary_tier(self, scan_type):
+        """Tier of the full model (CV for scan types without one)"""
+        if scan_type not in MODEL_SPECS:
+            return TIER_CV
+        return tier_ladder(MODEL_SPECS[scan_type])[0]
+    
+    def select_tier(self, scan_type):
+        """Model tier for the next analysis: the controller's choice, stepping further
+        down past lighter models that are not resident yet (they load in the background)"""
+        chosen = self.tiers.begin(scan_type)
+        if scan_type not in MODEL_SPECS:
+            return chosen
+        ladder = tier_ladder(MODEL_SPECS[scan_type])
+        for tier in ladder[ladder.index(chosen):]:
+            key = tier_key(scan_type, tier, MODEL_SPECS)
+            if tier == TIER_CV or (tier == ladder[0] and self.has_model(key)):
+                return tier  # the primary model loads on first use, as without tiers
+            if not self.has_model(key):
+                continue
+            if self.model_manager.is_resident(key):
+                return tier
+            if key not in self.tier_loads:
+                self.tier_loads.add(key)
+                self.tier_loader.submit(lambda key=key: (self.model_manager.get(key), self.tier_loads.discard(key)))
+        return TIER_CV
+    
+    def decode(self, image_bytes, full_res=False, frame=None, window=None):
+        """Decode an upload, skipping resolution no downstream stage will use.
+        Streams spooled to disk are memory-mapped instead of read into bytes;
+        DICOM decodes one frame."""
+        if is_dicom(image_bytes):
+            return decode_dicom(image_bytes, frame, window)
+        with upload_view(image_bytes) as data:
+            return decode_image(
+                data,
+                min_side=DECODE_MIN_SIDE,
+                min_long_side=OCR_MAX_SIDE,
+                full_res=full_res
+            )
     
     def validate_scan_type(self, image, scan_type):
         """Validate if uploaded image matches the expected scan type using OCR and image analysis"""
         try:
-            # Convert to grayscale for OCR
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Extract text using OCR
-            text = pytesseract.image_to_string(gray).lower()
-            
             # Define keywords for each scan type
             keywords = {
                 'mri': ['mri', 'magnetic', 'resonance', 'brain', 'axial', 'sagittal', 'coronal'],
@@ -111,13 +604,16 @@ class ScansAnalyzer:
             }
             
             # Check image dimensions and characteristics
-            height, width = image.shape[:2]
+            height, width = ScanContext.of(image).image.shape[:2]
             aspect_ratio = width / height
             
-            # Basic validation based on image characteristics
+            # Basic validation based on image characteristics (no OCR needed)
             if scan_type == 'chest' and (aspect_ratio < 0.8 or aspect_ratio > 1.5):
                 return False, "Image dimensions don't match typical chest X-ray format"
             
+            # Extract text using OCR
+            text = self.ocr_text(image)
+            
             # Check for relevant keywords
             scan_keywords = keywords.get(scan_type, [])
             found_keywords = [kw for kw in scan_keywords if kw in text]
@@ -130,83 +626,130 @@ class ScansAnalyzer:
             
         except Exception as e:
             return True, f"Validation warning: {str(e)}"
+    
+    def ocr_text(self, image):
+        """Run Tesseract on a downscaled grayscale copy of the image"""
+        gray = ScanContext.of(image).ocr_gray(OCR_MAX_SIDE)
+        
+        # Tesseract runs as a subprocess; kill it shortly after the request has stopped waiting
+        return pytesseract.image_to_string(gray, timeout=OCR_TIMEOUT_S + 1 if OCR_TIMEOUT_S else 0).lower()
+    
+    def route_scan_type(self, ctx):
+        """Pick the scan type of an upload sent with scan_type=auto"""
+        with stage_timer('route_scan_type', 'auto', ctx.timings):
+            routing = self.scan_router.route(ctx.image)
+        ROUTER_DECISIONS.labels(scan_type=routing['scan_type'], method=routing['method']).inc()
+        return routing
+    
+    def router_validation(self, scan_type, routing):
+        """Validation verdict from the scan type router: only a confident
+        prediction of another scan type marks the image as not matching"""
+        predicted, confidence = routing['scan_type'], routing['confidence']
+        summary = f"{predicted} ({confidence:.0%}, {routing['method']})"
+        if predicted == scan_type and confidence >= ROUTER_MIN_CONFIDENCE:
+            return True, f"Validated: image classified as {summary}"
+        if predicted != scan_type and confidence >= ROUTER_MIN_CONFIDENCE:
+            return False, f"Image looks like {summary}, not {scan_type}"
+        return True, f"Uncertain: closest match {summary}, proceeding with analysis"
+    
+    def validate_in_background(self, ctx, scan_type, routing=None):
+        """Start OCR validation on the shared pool so analysis can run alongside it.
+        Routed uploads and SCANS_SCAN_VALIDATOR=router use the router instead (a few ms)"""
+        if routing is not None or SCAN_VALIDATOR == 'router':
+            future = Future()
+            with stage_timer('validate_scan_type', scan_type, ctx.timings):
+                future.set_result(self.router_validation(scan_type, routing or self.scan_router.route(ctx.image)))
+            return future, time.perf_counter()
+        
+        def validate():
+            with stage_timer('validate_scan_type', scan_type, ctx.timings):
+                return self.validate_scan_type(ctx, scan_type)
+        return self.executor.submit(validate), time.perf_counter()
+    
+    def collect_validation(self, pending):
+        """Wait for background validation within the OCR time budget"""
+        future, started = pending
+        timeout = None
+        if OCR_TIMEOUT_S:
+            timeout = max(0.0, OCR_TIMEOUT_S - (time.perf_counter() - started))
+        try:
+            is_valid, validation_msg = future.result(timeout=timeout)
+            return is_valid, validation_msg, "completed"
+        except FuturesTimeoutError:
+            return True, f"Validation skipped: OCR exceeded {OCR_TIMEOUT_S}s budget", "skipped"
         
     def preprocess_image(self, image, scan_type):
-        """Preprocess image based on scan type"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        """Preprocess image based on scan type (224x224 grayscale in [0, 1])"""
+        return ScanContext.of(image).processed(scan_type)
+    
+    def mri_findings(self, predictions, symmetry_diff, abnormal_regions, large_contours, center_mean):
+        """MRI thresholds shared by the single-slice and the volume analysis"""
+        findings = []
+        confidence_scores = {}
         
-        if scan_type in ['chest', 'xray']:
-            # CLAHE for chest/xray contrast enhancement
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            gray = clahe.apply(gray)
+        for pred in predictions or []:
+            if pred['score'] > 0.4:
+                findings.append(f"AI Detection: {pred['label']}")
+                confidence_scores[f"AI_{pred['label']}"] = pred['score']
         
-        # Resize to standard size
-        resized = cv2.resize(gray, (224, 224))
+        if symmetry_diff > 0.15:
+            findings.append("Brain asymmetry detected - possible mass effect")
+            confidence_scores["Asymmetry"] = min(0.95, symmetry_diff * 5)
         
-        # Normalize
-        normalized = resized / 255.0
+        # Find regions with abnormal intensity
+        if abnormal_regions > 100:
+            findings.append("Hyperintense lesions detected")
+            confidence_scores["Hyperintense Lesions"] = 0.78
+        
+        # Detect potential tumors using contour analysis
+        if large_contours > 5:
+            findings.append("Multiple lesions detected - requires further evaluation")
+            confidence_scores["Multiple Lesions"] = 0.82
         
-        return normalized
+        # Ventricular analysis
+        if center_mean < 0.2:  # Dark regions indicating enlarged ventricles
+            findings.append("Possible ventricular enlargement")
+            confidence_scores["Ventricular Enlargement"] = 0.71
+        
+        return findings, confidence_scores
     
     def analyze_mri(self, image):
         """Analyze MRI brain scan using AI model + computer vision"""
-        processed = self.preprocess_image(image, 'mri')
-        
-        findings = []
-        confidence_scores = {}
+        ctx = ScanContext.of(image)
+        processed = ctx.processed('mri')
+        stats = ctx.features('mri')
         
         # Use AI model if available
-        if 'mri' in self.models:
+        predictions = None
+        if self.model_enabled('mri', ctx):
             try:
-                pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-                predictions = self.models['mri'](pil_image)
-                
-                for pred in predictions:
-                    if pred['score'] > 0.4:
-                        findings.append(f"AI Detection: {pred['label']}")
-                        confidence_scores[f"AI_{pred['label']}"] = pred['score']
+                pil_image = ctx.rgb_pil
+                predictions = self.classify_scan('mri', ctx, pil_image)
             except Exception as e:
                 print(f"MRI AI model error: {e}")
         
         # Advanced image analysis for MRI
         # Detect potential tumor regions using edge detection and contour analysis
-        edges = cv2.Canny((processed * 255).astype(np.uint8), 30, 100)
+        edges = pipeline_for('mri').edges(ctx.processed_uint8('mri'))
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        large_contours = [c for c in contours if cv2.contourArea(c) > 50]
         
         # Analyze brain symmetry
         height, width = processed.shape
         left_half = processed[:, :width//2]
         right_half = np.fliplr(processed[:, width//2:])
-        
-        # Calculate symmetry score
         symmetry_diff = np.mean(np.abs(left_half - right_half))
         
-        if symmetry_diff > 0.15:
-            findings.append("Brain asymmetry detected - possible mass effect")
-            confidence_scores["Asymmetry"] = min(0.95, symmetry_diff * 5)
-        
         # Detect abnormal intensity regions
-        mean_intensity = np.mean(processed)
-        std_intensity = np.std(processed)
+        mean_intensity = stats.mean()
+        std_intensity = stats.std()
+        abnormal_regions = stats.count('>', mean_intensity + 2*std_intensity)
         
-        # Find regions with abnormal intensity
-        abnormal_regions = np.where(processed > mean_intensity + 2*std_intensity)
-        if len(abnormal_regions[0]) > 100:
-            findings.append("Hyperintense lesions detected")
-            confidence_scores["Hyperintense Lesions"] = 0.78
-        
-        # Detect potential tumors using contour analysis
-        large_contours = [c for c in contours if cv2.contourArea(c) > 50]
-        if len(large_contours) > 5:
-            findings.append("Multiple lesions detected - requires further evaluation")
-            confidence_scores["Multiple Lesions"] = 0.82
-        
-        # Ventricular analysis
-        center_region = processed[height//3:2*height//3, width//3:2*width//3]
-        if np.mean(center_region) < 0.2:  # Dark regions indicating enlarged ventricles
-            findings.append("Possible ventricular enlargement")
-            confidence_scores["Ventricular Enlargement"] = 0.71
+        center_mean = stats.mean(height//3, 2*height//3, width//3, 2*width//3)
         
+        findings, confidence_scores = self.mri_findings(
+            predictions, symmetry_diff, abnormal_regions, len(large_contours), center_mean
+        )
         status = "Abnormal" if findings else "Normal"
         
         return {
@@ -215,27 +758,117 @@ class ScansAnalyzer:
             "detected_conditions": findings if findings else ["No significant abnormalities detected"],
             "confidence_scores": confidence_scores,
             "recommendations": ["Urgent neurologist consultation recommended"] if len(findings) > 2 else ["Regular follow-up recommended"] if findings else ["Normal MRI findings"],
-            "ai_model_used": 'mri' in self.models
+            "ai_model_used": ctx.model_used is not None
+        }
+    
+    def analyze_mri_volume(self, chunks, timings=None):
+        """Analyze an MRI slice stack given as (slice indices, uint8 block) chunks.
+        
+        CV metrics are computed across all slices of a chunk at once and the model
+        runs on full batches; returns per-slice and aggregate findings.
+        """
+        timings = timings if timings is not None else {}
+        use_model = self.has_model('mri')
+        slices = []
+        slice_means = []
+        
+        for indices, block in chunks:
+            with stage_timer('volume_preprocess', 'mri', timings):
+                gray = gray_stack(block)
+                # uint8 stack: same values as ScanContext.processed_uint8('mri') per slice
+                processed = resize_stack(gray, ANALYSIS_SIZE)
+            
+            with stage_timer('volume_cv', 'mri', timings):
+                metrics = mri_slice_metrics(processed)
+                contours = large_contour_counts(processed)
+            
+            predictions = [None] * len(indices)
+            if use_model:
+                with stage_timer('volume_model', 'mri', timings):
+                    try:
+                        for start in range(0, len(gray), BATCH_MAX_SIZE):
+                            images = [Image.fromarray(slice_).convert('RGB') for slice_ in gray[start:start + BATCH_MAX_SIZE]]
+                            predictions[start:start + len(images)] = self._run_model('mri', images)
+                    except Exception as e:
+                        print(f"MRI AI model error: {e}")
+                        use_model = False
+            
+            for i, index in enumerate(indices):
+                findings, confidence_scores = self.mri_findings(
+                    predictions[i],
+                    metrics['symmetry_diff'][i],
+                    metrics['abnormal_regions'][i],
+                    contours[i],
+                    metrics['center_mean'][i]
+                )
+                slices.append({
+                    "slice": index,
+                    "status": "Abnormal" if findings else "Normal",
+                    "detected_conditions": findings,
+                    "confidence_scores": {k: round(float(v), 3) for k, v in confidence_scores.items()},
+                    "ai_model_used": predictions[i] is not None,
+                    "metrics": {
+                        "symmetry_diff": round(float(metrics['symmetry_diff'][i]), 4),
+                        "mean_intensity": round(float(metrics['mean'][i]), 4),
+                        "abnormal_regions": int(metrics['abnormal_regions'][i]),
+                        "large_contours": int(contours[i]),
+                        "center_mean": round(float(metrics['center_mean'][i]), 4)
+                    }
+                })
+            slice_means.extend(metrics['mean'].tolist())
+        
+        # Aggregate: a finding counts for the volume once it shows on enough slices
+        per_finding = {}
+        for entry in slices:
+            for finding in entry["detected_conditions"]:
+                per_finding.setdefault(finding, []).append(entry["slice"])
+        confidence_scores = {}
+        for entry in slices:
+            for label, score in entry["confidence_scores"].items():
+                confidence_scores[label] = max(confidence_scores.get(label, 0.0), score)
+        
+        findings = [
+            f"{finding} ({len(indices)}/{len(slices)} slices)"
+            for finding, indices in per_finding.items()
+            if len(indices) >= VOLUME_MIN_SLICES
+        ]
+        outliers = [slices[i]["slice"] for i in robust_outliers(slice_means)]
+        if outliers:
+            findings.append(f"Slice intensity outliers at slices {outliers}")
+        
+        return {
+            "scan_type": "MRI Brain Volume (AI + Computer Vision)",
+            "status": "Abnormal" if findings else "Normal",
+            "detected_conditions": findings if findings else ["No significant abnormalities detected"],
+            "confidence_scores": confidence_scores,
+            "recommendations": ["Urgent neurologist consultation recommended"] if len(per_finding) > 2 else ["Regular follow-up recommended"] if findings else ["Normal MRI findings"],
+            "ai_model_used": any(entry["ai_model_used"] for entry in slices),
+            "model_scored_slices": sum(entry["ai_model_used"] for entry in slices),
+            "slices_analyzed": len(slices),
+            "aggregate": {
+                "findings": {
+                    finding: {"slices": len(indices), "slice_indices": indices}
+                    for finding, indices in per_finding.items()
+                },
+                "abnormal_slices": [entry["slice"] for entry in slices if entry["status"] == "Abnormal"],
+                "intensity_outlier_slices": outliers,
+                "symmetry_profile": [entry["metrics"]["symmetry_diff"] for entry in slices]
+            },
+            "slices": slices
         }
     
     def analyze_xray(self, image):
         """Analyze X-Ray using advanced computer vision"""
-        processed = self.preprocess_image(image, 'xray')
+        ctx = ScanContext.of(image)
+        processed = ctx.processed('xray')
+        stats = ctx.features('xray')
         
         findings = []
         confidence_scores = {}
         
         # Advanced fracture detection
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur((processed * 255).astype(np.uint8), (5, 5), 0)
-        
-        # Multiple edge detection techniques
-        edges_canny = cv2.Canny(blurred, 50, 150)
-        edges_sobel = cv2.Sobel(blurred, cv2.CV_64F, 1, 1, ksize=3)
-        edges_sobel = np.uint8(np.absolute(edges_sobel))
-        
-        # Combine edge detection results
-        combined_edges = cv2.bitwise_or(edges_canny, edges_sobel)
+        # Gaussian blur to reduce noise, then Canny edges OR'd with the Sobel mixed derivative
+        combined_edges = pipeline_for('xray').edges(ctx.processed_uint8('xray'))
         
         # Detect potential fracture lines
         lines = cv2.HoughLinesP(combined_edges, 1, np.pi/180, threshold=50, minLineLength=30, maxLineGap=10)
@@ -246,9 +879,8 @@ class ScansAnalyzer:
         
         # Bone density analysis
         # Detect bone regions (high intensity areas)
-        bone_mask = processed > 0.7
-        bone_area = np.sum(bone_mask)
-        total_area = processed.size
+        bone_area = stats.count('>', 0.7)
+        total_area = stats.area()
         bone_ratio = bone_area / total_area
         
         if bone_ratio < 0.15:
@@ -259,19 +891,19 @@ class ScansAnalyzer:
         # Look for joint space narrowing patterns
         height, width = processed.shape
         joint_regions = [
-            processed[height//4:height//2, width//4:3*width//4],  # Upper joints
-            processed[height//2:3*height//4, width//4:3*width//4]  # Lower joints
+            (height//4, height//2, width//4, 3*width//4),  # Upper joints
+            (height//2, 3*height//4, width//4, 3*width//4)  # Lower joints
         ]
         
         for i, region in enumerate(joint_regions):
-            if np.std(region) > 0.25:  # High variation indicates potential joint issues
+            if stats.std(*region) > 0.25:  # High variation indicates potential joint issues
                 findings.append(f"Joint space irregularity detected in region {i+1}")
                 confidence_scores[f"Joint Issue {i+1}"] = 0.68
         
         # Foreign object detection
         # Look for very high intensity spots that could be foreign objects
-        foreign_objects = np.where(processed > 0.95)
-        if len(foreign_objects[0]) > 10:
+        foreign_objects = stats.count('>', 0.95)
+        if foreign_objects > 10:
             findings.append("Possible foreign object or metal implant detected")
             confidence_scores["Foreign Object"] = 0.85
         
@@ -287,20 +919,21 @@ class ScansAnalyzer:
     
     def analyze_chest(self, image):
         """Analyze Chest scan using Hugging Face model and advanced CV"""
-        processed = self.preprocess_image(image, 'chest')
+        ctx = ScanContext.of(image)
+        processed = ctx.processed('chest')
+        stats = ctx.features('chest')
         
         findings = []
         confidence_scores = {}
         
         # Use Hugging Face model if available
-        if 'chest' in self.models:
+        if self.model_enabled('chest', ctx):
             try:
-                # Convert processed image back to PIL for HF model
-                pil_image = Image.fromarray((processed * 255).astype(np.uint8))
-                pil_image = pil_image.convert('RGB')
+                # Processed (CLAHE) image as RGB PIL for HF model
+                pil_image = ctx.processed_pil('chest')
                 
                 # Get prediction from HF model
-                predictions = self.models['chest'](pil_image)
+                predictions = self.classify_scan('chest', ctx, pil_image)
                 
                 for pred in predictions:
                     if pred['score'] > 0.5:
@@ -317,22 +950,22 @@ class ScansAnalyzer:
         height, width = processed.shape
         
         # Define lung regions more accurately
-        left_lung = processed[height//4:3*height//4, width//8:width//2-width//8]
-        right_lung = processed[height//4:3*height//4, width//2+width//8:7*width//8]
+        left_lung = (height//4, 3*height//4, width//8, width//2-width//8)
+        right_lung = (height//4, 3*height//4, width//2+width//8, 7*width//8)
         
         # Lung opacity analysis
-        left_opacity = np.mean(left_lung)
-        right_opacity = np.mean(right_lung)
+        left_opacity = stats.mean(*left_lung)
+        right_opacity = stats.mean(*right_lung)
         
         if abs(left_opacity - right_opacity) > 0.2:
             findings.append("Significant lung field asymmetry")
             confidence_scores["Lung Asymmetry"] = min(0.95, abs(left_opacity - right_opacity) * 4)
         
         # Detect consolidations (high opacity regions)
-        consolidation_threshold = np.mean(processed) + 2 * np.std(processed)
-        consolidations = np.where(processed > consolidation_threshold)
+        consolidation_threshold = stats.mean() + 2 * stats.std()
+        consolidations = stats.count('>', consolidation_threshold)
         
-        if len(consolidations[0]) > 200:
+        if consolidations > 200:
             findings.append("Pulmonary consolidation detected")
             confidence_scores["Consolidation"] = 0.82
         
@@ -347,14 +980,13 @@ class ScansAnalyzer:
             confidence_scores["Cardiomegaly"] = min(0.95, cardiothoracic_ratio * 1.5)
         
         # Pleural effusion detection
-        lower_chest = processed[2*height//3:, :]
-        if np.mean(lower_chest) > 0.7:
+        if stats.mean(2*height//3, None) > 0.7:
             findings.append("Possible pleural effusion")
             confidence_scores["Pleural Effusion"] = 0.74
         
         # Pneumothorax detection (abnormal air spaces)
-        air_spaces = np.where(processed < 0.1)
-        if len(air_spaces[0]) > 500:
+        air_spaces = stats.count('<', 0.1)
+        if air_spaces > 500:
             findings.append("Possible pneumothorax")
             confidence_scores["Pneumothorax"] = 0.69
         
@@ -370,20 +1002,21 @@ class ScansAnalyzer:
     
     def analyze_kidney(self, image):
         """Analyze Kidney scan"""
-        processed = self.preprocess_image(image, 'kidney')
+        ctx = ScanContext.of(image)
+        stats = ctx.features('kidney')
         
         findings = []
         confidence_scores = {}
         
         # Kidney contour analysis
-        contours, _ = cv2.findContours((processed * 255).astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours, _ = cv2.findContours(ctx.processed_uint8('kidney'), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         if len(contours) > 5:
             findings.append("Multiple cystic lesions detected")
             confidence_scores["Cysts"] = 0.73
         
         # Size analysis
-        kidney_area = np.sum(processed > 0.3)
+        kidney_area = stats.count('>', 0.3)
         if kidney_area < 5000:
             findings.append("Possible kidney atrophy")
             confidence_scores["Atrophy"] = 0.69
@@ -398,27 +1031,32 @@ class ScansAnalyzer:
             "recommendations": ["Nephrologist review"] if findings else ["Continue regular monitoring"]
         }
     
-    def analyze_heart(self, image):
-        """Analyze Heart scan"""
-        processed = self.preprocess_image(image, 'heart')
-        
+    def heart_findings(self, heart_area, wall_thickness):
+        """Heart findings from the bright-area and wall-intensity metrics (shared by stills and clips)"""
         findings = []
         confidence_scores = {}
         
         # Heart size analysis
-        heart_region = processed[80:144, 80:144]
-        heart_area = np.sum(heart_region > 0.4)
-        
         if heart_area > 2000:
             findings.append("Cardiomegaly detected")
             confidence_scores["Cardiomegaly"] = 0.81
         
         # Wall thickness analysis
-        wall_thickness = np.mean(heart_region[20:44, 20:44])
         if wall_thickness > 0.7:
             findings.append("Possible ventricular hypertrophy")
             confidence_scores["Hypertrophy"] = 0.74
         
+        return findings, confidence_scores
+    
+    def analyze_heart(self, image):
+        """Analyze Heart scan"""
+        ctx = ScanContext.of(image)
+        stats = ctx.features('heart')
+        
+        findings, confidence_scores = self.heart_findings(
+            stats.count('>', 0.4, *HEART_REGION),
+            stats.mean(*WALL_REGION)
+        )
         status = "Abnormal" if findings else "Normal"
         
         return {
@@ -429,21 +1067,110 @@ class ScansAnalyzer:
             "recommendations": ["Cardiologist evaluation"] if findings else ["Regular cardiac monitoring"]
         }
     
+    def analyze_heart_clip(self, source, stride=None, max_frames=None, timings=None):
+        """Analyze an echo / cine clip (bytes or stream) frame by frame.
+        
+        Every `stride`-th frame is decoded, VIDEO_CHUNK frames are resized into
+        one stack and analyze_heart's metrics are computed for all of them at
+        once; findings are aggregated over the clip.
+        """
+        timings = timings if timings is not None else {}
+        stride = max(1, stride or VIDEO_FRAME_STRIDE)
+        max_frames = min(max_frames or VIDEO_MAX_FRAMES, VIDEO_MAX_FRAMES)
+        frames = []
+        
+        with open_video_frames(source, stride, max_frames) as (info, decoded):
+            chunks = iter_frame_chunks(decoded, VIDEO_CHUNK)
+            while True:
+                with stage_timer('video_decode', 'heart', timings):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                indices, block = chunk
+                
+                with stage_timer('video_metrics', 'heart', timings):
+                    # uint8 stack: same values as ScanContext.processed('heart') * 255 per frame
+                    metrics = heart_frame_metrics(resize_stack(block, ANALYSIS_SIZE))
+                
+                for i, index in enumerate(indices):
+                    findings, confidence_scores = self.heart_findings(
+                        metrics['heart_area'][i], metrics['wall_intensity'][i]
+                    )
+                    frames.append({
+                        "frame": index,
+                        "time_s": round(index / info['fps'], 3) if info['fps'] else None,
+                        "status": "Abnormal" if findings else "Normal",
+                        "detected_conditions": findings,
+                        "confidence_scores": confidence_scores,
+                        "metrics": {
+                            "heart_area": int(metrics['heart_area'][i]),
+                            "wall_intensity": round(float(metrics['wall_intensity'][i]), 4)
+                        }
+                    })
+        
+        if not frames:
+            raise ValueError('No frames could be decoded from the clip')
+        
+        # Aggregate: a finding counts for the clip once it shows on enough frames
+        per_finding = {}
+        labels = {}
+        for entry in frames:
+            # heart_findings adds each finding and its confidence label in the same order
+            for finding, label in zip(entry["detected_conditions"], entry["confidence_scores"]):
+                per_finding.setdefault(finding, []).append(entry["frame"])
+                labels[finding] = (label, entry["confidence_scores"][label])
+        reported = [
+            finding for finding, indices in per_finding.items()
+            if len(indices) >= min(VIDEO_MIN_FRAMES, len(frames))
+        ]
+        findings = [f"{finding} ({len(per_finding[finding])}/{len(frames)} frames)" for finding in reported]
+        
+        # Bright-area swing over the clip: a coarse fractional area change across the cycle
+        areas = np.array([entry["metrics"]["heart_area"] for entry in frames])
+        area_change = float((areas.max() - areas.min()) / areas.max()) if areas.max() else 0.0
+        
+        return {
+            "scan_type": "Heart Scan (cine clip)",
+            "status": "Abnormal" if findings else "Normal",
+            "detected_conditions": findings if findings else ["Normal cardiac structure"],
+            "confidence_scores": dict(labels[finding] for finding in reported),
+            "recommendations": ["Cardiologist evaluation"] if findings else ["Regular cardiac monitoring"],
+            "decode": {**info, "frame_stride": stride},
+            "frames_analyzed": len(frames),
+            "aggregate": {
+                "findings": {
+                    finding: {"frames": len(indices), "frame_indices": indices}
+                    for finding, indices in per_finding.items()
+                },
+                "abnormal_frames": [entry["frame"] for entry in frames if entry["status"] == "Abnormal"],
+                "heart_area": {
+                    "min": int(areas.min()),
+                    "max": int(areas.max()),
+                    "mean": round(float(areas.mean()), 1),
+                    "change_fraction": round(area_change, 3)
+                },
+                "wall_intensity_mean": round(float(np.mean([entry["metrics"]["wall_intensity"] for entry in frames])), 4)
+            },
+            "frames": frames
+        }
+    
     def analyze_skin(self, image):
         """Analyze Skin lesion using Hugging Face model and ABCDE criteria"""
-        processed = self.preprocess_image(image, 'skin')
+        ctx = ScanContext.of(image)
+        processed = ctx.processed('skin')
+        stats = ctx.features('skin')
         
         findings = []
         confidence_scores = {}
         
         # Use Hugging Face model if available
-        if 'skin' in self.models:
+        if self.model_enabled('skin', ctx):
             try:
                 # Convert to RGB PIL image for HF model
-                pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                pil_image = ctx.rgb_pil
                 
                 # Get prediction from HF model
-                predictions = self.models['skin'](pil_image)
+                predictions = self.classify_scan('skin', ctx, pil_image)
                 
                 for pred in predictions:
                     if pred['score'] > 0.3:
@@ -465,7 +1192,7 @@ class ScansAnalyzer:
             processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
         
         # Find lesion contour
-        _, binary = cv2.threshold((processed * 255).astype(np.uint8), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        binary = pipeline_for('skin').otsu(ctx.processed_uint8('skin'))
         contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         if contours:
@@ -497,17 +1224,17 @@ class ScansAnalyzer:
                     confidence_scores["Asymmetry"] = min(0.95, asymmetry_score * 2)
         
         # B - Border Irregularity
-        edges = cv2.Canny((processed * 255).astype(np.uint8), 50, 150)
-        border_complexity = np.sum(edges > 0) / (np.sum(processed < 0.8) + 1)  # Avoid division by zero
+        edges = pipeline_for('skin').edges(ctx.processed_uint8('skin'))
+        border_complexity = np.count_nonzero(edges) / (stats.count('<', 0.8) + 1)  # Avoid division by zero
         
         if border_complexity > 0.1:
             findings.append("Irregular borders detected (ABCDE: B)")
             confidence_scores["Border Irregularity"] = min(0.95, border_complexity * 8)
         
         # C - Color Variation
-        if len(image.shape) == 3:
+        if len(ctx.image.shape) == 3:
             # Analyze color channels
-            b, g, r = cv2.split(image)
+            b, g, r = cv2.split(ctx.image)
             color_variance = np.var([np.std(b), np.std(g), np.std(r)])
             
             if color_variance > 500:
@@ -526,13 +1253,13 @@ class ScansAnalyzer:
                 confidence_scores["Large Diameter"] = min(0.95, estimated_diameter_pixels / 100)
         
         # Additional risk factors
-        mean_intensity = np.mean(processed)
+        mean_intensity = stats.mean()
         if mean_intensity < 0.3:  # Very dark lesions
             findings.append("Very dark pigmentation - monitor closely")
             confidence_scores["Dark Pigmentation"] = 0.75
         
         # Texture analysis
-        texture_variance = np.var(processed)
+        texture_variance = stats.var()
         if texture_variance > 0.05:
             findings.append("Heterogeneous texture detected")
             confidence_scores["Texture Heterogeneity"] = min(0.95, texture_variance * 15)
@@ -553,25 +1280,26 @@ class ScansAnalyzer:
     
     def analyze_liver(self, image):
         """Analyze Liver scan"""
-        processed = self.preprocess_image(image, 'liver')
+        ctx = ScanContext.of(image)
+        stats = ctx.features('liver')
         
         findings = []
         confidence_scores = {}
         
         # Liver density analysis
-        liver_density = np.mean(processed)
+        liver_density = stats.mean()
         if liver_density > 0.6:
             findings.append("Increased liver density - possible fatty liver")
             confidence_scores["Fatty Liver"] = 0.77
         
         # Texture analysis
-        texture_variance = np.var(processed)
+        texture_variance = stats.var()
         if texture_variance > 0.05:
             findings.append("Heterogeneous liver texture")
             confidence_scores["Texture Abnormality"] = 0.71
         
         # Nodule detection
-        contours, _ = cv2.findContours((processed * 255).astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours, _ = cv2.findContours(ctx.processed_uint8('liver'), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         if len(contours) > 8:
             findings.append("Multiple nodular lesions")
             confidence_scores["Nodules"] = 0.69
@@ -586,8 +1314,63 @@ class ScansAnalyzer:
             "recommendations": ["Hepatologist consultation"] if findings else ["Regular liver function monitoring"]
         }
     
-    def analyze_scan(self, image, scan_type):
-        """Main analysis function"""
+    def use_tiles(self, scan_type, requested=None):
+        """Tiled mode: explicit per-request choice, else the configured default"""
+        if scan_type not in TILED_SCAN_TYPES:
+            return False
+        return scan_type in TILED_BY_DEFAULT if requested is None else requested
+    
+    def analyze_tiles(self, ctx, scan_type):
+        """Run the scan-type analyzer on overlapping tiles of the full-resolution image.
+        
+        Tiles run concurrently on the tile pool, so their classifier calls are
+        grouped into batches by the batching queue.
+        """
+        analyze = getattr(self, f"analyze_{scan_type}")
+        height, width = ctx.image.shape[:2]
+        gray = ctx.gray
+        boxes = [
+            (y0, y1, x0, x1)
+            for y0, y1, x0, x1 in tile_grid(height, width, TILE_SIZE, TILE_OVERLAP, TILE_MAX_TILES)
+            if gray[y0:y1, x0:x1].std() >= TILE_MIN_STD
+        ]
+        futures = []
+        for y0, y1, x0, x1 in boxes:
+            tile = ScanContext(ctx.image[y0:y1, x0:x1])
+            tile.model_tier = ctx.model_tier
+            futures.append(self.tile_executor.submit(WORKSPACES.run, analyze, tile))
+        tiles = []
+        for box, future in zip(boxes, futures):
+            try:
+                tiles.append((box, future.result()))
+            except Exception as e:
+                print(f"Tile {box} analysis error: {e}")
+        
+        summary = aggregate_tiles(tiles, ctx.image.shape)
+        summary.update({
+            'tile_size': TILE_SIZE,
+            'overlap': TILE_OVERLAP,
+            'tiles_analyzed': len(tiles),
+            'image_size': [width, height]
+        })
+        return summary
+    
+    def merge_tiles(self, result, tiled):
+        """Add tile-level findings that the whole-image pass did not report"""
+        result["tiled"] = tiled
+        detected = [] if result["status"] == "Normal" else list(result["detected_conditions"])
+        for label, entry in tiled["findings"].items():
+            if label in result["confidence_scores"]:
+                continue
+            detected.append(f"{label} (localized: {entry['tiles']}/{tiled['tiles_analyzed']} tiles)")
+            result["confidence_scores"][f"{label} (tiled)"] = entry["max_confidence"]
+        if detected:
+            result["status"] = "Abnormal"
+            result["detected_conditions"] = detected
+        return result
+    
+    def analyze_scan(self, image, scan_type, tiled=False, routing=None):
+        """Main analysis function; `routing` is the router decision for scan_type=auto"""
         analyzers = {
             'mri': self.analyze_mri,
             'xray': self.analyze_xray,
@@ -601,16 +1384,231 @@ class ScansAnalyzer:
         if scan_type not in analyzers:
             return {"error": "Unsupported scan type"}
         
-        # Validate scan type
-        is_valid, validation_msg = self.validate_scan_type(image, scan_type)
-        
-        result = analyzers[scan_type](image)
-        result["validation_message"] = validation_msg
-        result["image_validated"] = is_valid
-        
+        # One set of memoized views shared by validation and analysis
+        ctx = ScanContext.of(image)
+        
+        # Identical re-uploads are served from the result cache. Results are keyed on the
+        # model that produced them, so nothing is looked up before that model is resident
+        tile_version = f":tiled:{TILE_SIZE}:{TILE_OVERLAP}:{TILE_MAX_TILES}" if tiled else ""
+        with stage_timer('cache_lookup', scan_type, ctx.timings):
+            version = self.model_version(scan_type)
+            cached = hashes = thumbnail = near_duplicate = None
+            if version is not None:
+                version += tile_version
+                cached = self.result_cache.get(content_key(ctx.image, scan_type, version))
+            lookup = 'hit' if cached is not None else 'miss'
+            
+            # Exact miss: look for an earlier upload of the same scan
+            if cached is None and version is not None and self.near_duplicates.enabled:
+                hashes = perceptual_hashes(ctx.gray)
+                thumbnail = pixel_thumbnail(ctx.gray)
+                near_duplicate = self.near_duplicates.find(hashes, scan_type, version, thumbnail)
+                if near_duplicate is not None:
+                    referenced = self.result_cache.get(near_duplicate['key'])
+                    if referenced is None:
+                        near_duplicate = None  # its result has left the cache, nothing to link
+                    elif NEAR_DUP_MODE == 'return' and self.servable_duplicate(near_duplicate):
+                        cached = referenced
+                        lookup = 'near_duplicate'
+                    else:
+                        near_duplicate.update(self.reference_summary(referenced, near_duplicate['key']))
+        CACHE_LOOKUPS.labels(scan_type=scan_type, result=lookup).inc()
+        if cached is not None:
+            cached["cache_hit"] = True
+            if lookup == 'near_duplicate':
+                cached["near_duplicate"] = near_duplicate
+            return cached
+        
+        # Model tier from current load: a full model, a lighter one, or CV only
+        started = time.perf_counter()
+        try:
+            ctx.model_tier = self.select_tier(scan_type)
+            # Validate scan type (OCR) concurrently with the analysis itself
+            pending_validation = self.validate_in_background(ctx, scan_type, routing)
+            
+            with WORKSPACES.checkout():
+                with stage_timer('preprocess', scan_type, ctx.timings):
+                    ctx.processed(scan_type)
+                    ctx.features(scan_type)
+                
+                with stage_timer('analyze', scan_type, ctx.timings):
+                    result = analyzers[scan_type](ctx)
+            if tiled:
+                with stage_timer('tiles', scan_type, ctx.timings):
+                    result = self.merge_tiles(result, self.analyze_tiles(ctx, scan_type))
+            with stage_timer('validation_wait', scan_type, ctx.timings):
+                is_valid, validation_msg, validation_status = self.collect_validation(pending_validation)
+            result["validation_message"] = validation_msg
+            result["image_validated"] = is_valid
+            result["validation_status"] = validation_status
+        finally:
+            self.tiers.end(scan_type, time.perf_counter() - started)
+        
+        # A model scan type whose model did not run (load or inference failed) fell back to CV
+        model_ran = scan_type not in MODEL_SPECS or ctx.model_used is not None
+        served_tier = ctx.model_tier if model_ran else TIER_CV
+        result["model_tier"] = served_tier
+        TIER_REQUESTS.labels(scan_type=scan_type, tier=served_tier).inc()
+        
+        # Only full-model results are cached, keyed on the model that actually ran;
+        # a skipped validation, a degraded tier or a CV fallback is never pinned
+        primary = served_tier == self.primary_tier(scan_type)
+        version = self.model_version(scan_type, ctx.model_used) if primary else None
+        if validation_status == "completed" and version is not None:
+            version += tile_version
+            cache_key = content_key(ctx.image, scan_type, version)
+            self.result_cache.put(cache_key, result, scan_type)
+            if self.near_duplicates.enabled:
+                if hashes is None:
+                    hashes, thumbnail = perceptual_hashes(ctx.gray), pixel_thumbnail(ctx.gray)
+                self.near_duplicates.add(hashes, scan_type, version, cache_key, thumbnail)
+        if near_duplicate is not None:
+            result["near_duplicate"] = near_duplicate
+        result["cache_hit"] = False
         return result
 
+    @staticmethod
+    def reference_summary(result, key):
+        """What a reference-mode response embeds about the earlier result it links"""
+        return {
+            'result_url': f"/results/{key}",
+            'result': {field: result.get(field) for field in ('status', 'detected_conditions', 'model_tier')},
+        }
+    
+    def analyze_bytes(self, image_bytes, scan_type, timings=None, tiled=None, frame=None, window=None,
+                      frame_stride=None, max_frames=None):
+        """Decode and analyze one uploaded image, recording stage timings (ms) into `timings`.
+        `tiled` forces tiled mode on or off; None uses SCANS_TILED_SCAN_TYPES.
+        `frame` / `window` (center, width) select and window a DICOM frame.
+        scan_type 'auto' routes the image to an analyzer with the scan type router.
+        Video clips go to analyze_heart_clip (`frame_stride` / `max_frames` sampling)."""
+        timings = timings if timings is not None else {}
+        auto = scan_type == 'auto'
+        label = scan_type if scan_type in self.scan_types or auto else 'unknown'
+        if is_video(image_bytes):
+            return self.analyze_clip_bytes(image_bytes, scan_type, label, timings, frame_stride, max_frames)
+        # The routed type is not known before decoding: keep full resolution if it may be tiled
+        full_res = bool(tiled or TILED_BY_DEFAULT) if auto else self.use_tiles(scan_type, tiled)
+        
+        # Memory accounting: an upload spooled to disk is only mapped (page cache), not held
+        storage, upload_size = upload_storage(image_bytes)
+        UPLOAD_BYTES.labels(storage=storage).observe(upload_size)
+        held = 0 if storage == 'disk' else upload_size
+        INFLIGHT_MEMORY.inc(held)
+        ctx = None
+        try:
+            with stage_timer('total', label, timings):
+                with stage_timer('decode', label, timings):
+                    # Tiles need the detail a reduced decode would throw away
+                    image, decode_info = self.decode(image_bytes, full_res=full_res, frame=frame, window=window)
+                if image is None:
+                    REQUESTS.labels(scan_type=label, outcome='invalid_image').inc()
+                    return {"error": decode_info.get("error", "Invalid image format")}
+                decode_info["upload"] = {"bytes": upload_size, "storage": storage}
+                INFLIGHT_MEMORY.inc(image.nbytes)
+                held += image.nbytes
+                
+                ctx = ScanContext(image, timings)
+                routing = self.route_scan_type(ctx) if auto else None
+                if auto:
+                    scan_type = routing['scan_type']
+                result = self.analyze_scan(ctx, scan_type, self.use_tiles(scan_type, tiled), routing)
+        finally:
+            INFLIGHT_MEMORY.dec(held)
+            if ctx is not None:
+                REQUEST_MEMORY.labels(scan_type=label).observe(held - ctx.image.nbytes + ctx.nbytes())
+        
+        if "error" in result:
+            REQUESTS.labels(scan_type=label, outcome='error').inc()
+            return result
+        REQUESTS.labels(scan_type=label, outcome='cache_hit' if result.get("cache_hit") else 'analyzed').inc()
+        if routing is not None:
+            return {"decode": decode_info, "routing": {**routing, "confident": routing['confidence'] >= ROUTER_MIN_CONFIDENCE}, **result}
+        return {"decode": decode_info, **result}
+    
+    def analyze_clip_bytes(self, source, scan_type, label, timings, frame_stride=None, max_frames=None):
+        """analyze_bytes for video uploads: heart cine / echo clips only"""
+        if scan_type != 'heart':
+            REQUESTS.labels(scan_type=label, outcome='invalid_image').inc()
+            return {"error": "Video clips are supported for heart scans only"}
+        storage, upload_size = upload_storage(source)
+        UPLOAD_BYTES.labels(storage=storage).observe(upload_size)
+        try:
+            with stage_timer('total', label, timings):
+                result = self.analyze_heart_clip(source, frame_stride, max_frames, timings)
+        except ValueError as e:
+            REQUESTS.labels(scan_type=label, outcome='invalid_image').inc()
+            return {"error": str(e)}
+        result["decode"]["upload"] = {"bytes": upload_size, "storage": storage}
+        REQUESTS.labels(scan_type=label, outcome='clip').inc()
+        return {"decode": result.pop("decode"), **result}
+    
+    def run_job(self, payload):
+        """Worker for /jobs: analyze one queued upload (a spool the job owns).
+        Jobs already wait in their own queue, so the scheduler never rejects them."""
+        upload, scan_type, options, priority = payload
+        timings = {}
+        try:
+            with self.scheduler.slot(priority, admit=False, scan_type=scan_type) as waited:
+                timings['queue_wait'] = round(waited * 1000, 3)
+                result = self.analyze_bytes(upload, scan_type, timings, **options)
+        finally:
+            upload.close()
+        return {**result, "timings": timings}
+    
+    def analyze_many(self, items, priority=None):
+        """Analyze (index, filename, image_bytes, scan_type) items on the batch pool.
+        
+        Yields one result dict per item in completion order. Items are pulled
+        lazily so at most 2x the pool size are held in memory at once; model
+        calls from concurrent items are grouped by the batching queues. Each
+        item waits for a scheduler slot of `priority` (default: its scan type's
+        class) but is never rejected.
+        """
+        def run(index, filename, image_bytes, scan_type):
+            started = time.perf_counter()
+            timings = {}
+            try:
+                if isinstance(image_bytes, BatchItemRejected):
+                    raise image_bytes
+                if scan_type not in self.scan_types and scan_type != 'auto':
+                    result = {"error": "Unsupported scan type"}
+                else:
+                    with self.scheduler.slot(self.scheduler.priority_for(scan_type, priority), admit=False,
+                                             scan_type=scan_type) as waited:
+                        timings['queue_wait'] = round(waited * 1000, 3)
+                        result = self.analyze_bytes(image_bytes, scan_type, timings)
+            except Exception as e:
+                result = {"error": str(e)}
+            return {
+                "index": index,
+                "filename": filename,
+                "success": "error" not in result,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                **result,
+                "timings": timings
+            }
+        
+        items = iter(items)
+        in_flight = set()
+        max_in_flight = BATCH_WORKERS * 2
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    break
+                in_flight.add(self.batch_executor.submit(run, *item))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
 analyzer = ScansAnalyzer()
+if not PREFORK_PARENT:
+    analyzer.start_warm_up()
 
 @app.route('/')
 def index():
@@ -644,6 +1642,10 @@ def index():
         </div>
         
         <div class="scan-types">
+            <div class="scan-card" onclick="selectScan('auto')">
+                <h3>🧭 Auto-detect</h3>
+                <p>Let the analyzer pick the scan type</p>
+            </div>
             <div class="scan-card" onclick="selectScan('mri')">
                 <h3>🧠 MRI Brain</h3>
                 <p>Tumors, lesions, brain structure</p>
@@ -675,7 +1677,7 @@ def index():
         </div>
         
         <div class="upload-area">
-            <input type="file" id="fileInput" accept="image/*" style="display: none;">
+            <input type="file" id="fileInput" accept="image/*,.dcm,application/dicom,video/*" style="display: none;">
             <button onclick="document.getElementById('fileInput').click()">Upload Scan Image</button>
             <p>Selected scan type: <span id="selectedType">None</span></p>
             <p>Supports: JPG, PNG, DICOM images</p>
@@ -753,6 +1755,50 @@ def index():
     </html>
     ''')
 
+def debug_timings_requested():
+    """Per-stage timings are added to responses when X-Debug-Timings is set"""
+    return request.headers.get('X-Debug-Timings', '').lower() in ('1', 'true', 'yes')
+
+def priority_requested():
+    """Priority class from the X-Scan-Priority header (urgent, normal, bulk); None when absent"""
+    return request.headers.get('X-Scan-Priority', '').strip().lower() or None
+
+def scheduler_busy(e):
+    """429 for a request the priority scheduler turned away"""
+    return jsonify({'error': str(e), 'priority': e.priority}), 429, {'Retry-After': str(e.retry_after)}
+
+def tiled_requested():
+    """tiled=1/0 form field; None when absent (use the configured default)"""
+    value = request.form.get('tiled')
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+def upload_options():
+    """Optional analyze_bytes arguments from the form: tiled, DICOM frame and window,
+    video frame_stride and max_frames"""
+    options = {'tiled': tiled_requested()}
+    for field in ('frame_stride', 'max_frames'):
+        if request.form.get(field):
+            options[field] = int(request.form[field])
+    if request.form.get('frame'):
+        options['frame'] = int(request.form['frame'])
+    if request.form.get('window_center') and request.form.get('window_width'):
+        options['window'] = (float(request.form['window_center']), float(request.form['window_width']))
+    return options
+
+@app.before_request
+def reject_oversized_upload():
+    """413 from Content-Length alone, before any of the body is read or spooled"""
+    limit = app.config['MAX_CONTENT_LENGTH']
+    if limit and request.content_length and request.content_length > limit:
+        return jsonify({'error': f'Upload exceeds the {MAX_UPLOAD_MB:g} MB limit'}), 413
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    """Bodies without a Content-Length are cut off by werkzeug at the same limit"""
+    return jsonify({'error': f'Upload exceeds the {MAX_UPLOAD_MB:g} MB limit'}), 413
+
 @app.route('/analyze', methods=['POST'])
 def analyze_scan():
     try:
@@ -768,50 +1814,313 @@ def analyze_scan():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        # Read image
-        image_bytes = file.read()
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return jsonify({'error': 'Invalid image format'}), 400
-        
-        # Analyze scan
-        result = analyzer.analyze_scan(image, scan_type)
-        
-        return jsonify({
+        try:
+            options = upload_options()
+        except ValueError:
+            return jsonify({'error': 'frame, window_center, window_width, frame_stride and max_frames must be numbers'}), 400
+        if is_dicom(file.stream) and not dicom_available():
+            return jsonify({'error': DICOM_UNAVAILABLE}), 415
+        
+        # Read image (reduced-resolution decode for oversized uploads, DICOM memory-mapped
+        # from werkzeug's spooled upload one frame at a time) and analyze
+        timings = {}
+        priority = analyzer.scheduler.priority_for(scan_type, priority_requested())
+        with analyzer.scheduler.slot(priority, scan_type=scan_type) as waited:
+            timings['queue_wait'] = round(waited * 1000, 3)
+            result = analyzer.analyze_bytes(file.stream, scan_type, timings, **options)
+        
+        if 'error' in result:
+            return jsonify(result), 400
+        
+        response = {
             'success': True,
             'filename': file.filename,
             **result
-        })
-        
+        }
+        if debug_timings_requested():
+            response['timings'] = timings
+        return jsonify(response)
+        
+    except SchedulerBusy as e:
+        return scheduler_busy(e)
+    except RequestEntityTooLarge as e:
+        return upload_too_large(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def batch_scan_type_lookup(default_scan_type):
+    """Per-file scan types from the 'scan_types' form field (JSON object or list)"""
+    raw = request.form.get('scan_types')
+    mapping = json.loads(raw) if raw else {}
+    
+    if not isinstance(mapping, (dict, list)):
+        raise ValueError('scan_types must be a JSON object or list')
+    
+    def lookup(index, filename):
+        if isinstance(mapping, list):
+            return mapping[index] if index < len(mapping) else default_scan_type
+        return mapping.get(filename, mapping.get(os.path.basename(filename), default_scan_type))
+    return lookup
+
+class BatchItemRejected(ValueError):
+    """Stands in for the bytes of a batch item that is not analyzed (reported as its error)"""
+
+def iter_batch_uploads(uploads, scan_type_for):
+    """Yield (index, filename, bytes or stream, scan_type) for plain files and zip archive members.
+    Zip members over the size limits are yielded as BatchItemRejected instead of being inflated;
+    zipfile never inflates past a member's declared size, so checking it bounds the memory"""
+    index = 0
+    unzipped = 0
+    member_limit = int(BATCH_MAX_MEMBER_MB * 1024 * 1024)
+    total_limit = int(BATCH_MAX_UNZIPPED_MB * 1024 * 1024)
+    for filename, stream in uploads:
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(stream) as archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not member.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    if index >= BATCH_MAX_FILES:
+                        return
+                    if member.file_size > member_limit:
+                        content = BatchItemRejected(f"Zip member exceeds the {BATCH_MAX_MEMBER_MB:g} MB limit uncompressed")
+                    elif unzipped + member.file_size > total_limit:
+                        content = BatchItemRejected(f"Zip members exceed the {BATCH_MAX_UNZIPPED_MB:g} MB limit uncompressed")
+                    else:
+                        unzipped += member.file_size
+                        content = archive.read(member)
+                    yield index, member.filename, content, scan_type_for(index, member.filename)
+                    index += 1
+        else:
+            if index >= BATCH_MAX_FILES:
+                return
+            yield index, filename, stream, scan_type_for(index, filename)
+            index += 1
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze many images (files and/or zip archives), streaming NDJSON results"""
+    uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not uploads:
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    try:
+        scan_type_for = batch_scan_type_lookup(request.form.get('scan_type'))
+    except ValueError:
+        return jsonify({'error': 'scan_types must be a JSON object or list'}), 400
+    
+    # Werkzeug closes request.files once the view returns, so keep our own
+    # spooled copies alive for the streaming generator
+    spooled = [
+        (upload.filename, spool_stream(upload.stream, SpooledRequest.spool_max_size, UPLOAD_TMP_DIR))
+        for upload in uploads
+    ]
+    
+    include_timings = debug_timings_requested()
+    priority = priority_requested()
+    
+    def generate():
+        started = time.perf_counter()
+        succeeded = failed = 0
+        try:
+            for result in analyzer.analyze_many(iter_batch_uploads(spooled, scan_type_for), priority):
+                if not include_timings:
+                    result.pop('timings', None)
+                if result['success']:
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield json.dumps(result) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+        finally:
+            for _, spool in spooled:
+                spool.close()
+        yield json.dumps({
+            'done': True,
+            'total': succeeded + failed,
+            'succeeded': succeeded,
+            'failed': failed,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/analyze/volume', methods=['POST'])
+def analyze_volume():
+    """Analyze a whole MRI slice stack (.npy array or multi-frame DICOM) in one request"""
+    if 'file' not in request.files or request.files['file'].filename == '':
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    stream = request.files['file'].stream
+    try:
+        stride = max(1, int(request.form.get('slice_stride', 1)))
+        max_slices = min(int(request.form.get('max_slices', VOLUME_MAX_SLICES)), VOLUME_MAX_SLICES)
+    except ValueError:
+        return jsonify({'error': 'slice_stride and max_slices must be integers'}), 400
+    if is_dicom(stream) and not dicom_available():
+        return jsonify({'error': DICOM_UNAVAILABLE}), 415
+    
+    timings = {}
+    try:
+        with analyzer.scheduler.slot(analyzer.scheduler.priority_for('mri', priority_requested()), scan_type='mri') as waited, \
+                stage_timer('volume_total', 'mri', timings):
+            timings['queue_wait'] = round(waited * 1000, 3)
+            if is_dicom(stream):
+                with open_dicom_frames(stream, stride, max_slices) as (source, frames):
+                    result = analyzer.analyze_mri_volume(iter_frame_chunks(frames, VOLUME_CHUNK), timings)
+            else:
+                volume = load_npy_volume(stream)
+                source = {'format': 'npy', 'shape': list(volume.shape), 'dtype': str(volume.dtype)}
+                result = analyzer.analyze_mri_volume(
+                    iter_array_chunks(volume, VOLUME_CHUNK, stride, max_slices), timings
+                )
+    except SchedulerBusy as e:
+        return scheduler_busy(e)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    REQUESTS.labels(scan_type='mri', outcome='volume').inc()
+    response = {'success': True, 'source': {**source, 'slice_stride': stride}, **result}
+    if debug_timings_requested():
+        response['timings'] = timings
+    return jsonify(response)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis and return a job id to poll at /jobs/<id>"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    file = request.files['file']
+    scan_type = request.form.get('scan_type')
+    webhook_url = request.form.get('webhook_url')
+    
+    if not scan_type:
+        return jsonify({'error': 'Scan type not specified'}), 400
+    if scan_type not in analyzer.scan_types and scan_type != 'auto':
+        return jsonify({'error': f'Unsupported scan type: {scan_type}'}), 400
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    if webhook_url and not analyzer.jobs.valid_webhook(webhook_url):
+        return jsonify({'error': 'webhook_url must be an http(s) URL of a public host or of one in SCANS_JOB_WEBHOOK_ALLOW_HOSTS'}), 400
+    try:
+        options = upload_options()
+    except ValueError:
+        return jsonify({'error': 'frame, window_center, window_width, frame_stride and max_frames must be numbers'}), 400
+    if is_dicom(file.stream) and not dicom_available():
+        return jsonify({'error': DICOM_UNAVAILABLE}), 415
+    
+    # Queued jobs outlive the request: keep our own spool (on disk past the spool threshold)
+    upload = spool_stream(file.stream, SpooledRequest.spool_max_size, UPLOAD_TMP_DIR)
+    try:
+        priority = analyzer.scheduler.priority_for(scan_type, priority_requested())
+        job = analyzer.jobs.submit(
+            (upload, scan_type, options, priority),
+            webhook_url=webhook_url,
+            metadata={'filename': file.filename, 'scan_type': scan_type, 'priority': priority}
+        )
+    except JobQueueFull as e:
+        upload.close()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/jobs/{job['id']}"
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = analyzer.jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+@app.route('/results/<key>')
+def cached_result(key):
+    """A cached result by key, e.g. the one a near-duplicate response links to"""
+    result = analyzer.result_cache.get(key)
+    if result is None:
+        return jsonify({'error': 'Unknown or expired result'}), 404
+    return jsonify(result)
+
+@app.route('/jobs')
+def jobs_status():
+    """Queue depth, worker count and average queued / running times"""
+    return jsonify(analyzer.jobs.stats())
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: per-stage latency histograms labelled by scan_type"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.route('/health')
 def health():
     return jsonify({
         'status': 'healthy', 
+        'ready': analyzer.ready.is_set(),
+        'pid': os.getpid(),
         'service': 'scans-analyzer',
-        'loaded_models': list(analyzer.models.keys()),
-        'total_models': len(analyzer.models),
-        'supported_scans': list(analyzer.scan_types.keys())
+        'loaded_models': analyzer.model_manager.resident(),
+        'total_models': len(analyzer.model_manager.resident()),
+        'supported_scans': list(analyzer.scan_types.keys()),
+        'dicom_support': dicom_available(),
+        'model_residency': analyzer.model_manager.stats(),
+        'shared_weights': {'enabled': SHARED_WEIGHTS, 'models': analyzer.weight_reports},
+        'process_memory': process_memory(),
+        'result_cache': analyzer.result_cache.stats(),
+        'near_duplicates': analyzer.near_duplicates.stats(),
+        'scan_router': analyzer.scan_router.stats(),
+        'model_tiers': analyzer.tiers.stats(),
+        'jobs': analyzer.jobs.stats(),
+        'scheduler': analyzer.scheduler.stats(),
+        'cv_workspaces': WORKSPACES.stats(),
+        'warmup': analyzer.warmup_report
     })
 
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 only once warm-up has finished"""
+    if not analyzer.ready.is_set():
+        return jsonify({'ready': False, 'warmup': analyzer.warmup_report}), 503
+    return jsonify({'ready': True, 'warmup': analyzer.warmup_report})
+
 @app.route('/models')
 def models_status():
     return jsonify({
-        'loaded_ai_models': list(analyzer.models.keys()),
-        'total_ai_models': len(analyzer.models),
+        'loaded_ai_models': analyzer.model_manager.resident(),
+        'total_ai_models': len(analyzer.model_manager.resident()),
         'scan_types': analyzer.scan_types,
         'model_details': {
-            'chest': 'Borjamg/pneumonia_model (Pneumonia Detection)' if 'chest' in analyzer.models else 'Advanced Computer Vision',
-            'skin': 'ViT Skin Lesion Classifier (12 types)' if 'skin' in analyzer.models else 'ABCDE Analysis + Computer Vision',
-            'mri': 'Vision Transformer (Brain Analysis)' if 'mri' in analyzer.models else 'Advanced Computer Vision',
+            **{
+                scan_type: spec['description'] if analyzer.has_model(scan_type) else spec['fallback']
+                for scan_type, spec in MODEL_SPECS.items()
+            },
             'xray': 'Advanced Computer Vision (Fracture + Bone Analysis)',
             'kidney': 'Advanced Computer Vision (Cyst + Stone Detection)',
             'heart': 'Advanced Computer Vision (Cardiomegaly Detection)',
             'liver': 'Advanced Computer Vision (Fatty Liver + Texture Analysis)'
+        },
+        'batching': {
+            scan_type: batcher.stats() for scan_type, batcher in analyzer.batchers.items()
+        },
+        'model_residency': analyzer.model_manager.stats(),
+        'model_tiers': {
+            scan_type: {
+                tier: MODEL_TIER_SPECS[tier_key(scan_type, tier, MODEL_SPECS)]['candidates'] if tier != TIER_CV else None
+                for tier in tier_ladder(spec)
+            }
+            for scan_type, spec in MODEL_SPECS.items()
+        },
+        'inference_backends': {
+            scan_type: {
+                'configured': INFERENCE_BACKENDS.get(scan_type, 'torch'),
+                **analyzer.backend_reports.get(scan_type, {})
+            }
+            for scan_type in MODEL_SPECS
         }
     })
 
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""Reproducible latency / throughput / memory benchmark for the scans analyzer.
+
+Examples:
+    python benchmark.py                                  # stubbed models, all stages
+    python benchmark.py --models real --resolutions 224,1024
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json --max-regression 0.2
+    python benchmark.py --target http://localhost:5003 --concurrency 16 --resolutions 512
+    python benchmark.py --serve-compare 4 --scan-type liver --resolutions 512,1024
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    '224': (224, 224),
+    '512': (512, 512),
+    '1024': (1024, 1024),
+    '2048': (2048, 1536),
+    '4k': (3840, 2160),
+}
+SCAN_TYPES = ['mri', 'xray', 'chest', 'kidney', 'heart', 'skin', 'liver']
+
+
+class StubPipeline:
+    """Stands in for an HF image-classification pipeline with a fixed per-batch cost"""
+
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+
+    def __call__(self, images, batch_size=None, **kwargs):
+        single = not isinstance(images, list)
+        batch = [images] if single else images
+        time.sleep(self.latency_ms / 1000.0)
+        results = [[{'label': 'NORMAL', 'score': 0.9}, {'label': 'PNEUMONIA', 'score': 0.1}] for _ in batch]
+        return results[0] if single else results
+
+
+def synthetic_scan(width, height, seed):
+    """Grayscale-ish scan with soft blobs, an edge and sensor noise"""
+    rng = np.random.RandomState(seed)
+    image = np.zeros((height, width, 3), np.uint8)
+    for _ in range(6):
+        center = (int(rng.randint(0, width)), int(rng.randint(0, height)))
+        radius = int(rng.randint(min(width, height) // 16, min(width, height) // 4))
+        shade = int(rng.randint(60, 220))
+        cv2.circle(image, center, radius, (shade, shade, shade), -1)
+    image = cv2.GaussianBlur(image, (0, 0), max(1, min(width, height) // 100))
+    cv2.line(image, (0, height // 3), (width - 1, 2 * height // 3), (255, 255, 255), max(1, width // 300))
+    noise = rng.randint(0, 25, image.shape).astype(np.uint8)
+    return cv2.add(image, noise)
+
+
+def rss_mb():
+    """Current resident set size"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def allocated_kb(fn):
+    """Peak Python-tracked allocations (numpy / OpenCV arrays included) of one call"""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def legacy_cv_chain(image):
+    """The x-ray preprocessing + edge chain before the per-scan-type pipelines, for comparison:
+    a new CLAHE object per call, float64 views and a float64 Sobel"""
+    from utils.features import RegionStats
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    enhanced = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    processed = cv2.resize(enhanced, (224, 224)) / 255.0
+    view = (processed * 255).astype(np.uint8)
+    RegionStats(processed).count('>', 0.7)
+    blurred = cv2.GaussianBlur(view, (5, 5), 0)
+    sobel = np.uint8(np.absolute(cv2.Sobel(blurred, cv2.CV_64F, 1, 1, ksize=3)))
+    return cv2.bitwise_or(cv2.Canny(blurred, 50, 150), sobel)
+
+
+def measure(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+
+    peak_before = peak_rss_mb()
+    rss_before = rss_mb()
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            errors += 1
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies)
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'throughput_per_s': round(iterations / elapsed, 2) if elapsed else None,
+        'rss_mb': round(rss_mb(), 1),
+        'rss_delta_mb': round(rss_mb() - rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_growth_mb': round(peak_rss_mb() - peak_before, 1),
+        'alloc_peak_kb': allocated_kb(fn),
+    }
+
+
+def load_app(models, stub_latency_ms):
+    """Import the Flask app with real, stubbed or no HF models and no result caching"""
+    if models != 'real':
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    # The benchmark does its own warm-up per stage
+    os.environ.setdefault('SCANS_WARMUP', '0')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as scans_app
+    from utils.result_cache import ResultCache
+
+    if models == 'stub':
+        scans_app.pipeline = lambda *args, **kwargs: StubPipeline(stub_latency_ms)
+    elif models == 'none':
+        def unavailable(*args, **kwargs):
+            raise RuntimeError('models disabled for benchmark')
+        scans_app.pipeline = unavailable
+
+    # Every iteration must do the full work
+    scans_app.analyzer.result_cache = ResultCache(max_entries=0)
+    return scans_app
+
+
+def http_load(url, image_bytes, scan_type, concurrency, duration_s, server_cores):
+    """Closed-loop load: `concurrency` clients POST /analyze back-to-back for `duration_s`"""
+    import requests
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration_s
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                response = session.post(f"{url.rstrip('/')}/analyze", data={'scan_type': scan_type},
+                                        files={'file': ('scan.jpg', image_bytes)}, timeout=60)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += not ok
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies or [0.0])
+    throughput = len(latencies) / elapsed
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'concurrency': concurrency,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'throughput_per_s': round(throughput, 2),
+        'server_cores': server_cores,
+        'throughput_per_core': round(throughput / server_cores, 2),
+    }
+
+
+def run_http_benchmarks(args):
+    """Benchmark a running server (app.py or serve.py) over HTTP"""
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'target': args.target,
+            'scan_type': args.scan_type,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'server_cores': args.server_cores,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': {},
+    }
+    for resolution in args.resolutions.split(','):
+        width, height = RESOLUTIONS[resolution]
+        image = synthetic_scan(width, height, seed=args.seed)
+        jpg_bytes = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+        stats = http_load(args.target, jpg_bytes, args.scan_type, args.concurrency, args.duration, args.server_cores)
+        report['results'][resolution] = {'http_analyze': stats}
+        print(f"📐 {resolution} ({width}x{height})  {stats['throughput_per_s']:.1f} req/s  "
+              f"{stats['throughput_per_core']:.1f} req/s/core  p95={stats['p95_ms']:.1f} ms", file=sys.stderr)
+    return report
+
+
+def wait_ready(url, process, timeout_s=600):
+    import requests
+
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{url}/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server not ready after {timeout_s:.0f} s")
+
+
+def run_serve_comparison(args):
+    """Start serve.py with one worker, then with --serve-compare workers, and load-test each.
+
+    One serve.py worker is the single-process baseline: same threaded server,
+    without app.py's debug reloader. The result cache is off so every request
+    does the full work.
+    """
+    url = f"http://127.0.0.1:{args.port}"
+    args.target = url
+    env = {**os.environ, 'SCANS_CACHE_MAX_ENTRIES': '0'}
+    report = {'meta': {'server_cores': args.server_cores, 'cpu_count': os.cpu_count()}}
+    for label, workers in (('single', 1), ('prefork', args.serve_compare)):
+        command = [sys.executable, 'serve.py', '--workers', str(workers), '--port', str(args.port),
+                   '--preload', args.preload]
+        print(f"🚀 {label}: {' '.join(command[1:])}", file=sys.stderr)
+        server = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                                  stdout=subprocess.DEVNULL, start_new_session=True)
+        try:
+            wait_ready(url, server)
+            report[label] = run_http_benchmarks(args)
+            report[label]['meta']['workers'] = workers
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+    report['prefork_speedup'] = {
+        resolution: round(report['prefork']['results'][resolution]['http_analyze']['throughput_per_s']
+                          / max(stats['http_analyze']['throughput_per_s'], 1e-9), 2)
+        for resolution, stats in report['single']['results'].items()
+    }
+    for resolution, speedup in report['prefork_speedup'].items():
+        print(f"📐 {resolution}  {args.serve_compare} workers = {speedup:.2f}x one worker", file=sys.stderr)
+    return report
+
+
+def run_benchmarks(args):
+    scans_app = load_app(args.models, args.stub_latency_ms)
+    analyzer = scans_app.analyzer
+    from utils.preprocessing import WORKSPACES, ScanContext
+
+    client = scans_app.app.test_client()
+    stages = set(args.stages.split(','))
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'models': args.models,
+            'stub_latency_ms': args.stub_latency_ms if args.models == 'stub' else None,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': {},
+    }
+
+    for resolution in args.resolutions.split(','):
+        width, height = RESOLUTIONS[resolution]
+        image = synthetic_scan(width, height, seed=args.seed)
+        png_bytes = cv2.imencode('.png', image)[1].tobytes()
+        jpg_bytes = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+        results = report['results'].setdefault(resolution, {})
+        print(f"📐 {resolution} ({width}x{height})", file=sys.stderr)
+
+        def record(name, fn):
+            results[name] = measure(fn, args.iterations, args.warmup)
+            print(f"   {name:<28} p50={results[name]['p50_ms']:>9.2f} ms  p95={results[name]['p95_ms']:>9.2f} ms  "
+                  f"alloc={results[name]['alloc_peak_kb']:>9.1f} kB", file=sys.stderr)
+
+        if 'decode' in stages:
+            record('decode_png_full', lambda: cv2.imdecode(np.frombuffer(png_bytes, np.uint8), cv2.IMREAD_COLOR))
+            record('decode_jpeg_full', lambda: cv2.imdecode(np.frombuffer(jpg_bytes, np.uint8), cv2.IMREAD_COLOR))
+            record('decode_jpeg', lambda: analyzer.decode(jpg_bytes))
+
+        decoded, _ = analyzer.decode(jpg_bytes)
+
+        if 'preprocess' in stages:
+            record('preprocess', lambda: ScanContext(decoded).processed('chest'))
+
+        if 'cv' in stages:
+            from utils.preprocessing import pipeline_for
+
+            def cv_chain():
+                with WORKSPACES.checkout():
+                    ctx = ScanContext(decoded)
+                    ctx.features('xray').count('>', 0.7)
+                    return pipeline_for('xray').edges(ctx.processed_uint8('xray'))
+            record('cv_chain_legacy', lambda: legacy_cv_chain(decoded))
+            record('cv_chain', cv_chain)
+
+        if 'validate' in stages:
+            record('validate_scan_type', lambda: analyzer.validate_scan_type(ScanContext(decoded), 'mri'))
+            record('scan_type_router', lambda: analyzer.scan_router.route(decoded))
+
+        if 'analyze' in stages:
+            for scan_type in SCAN_TYPES:
+                analyze = getattr(analyzer, f'analyze_{scan_type}')
+                record(f'analyze_{scan_type}', lambda analyze=analyze: WORKSPACES.run(analyze, ScanContext(decoded)))
+
+        if 'route' in stages:
+            def post():
+                response = client.post('/analyze', data={
+                    'scan_type': 'chest',
+                    'file': (io.BytesIO(jpg_bytes), 'scan.jpg'),
+                })
+                if response.status_code != 200:
+                    raise RuntimeError(response.get_json())
+            record('route_analyze', post)
+
+    return report
+
+
+def compare(report, baseline_path, max_regression):
+    """Return the stages whose p95 regressed by more than max_regression vs the baseline"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = []
+    for resolution, stages in report['results'].items():
+        for stage, stats in stages.items():
+            previous = baseline.get(resolution, {}).get(stage)
+            if not previous or not previous['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms']
+            if change > max_regression:
+                regressions.append({
+                    'resolution': resolution,
+                    'stage': stage,
+                    'baseline_p95_ms': previous['p95_ms'],
+                    'p95_ms': stats['p95_ms'],
+                    'change': round(change, 3),
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scans analyzer')
+    parser.add_argument('--models', choices=['stub', 'real', 'none'], default='stub',
+                        help='HF models: stubbed with fixed latency, real downloads, or CV only')
+    parser.add_argument('--stub-latency-ms', type=float, default=30.0)
+    parser.add_argument('--resolutions', default=','.join(RESOLUTIONS))
+    parser.add_argument('--stages', default='decode,preprocess,cv,validate,analyze,route')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target', help='Load-test a running server at this URL instead of benchmarking in-process')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent HTTP clients for --target')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of load per resolution for --target')
+    parser.add_argument('--scan-type', default='chest', help='scan_type posted with --target')
+    parser.add_argument('--serve-compare', type=int, metavar='WORKERS',
+                        help='Start serve.py with 1 and then WORKERS workers and load-test both')
+    parser.add_argument('--port', type=int, default=5013, help='Port for the servers started by --serve-compare')
+    parser.add_argument('--preload', default='all', help='serve.py --preload for --serve-compare')
+    parser.add_argument('--server-cores', type=int, default=os.cpu_count() or 1,
+                        help='Cores available to the server, for req/s per core')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='Baseline JSON report to check for p95 regressions')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed relative p95 increase before failing (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    # The service logs to stdout; keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.serve_compare:
+            report = run_serve_comparison(args)
+        elif args.target:
+            report = run_http_benchmarks(args)
+        else:
+            report = run_benchmarks(args)
+
+    exit_code = 0
+    if args.compare:
+        report['regressions'] = compare(report, args.compare, args.max_regression)
+        if report['regressions']:
+            print(f"❌ {len(report['regressions'])} stage(s) regressed beyond {args.max_regression:.0%}", file=sys.stderr)
+            exit_code = 1
+        else:
+            print("✅ No p95 regressions against baseline", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output)
+        print(f"📄 Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Pre-forked production entry point for the scans analyzer.
+
+The parent loads the Hugging Face models once, freezes the GC so its objects
+are never written to again, then forks N workers that share the weights
+copy-on-write. The tensors are memory-mapped from the weights cache, so
+models that a worker loads later are shared too. Every worker accepts
+connections from the same listening socket (the kernel spreads them) and
+gets cpu_count / N torch threads.
+
+Examples:
+    python serve.py                      # one worker per core, all models preloaded
+    python serve.py --workers 4 --port 5003
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Serve the scans analyzer from pre-forked worker processes')
+    parser.add_argument('--host', default=os.getenv('SCANS_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SCANS_PORT', '5003')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SCANS_SERVE_WORKERS', str(cpu_count))))
+    parser.add_argument('--torch-threads', type=int, default=int(os.getenv('SCANS_TORCH_THREADS', '0')),
+                        help='Intra-op threads per worker (default: cpu_count / workers)')
+    parser.add_argument('--preload', default=os.getenv('SCANS_PRELOAD_MODELS', 'all'),
+                        help="Scan types whose models the parent loads before forking ('all' or 'none')")
+    parser.add_argument('--backlog', type=int, default=128)
+    args = parser.parse_args()
+    args.workers = max(1, args.workers)
+    args.torch_threads = args.torch_threads or max(1, cpu_count // args.workers)
+    return args
+
+
+def listen(host, port, backlog):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(scans_app, sock, args):
+    """Child process: rebuild per-process state, warm up, serve until SIGTERM"""
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl-C
+
+    scans_app.analyzer.reset_after_fork(args.torch_threads)
+    scans_app.analyzer.start_warm_up()
+
+    server = make_server(args.host, args.port, scans_app.app, threaded=True, fd=sock.fileno())
+    print(f"👷 Worker {os.getpid()} serving ({args.torch_threads} torch threads)")
+    server.serve_forever()
+
+
+def main():
+    args = parse_args()
+
+    # Metrics from every worker are aggregated through files in this directory;
+    # it has to be set before prometheus_client is imported
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    owns_metrics_dir = not metrics_dir
+    if owns_metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix='scans-metrics-')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+
+    # Jobs run in the worker that accepted them, but a poll can reach any worker:
+    # job states go to one sqlite file they all read. The same goes for cached
+    # results, which near-duplicate responses link to by key
+    state_dir = None
+    for variable, filename in (('SCANS_JOB_DB', 'jobs.db'), ('SCANS_CACHE_DB', 'results.db')):
+        if not os.environ.get(variable):
+            state_dir = state_dir or tempfile.mkdtemp(prefix='scans-state-')
+            os.environ[variable] = os.path.join(state_dir, filename)
+
+    os.environ['SCANS_PREFORK_PARENT'] = '1'
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as scans_app
+    from prometheus_client import multiprocess
+
+    if args.preload != 'none':
+        scan_types = None if args.preload == 'all' else [t for t in args.preload.split(',') if t]
+        scans_app.analyzer.load_models(scan_types)
+
+    sock = listen(args.host, args.port, args.backlog)
+
+    # Move everything allocated so far out of the collector's reach: GC passes
+    # in the workers would otherwise touch (and so copy) the parent's pages
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(scans_app, sock, args)
+            except SystemExit as e:
+                code = e.code or 0
+            except Exception as e:
+                print(f"❌ Worker {os.getpid()} crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = time.time()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"🚀 Pre-fork server on {args.host}:{args.port}: {args.workers} workers x {args.torch_threads} torch threads, "
+          f"models {scans_app.analyzer.model_manager.resident()}")
+    for _ in range(args.workers):
+        spawn()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        multiprocess.mark_process_dead(pid)
+        if stopping or started is None:
+            continue
+        print(f"⚠️ Worker {pid} exited (status {status}), restarting")
+        # Back off when workers die right after starting
+        if time.time() - started < 1:
+            time.sleep(1)
+        spawn()
+
+    sock.close()
+    if owns_metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    if state_dir:
+        shutil.rmtree(state_dir, ignore_errors=True)
+    print("👋 Pre-fork server stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import cv2
+import pytest
+
+# Offline, no warm-up, no OCR wait: set before the app module is imported
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('SCANS_WARMUP', '0')
+os.environ.setdefault('SCANS_OCR_TIMEOUT_S', '0')
+os.environ.setdefault('SCANS_SHARED_WEIGHTS', '0')
+os.environ.setdefault('SCANS_CACHE_DB', '')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import StubPipeline, synthetic_scan  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def scans_app():
+    import app
+    return app
+
+
+@pytest.fixture
+def analyzer(scans_app, monkeypatch):
+    """The app's analyzer with an empty result cache, near-duplicate index and
+    model manager; models come from `stub_models` (default: every load fails)"""
+    from utils.model_manager import ModelManager
+    from utils.near_duplicates import NearDuplicateIndex
+    from utils.result_cache import ResultCache
+
+    instance = scans_app.analyzer
+    monkeypatch.setattr(instance, 'result_cache', ResultCache(max_entries=64))
+    monkeypatch.setattr(instance, 'near_duplicates', NearDuplicateIndex(
+        max_distance=scans_app.NEAR_DUP_MAX_DISTANCE,
+        max_dhash_distance=scans_app.NEAR_DUP_MAX_DHASH_DISTANCE,
+        max_entries=100
+    ))
+    monkeypatch.setattr(instance, 'model_manager', ModelManager(scans_app.MODEL_TIER_SPECS, instance.load_model))
+    monkeypatch.setattr(scans_app, 'pipeline', unavailable_pipeline)
+    return instance
+
+
+def unavailable_pipeline(*args, model=None, **kwargs):
+    raise RuntimeError(f"{model} unavailable in tests")
+
+
+@pytest.fixture
+def stub_models(scans_app, analyzer, monkeypatch):
+    """Serve stub HF pipelines; models named in the returned set fail to load"""
+    failing = set()
+
+    def pipeline(*args, model=None, **kwargs):
+        if model in failing:
+            raise RuntimeError(f"{model} failed to load")
+        return StubPipeline(0)
+
+    monkeypatch.setattr(scans_app, 'pipeline', pipeline)
+    return failing
+
+
+@pytest.fixture
+def client(scans_app, analyzer):
+    return scans_app.app.test_client()
+
+
+@pytest.fixture
+def scan_image():
+    return synthetic_scan(256, 256, 1)
+
+
+@pytest.fixture
+def scan_png(scan_image):
+    return cv2.imencode('.png', scan_image)[1].tobytes()
@@ -0,0 +1,74 @@
+# tests/test_batch.py
+
+import io
+import json
+import zipfile
+
+import pytest
+
+
+def post_batch(client, files, **form):
+    return client.post('/analyze/batch', data={'scan_type': 'liver', **form, 'files': files})
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def zip_of(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('scan_types', ['"abc"', '3', 'null', 'true', '{not json'])
+def test_scan_types_must_be_an_object_or_list(client, scan_png, scan_types):
+    response = post_batch(client, [(io.BytesIO(scan_png), 'a.png')], scan_types=scan_types)
+    assert response.status_code == 400
+    assert 'scan_types' in response.get_json()['error']
+
+
+def test_scan_types_list_and_object_are_accepted(client, scan_png):
+    for scan_types in ('["liver"]', '{"a.png": "liver"}'):
+        lines = ndjson(post_batch(client, [(io.BytesIO(scan_png), 'a.png')], scan_types=scan_types))
+        assert lines[0]['success'] is True
+        assert lines[-1]['done'] is True
+
+
+def test_no_files_is_rejected(client):
+    assert client.post('/analyze/batch', data={'scan_type': 'liver'}).status_code == 400
+
+
+def test_oversized_zip_member_is_rejected_without_inflating(scans_app, client, scan_png, monkeypatch):
+    monkeypatch.setattr(scans_app, 'BATCH_MAX_MEMBER_MB', 1)
+    archive = zip_of({'scan.png': scan_png, 'bomb.png': b'\0' * (8 << 20)})
+    assert len(archive) < (1 << 20)
+
+    lines = ndjson(post_batch(client, [(io.BytesIO(archive), 'scans.zip')]))
+    results = {line['filename']: line for line in lines if 'filename' in line}
+    assert results['scan.png']['success'] is True
+    assert results['bomb.png']['success'] is False
+    assert 'limit' in results['bomb.png']['error']
+    assert (lines[-1]['succeeded'], lines[-1]['failed']) == (1, 1)
+
+
+def test_total_unzipped_bytes_are_capped(scans_app, client, scan_png, monkeypatch):
+    monkeypatch.setattr(scans_app, 'BATCH_MAX_UNZIPPED_MB', 1.5 * len(scan_png) / (1024 * 1024))
+    archive = zip_of({'a.png': scan_png, 'b.png': scan_png, 'c.png': scan_png})
+
+    lines = ndjson(post_batch(client, [(io.BytesIO(archive), 'scans.zip')]))
+    assert sorted(line['success'] for line in lines if 'filename' in line) == [False, False, True]
+    assert lines[-1]['failed'] == 2
+
+
+def test_member_over_the_limit_is_never_read(scans_app, scan_png, monkeypatch):
+    monkeypatch.setattr(scans_app, 'BATCH_MAX_MEMBER_MB', 1)
+    archive = zip_of({'bomb.png': b'\0' * (4 << 20)})
+    read = []
+    monkeypatch.setattr(zipfile.ZipFile, 'read', lambda self, member, pwd=None: read.append(member))
+
+    items = list(scans_app.iter_batch_uploads([('scans.zip', io.BytesIO(archive))], lambda index, name: 'liver'))
+    assert len(items) == 1 and isinstance(items[0][2], scans_app.BatchItemRejected)
+    assert read == []
@@ -0,0 +1,153 @@
+# tests/test_batching.py
+
+import threading
+import time
+
+import pytest
+
+from utils.batching import BatchingQueue
+
+
+class RecordingInfer:
+    """infer_fn that records each batch and echoes its items back, optionally slowly or failing"""
+
+    def __init__(self, delay_s=0.0, error=None):
+        self.batches = []
+        self.delay_s = delay_s
+        self.error = error
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        time.sleep(self.delay_s)
+        if self.error:
+            raise self.error
+        return [f"result-{item}" for item in items]
+
+
+def submit_all(queue, items):
+    return [queue.submit(item) for item in items]
+
+
+def test_items_within_the_window_form_one_batch():
+    infer = RecordingInfer()
+    queue = BatchingQueue('test', infer, window_ms=200, max_batch=8)
+
+    futures = submit_all(queue, range(3))
+
+    assert [future.result(timeout=2) for future in futures] == ['result-0', 'result-1', 'result-2']
+    assert infer.batches == [[0, 1, 2]]
+
+
+def test_batch_is_dispatched_at_max_size_before_the_window_closes():
+    infer = RecordingInfer()
+    queue = BatchingQueue('test', infer, window_ms=5000, max_batch=4)
+
+    started = time.perf_counter()
+    futures = submit_all(queue, range(4))
+    for future in futures:
+        future.result(timeout=2)
+
+    assert time.perf_counter() - started < 2
+    assert infer.batches == [[0, 1, 2, 3]]
+
+
+def test_window_closes_a_partial_batch():
+    infer = RecordingInfer()
+    queue = BatchingQueue('test', infer, window_ms=30, max_batch=8)
+
+    first = queue.submit('a')
+    assert first.result(timeout=2) == 'result-a'
+    second = queue.submit('b')
+    assert second.result(timeout=2) == 'result-b'
+
+    assert infer.batches == [['a'], ['b']]
+
+
+def test_overflow_beyond_max_batch_goes_to_the_next_batch():
+    infer = RecordingInfer()
+    queue = BatchingQueue('test', infer, window_ms=200, max_batch=3)
+
+    futures = submit_all(queue, range(7))
+
+    assert [future.result(timeout=2) for future in futures] == [f"result-{i}" for i in range(7)]
+    assert [len(batch) for batch in infer.batches] == [3, 3, 1]
+    assert [item for batch in infer.batches for item in batch] == list(range(7))
+
+
+def test_results_fan_out_to_concurrent_callers_in_order():
+    infer = RecordingInfer(delay_s=0.01)
+    queue = BatchingQueue('test', infer, window_ms=50, max_batch=16)
+    results = {}
+
+    def call(item):
+        results[item] = queue(item, timeout=2)
+
+    threads = [threading.Thread(target=call, args=(item,)) for item in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {item: f"result-{item}" for item in range(10)}
+    assert sum(len(batch) for batch in infer.batches) == 10
+    assert len(infer.batches) < 10
+
+
+def test_infer_exception_reaches_every_future_in_the_batch():
+    infer = RecordingInfer(error=ValueError('model exploded'))
+    queue = BatchingQueue('test', infer, window_ms=100, max_batch=8)
+
+    futures = submit_all(queue, range(3))
+
+    for future in futures:
+        with pytest.raises(ValueError, match='model exploded'):
+            future.result(timeout=2)
+    assert infer.batches == [[0, 1, 2]]
+
+
+def test_wrong_result_count_fails_the_whole_batch():
+    queue = BatchingQueue('test', lambda items: ['only-one'], window_ms=100, max_batch=8)
+
+    futures = submit_all(queue, range(2))
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match='2 inputs'):
+            future.result(timeout=2)
+
+
+def test_worker_survives_a_failed_batch():
+    calls = []
+
+    def infer(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError('first batch fails')
+        return items
+
+    queue = BatchingQueue('test', infer, window_ms=10, max_batch=8)
+
+    with pytest.raises(RuntimeError):
+        queue.submit('a').result(timeout=2)
+    assert queue.submit('b').result(timeout=2) == 'b'
+
+
+def test_disabled_queue_calls_infer_inline():
+    infer = RecordingInfer()
+    queue = BatchingQueue('test', infer, window_ms=0, max_batch=8)
+
+    assert not queue.enabled
+    assert queue('x') == 'result-x'
+    assert queue._thread is None
+
+
+def test_stats_count_batches_and_items():
+    queue = BatchingQueue('test', RecordingInfer(), window_ms=100, max_batch=4)
+
+    for future in submit_all(queue, range(6)):
+        future.result(timeout=2)
+
+    stats = queue.stats()
+    assert stats['batches_run'] == 2
+    assert stats['items_processed'] == 6
+    assert stats['largest_batch'] == 4
+    assert stats['avg_batch_size'] == 3.0
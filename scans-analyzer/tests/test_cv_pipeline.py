@@ -0,0 +1,59 @@
+# tests/test_cv_pipeline.py
+
+import threading
+
+import cv2
+import numpy as np
+
+from utils.cv_pipeline import ScanPipeline, WorkspacePool
+
+
+def xray_pipeline(workspaces):
+    return ScanPipeline('xray', (224, 224), enhance=True, blur=(5, 5), canny=(50, 150), sobel=True, workspaces=workspaces)
+
+
+def in_thread(fn):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(fn()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def test_workspace_outlives_the_request_thread(scan_image):
+    pool = WorkspacePool()
+    pipeline = xray_pipeline(pool)
+    gray = cv2.cvtColor(scan_image, cv2.COLOR_BGR2GRAY)
+
+    def analysis():
+        with pool.checkout() as workspace:
+            pipeline.edges(pipeline.analysis_view(gray))
+            return workspace.clahe['xray'], workspace.buffers[('xray', 'edges')]
+
+    first, second = in_thread(analysis), in_thread(analysis)  # a new thread per request, as in werkzeug
+    assert first[0] is second[0] and first[1] is second[1]
+    assert pool.stats()['created'] == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_pooled_and_unpooled_outputs_match(scan_image):
+    gray = cv2.cvtColor(scan_image, cv2.COLOR_BGR2GRAY)
+    pooled, unpooled = xray_pipeline(WorkspacePool()), xray_pipeline(None)
+
+    with pooled.workspaces.checkout():
+        view = pooled.analysis_view(gray)
+        edges = pooled.edges(view).copy()
+    assert np.array_equal(view, unpooled.analysis_view(gray))
+    assert np.array_equal(edges, unpooled.edges(view))
+
+
+def test_nested_checkouts_share_and_idle_workspaces_are_bounded():
+    pool = WorkspacePool(max_idle=1)
+    with pool.checkout() as outer:
+        with pool.checkout() as inner:
+            assert inner is outer
+        assert in_thread(lambda: pool.run(pool.current)) is not outer  # concurrent analysis
+
+    stats = pool.stats()
+    assert (stats['created'], stats['idle'], stats['dropped']) == (2, 1, 1)
+    assert pool.current() is None
@@ -0,0 +1,52 @@
+# tests/test_decoding.py
+
+import cv2
+import pytest
+
+from utils.decoding import choose_reduction, decode_image
+
+
+@pytest.mark.parametrize('width, height, factor', [
+    (3072, 3072, 8),  # 384 / 384: exactly on both sides
+    (3071, 3072, 4),  # short side one pixel under 384 at 1/8
+    (1536, 1536, 4),
+    (1535, 1535, 2),
+    (768, 768, 2),
+    (767, 767, 1),
+    (200, 4000, 1),  # short side already under the minimum
+])
+def test_short_side_boundary(width, height, factor):
+    assert choose_reduction(width, height, min_side=384, min_long_side=0) == factor
+
+
+@pytest.mark.parametrize('width, height, factor', [
+    (12800, 6400, 8),  # long side 1600 at 1/8: exactly the OCR size
+    (12792, 6400, 4),  # long side under 1600 at 1/8
+    (6400, 3200, 4),
+    (6399, 3200, 2),
+    (3200, 1600, 2),
+    (3199, 3199, 1),
+])
+def test_long_side_boundary(width, height, factor):
+    assert choose_reduction(width, height, min_side=384, min_long_side=1600) == factor
+
+
+def test_reduced_decode_keeps_the_targets(scans_app, scan_image):
+    width, height = 4000, 3000
+    jpeg = cv2.imencode('.jpg', cv2.resize(scan_image, (width, height)))[1].tobytes()
+
+    image, info = decode_image(jpeg, min_side=scans_app.DECODE_MIN_SIDE, min_long_side=scans_app.OCR_MAX_SIDE)
+
+    assert info['original_size'] == [width, height]
+    assert info['reduction'] == 2
+    assert image.shape[:2] == (height // 2, width // 2)
+    assert max(image.shape[:2]) >= scans_app.OCR_MAX_SIDE
+
+
+def test_full_res_decode_is_not_reduced(scan_image):
+    jpeg = cv2.imencode('.jpg', cv2.resize(scan_image, (2048, 2048)))[1].tobytes()
+
+    assert decode_image(jpeg)[1]['reduction'] == 4
+    image, info = decode_image(jpeg, full_res=True)
+    assert info['reduction'] == 1
+    assert image.shape[:2] == (2048, 2048)
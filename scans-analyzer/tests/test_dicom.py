@@ -0,0 +1,108 @@
+# tests/test_dicom.py
+
+import io
+
+import numpy as np
+import pytest
+
+pydicom = pytest.importorskip('pydicom')
+from pydicom.dataset import Dataset, FileMetaDataset  # noqa: E402
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid  # noqa: E402
+
+from utils.dicom import decode_dicom, is_dicom, open_dicom_frames, window_frame  # noqa: E402
+from utils.uploads import spool_stream  # noqa: E402
+
+
+def dataset(frames=1, rows=32, columns=48, **tags):
+    """Uncompressed 16-bit MONOCHROME2 CT; frame i is a ramp offset by 1000 * i"""
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.file_meta.MediaStorageSOPClassUID = '1.2.840.10008.5.1.4.1.1.2'
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.SOPClassUID = ds.file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+    ds.Modality = 'CT'
+    ds.Rows, ds.Columns = rows, columns
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = 'MONOCHROME2'
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 16, 15
+    ds.PixelRepresentation = 0
+    if frames > 1:
+        ds.NumberOfFrames = frames
+    ramp = np.arange(rows * columns, dtype=np.uint16).reshape(rows, columns)
+    ds.PixelData = np.stack([ramp + 1000 * i for i in range(frames)]).astype(np.uint16).tobytes()
+    for name, value in tags.items():
+        setattr(ds, name, value)
+    return ds
+
+
+def encoded(ds):
+    buffer = io.BytesIO()
+    ds.save_as(buffer, enforce_file_format=True)
+    return buffer.getvalue()
+
+
+def test_slope_and_intercept_apply_before_the_window():
+    ds = dataset(RescaleSlope=2, RescaleIntercept=-1024, WindowCenter=0, WindowWidth=200)
+    pixels = np.array([[412, 462, 512, 562, 612]], np.uint16)  # -200, -100, 0, 100, 200 HU
+
+    frame, info = window_frame(pixels, ds)
+
+    assert frame.tolist() == [[0, 0, 127, 255, 255]]
+    assert info == {'center': 0.0, 'width': 200.0, 'source': 'dicom'}
+
+
+def test_monochrome1_is_inverted():
+    pixels = np.array([[0, 50, 100]], np.uint16)
+    normal, _ = window_frame(pixels, dataset(WindowCenter=50, WindowWidth=100))
+    inverted, _ = window_frame(pixels, dataset(WindowCenter=50, WindowWidth=100, PhotometricInterpretation='MONOCHROME1'))
+
+    assert (inverted == 255 - normal).all()
+    assert inverted[0, 0] == 255
+
+
+def test_request_window_overrides_the_tags_and_percentiles():
+    pixels = np.arange(1000, dtype=np.uint16).reshape(10, 100)
+
+    frame, info = window_frame(pixels, dataset(WindowCenter=10, WindowWidth=20), window=(500, 1000))
+    assert info['source'] == 'request'
+    assert frame.min() == 0 and frame.max() == 254
+
+    _, info = window_frame(pixels, dataset())
+    assert info['source'] == 'percentile'
+    assert info['center'] == pytest.approx(499.5, abs=0.1)
+    assert info['width'] == pytest.approx(989, abs=1)
+
+
+@pytest.mark.parametrize('frame, expected', [(None, 2), (0, 0), (4, 4)])
+def test_decode_reads_the_requested_frame(frame, expected):
+    data = encoded(dataset(frames=5, WindowCenter=2000, WindowWidth=6000))
+    assert is_dicom(data)
+
+    image, info = decode_dicom(data, frame=frame)
+
+    assert (info['frames'], info['frame']) == (5, expected)
+    assert info['decoded_size'] == [48, 32] and image.shape == (32, 48, 3)
+    frame_value = (1000 * expected - (2000 - 3000)) / 6000 * 255
+    assert image[0, 0, 0] == int(frame_value)
+
+
+def test_out_of_range_frame_is_an_error():
+    image, info = decode_dicom(encoded(dataset(frames=3)), frame=3)
+    assert image is None
+    assert 'out of range' in info['error']
+
+
+@pytest.mark.parametrize('max_size', [1 << 20, 1024])  # in-memory and rolled-over spool
+def test_frames_iterate_lazily_from_a_spooled_upload(max_size):
+    spool = spool_stream(io.BytesIO(encoded(dataset(frames=6))), max_size)
+
+    with open_dicom_frames(spool, stride=2, max_frames=2) as (info, frames):
+        decoded = list(frames)
+
+    assert info['frames'] == 6 and info['window']['source'] == 'percentile'
+    assert [index for index, _ in decoded] == [0, 2]
+    # One window (the middle frame's) for every frame: later frames are brighter
+    assert decoded[0][1].mean() < decoded[1][1].mean()
+    spool.close()
@@ -0,0 +1,56 @@
+# tests/test_features.py
+
+import numpy as np
+import pytest
+
+from utils.features import RegionStats
+
+REGIONS = [
+    (None, None, None, None),  # whole image
+    (80, 144, 80, 144),
+    (0, 1, 0, 1),  # one pixel
+    (-20, None, 10, -10),  # negative bounds, like numpy slicing
+    (50, 500, 200, 300),  # clipped at the edge
+    (60, 60, 0, 10),  # empty
+]
+
+
+@pytest.fixture
+def gray():
+    return np.random.RandomState(0).randint(0, 256, (224, 240)).astype(np.uint8)
+
+
+@pytest.mark.parametrize('region', REGIONS)
+def test_uint8_stats_match_the_float_copy(gray, region):
+    stats = RegionStats(gray, unit=255)
+    y0, y1, x0, x1 = region
+    window = (gray.astype(np.float64) / 255.0)[y0:y1, x0:x1]
+
+    assert stats.area(*region) == window.size
+    assert stats.mean(*region) == pytest.approx(window.mean() if window.size else 0.0, abs=1e-12)
+    assert stats.std(*region) == pytest.approx(window.std() if window.size else 0.0, abs=1e-6)
+    for op, threshold in (('>', 0.4), ('<', 0.3), ('>', 100 / 255)):
+        expected = np.count_nonzero(window > threshold if op == '>' else window < threshold)
+        assert stats.count(op, threshold, *region) == expected
+
+
+@pytest.mark.parametrize('region', REGIONS[:4])
+def test_float_stats_match_numpy(gray, region):
+    image = gray.astype(np.float32) / 255.0
+    stats = RegionStats(image)
+    y0, y1, x0, x1 = region
+    window = image[y0:y1, x0:x1].astype(np.float64)
+
+    assert stats.sum(*region) == pytest.approx(window.sum(), rel=1e-6)
+    assert stats.mean(*region) == pytest.approx(window.mean(), abs=1e-6)
+    assert stats.std(*region) == pytest.approx(window.std(), abs=1e-5)
+    assert stats.count('>', 0.5, *region) == np.count_nonzero(window > 0.5)
+
+
+def test_count_tables_are_built_once_per_threshold(gray):
+    stats = RegionStats(gray, unit=255)
+    stats.count('>', 0.4, 0, 10, 0, 10)
+    stats.count('>', 0.4, 50, 90, 50, 90)
+    stats.count('<', 0.4)
+
+    assert sorted(stats._counts) == [('<', 0.4), ('>', 0.4)]
@@ -0,0 +1,124 @@
+# tests/test_jobs.py
+
+import http.server
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+import utils.jobs as jobs_module
+from utils.jobs import JobQueue, PinnedAddressAdapter
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1:5003/hook',
+    'http://localhost/hook',
+    'http://169.254.169.254/latest/meta-data',
+    'http://10.0.0.5/hook',
+    'http://[::1]/hook',
+    'http://0.0.0.0/hook',
+    'http://2130706433/hook',
+    'ftp://example.com/hook',
+    'http:///hook',
+])
+def test_webhooks_to_non_public_destinations_are_refused(url):
+    assert not JobQueue(lambda payload: {}).valid_webhook(url)
+
+
+def test_public_and_allowlisted_webhooks_are_accepted():
+    jobs = JobQueue(lambda payload: {}, webhook_allow_hosts=['receiver.internal'])
+    assert jobs.valid_webhook('https://8.8.8.8/hook')
+    assert jobs.valid_webhook('http://receiver.internal:8080/hook')
+
+
+def test_finished_jobs_expire_on_lookup():
+    jobs = JobQueue(lambda payload: {'ok': True}, workers=1, result_ttl_s=0.1)
+    job_id = jobs.submit('payload')['id']
+    deadline = time.time() + 2
+    while jobs.get(job_id)['status'] != 'done' and time.time() < deadline:
+        time.sleep(0.01)
+    assert jobs.get(job_id)['status'] == 'done'
+
+    time.sleep(1.2)  # past the TTL and the once-a-second expiry throttle
+    assert jobs.get(job_id) is None
+    assert jobs.stats()['tracked_jobs'] == 0
+
+
+def test_workers_start_with_the_first_job():
+    jobs = JobQueue(lambda payload: {}, workers=2)
+    assert jobs._threads == []
+    jobs.submit('payload')
+    assert len(jobs._threads) == 2
+
+
+def test_job_state_is_readable_from_another_process_sharing_the_db(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    owner = JobQueue(lambda payload: {'ok': payload}, workers=1, db_path=db_path)
+    other = JobQueue(lambda payload: {}, db_path=db_path)  # e.g. another serve.py worker
+
+    job_id = owner.submit('payload')['id']
+    assert other.get(job_id)['status'] in ('queued', 'running', 'done')
+    deadline = time.time() + 2
+    while other.get(job_id)['status'] != 'done' and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert other.get(job_id)['result'] == {'ok': 'payload'}
+    assert other.get('unknown') is None
+
+
+@pytest.fixture
+def receiver():
+    """Local HTTP server recording the Host header of each POST"""
+    hosts = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            hosts.append(self.headers['Host'])
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1], hosts
+    server.shutdown()
+
+
+def test_webhook_is_delivered_to_the_validated_address(receiver, monkeypatch):
+    port, hosts = receiver
+    real_getaddrinfo = socket.getaddrinfo
+    lookups = []
+
+    def rebinding_getaddrinfo(host, *args, **kwargs):
+        # The first lookup (validation) gets the receiver, any later one another address
+        if host != 'hook.test':
+            return real_getaddrinfo(host, *args, **kwargs)
+        lookups.append(host)
+        address = '127.0.0.1' if len(lookups) == 1 else '127.0.0.2'
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', (address, port))]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', rebinding_getaddrinfo)
+    monkeypatch.setattr(jobs_module, 'is_public_address', lambda address: address == '127.0.0.1')
+    jobs = JobQueue(lambda payload: {})
+
+    job = {'webhook': {'url': f"http://hook.test:{port}/done"}}
+    jobs._notify(job, {'id': 'job-1'})
+
+    assert job['webhook']['status_code'] == 204
+    assert hosts == [f"hook.test:{port}"]
+    assert lookups == ['hook.test']
+
+
+def test_pinned_https_keeps_the_hostname_for_sni_and_verification():
+    adapter = PinnedAddressAdapter('hook.test', '203.0.113.7')
+    request = requests.Request('POST', 'https://hook.test/done').prepare()
+
+    host_params, pool_kwargs = adapter.build_connection_pool_key_attributes(request, verify=True)
+
+    assert pool_kwargs['server_hostname'] == 'hook.test'
+    assert pool_kwargs['assert_hostname'] == 'hook.test'
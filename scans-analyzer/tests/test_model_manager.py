@@ -0,0 +1,92 @@
+# tests/test_model_manager.py
+
+import pytest
+
+from utils.model_manager import ModelManager
+
+
+class Weights:
+    """A loaded model of a fixed size"""
+
+    def __init__(self, name, size_mb):
+        self.name = name
+        self.size_mb = size_mb
+
+
+SPECS = {scan_type: {'candidates': [f"{scan_type}-model"]} for scan_type in ('mri', 'xray', 'chest', 'skin')}
+
+
+def manager(budget_mb, sizes=None, failing=()):
+    sizes = sizes or {}
+
+    def loader(scan_type, model_name):
+        if model_name in failing:
+            raise RuntimeError('no weights')
+        return Weights(model_name, sizes.get(scan_type, 100))
+
+    return ModelManager(SPECS, loader, memory_budget_mb=budget_mb)
+
+
+def evictions(models):
+    return [(event['scan_type'], event['reason']) for event in models.stats()['events'] if event['event'] == 'evict']
+
+
+def test_least_recently_used_model_is_evicted_over_the_budget():
+    models = manager(budget_mb=250)
+    models.get('mri')
+    models.get('xray')
+    models.get('mri')  # xray is now the least recently used
+
+    models.get('chest')
+
+    assert models.resident() == ['mri', 'chest']
+    assert models.resident_mb() == 200
+    assert evictions(models) == [('xray', 'memory budget')]
+
+
+def test_eviction_frees_as_many_models_as_needed():
+    models = manager(budget_mb=300, sizes={'skin': 150})
+    for scan_type in ('mri', 'xray', 'chest'):
+        models.get(scan_type)
+
+    models.get('skin')
+
+    assert models.resident() == ['chest', 'skin']
+    assert [scan_type for scan_type, _ in evictions(models)] == ['mri', 'xray']
+
+
+def test_a_model_over_the_whole_budget_still_loads_alone():
+    models = manager(budget_mb=50)
+    models.get('mri')
+
+    assert models.get('xray').name == 'xray-model'
+    assert models.resident() == ['xray']
+
+
+def test_evicted_model_is_reloaded_on_next_use():
+    models = manager(budget_mb=100)
+    first = models.get('mri')
+    models.get('xray')
+
+    assert not models.is_resident('mri')
+    assert models.get('mri') is not first
+    assert models.resident() == ['mri']
+
+
+@pytest.mark.parametrize('budget_mb', [0, None])
+def test_no_budget_keeps_every_model(budget_mb):
+    models = manager(budget_mb=budget_mb)
+    for scan_type in SPECS:
+        models.get(scan_type)
+
+    assert models.resident() == list(SPECS)
+    assert evictions(models) == []
+    assert models.stats()['memory_budget_mb'] is None
+
+
+def test_failed_load_is_not_retried_before_retry_after():
+    models = manager(budget_mb=0, failing={'mri-model'})
+
+    assert models.get('mri') is None
+    assert not models.has_model('mri')
+    assert 'mri-model' in models.stats()['failed']['mri']
@@ -0,0 +1,108 @@
+# tests/test_near_duplicates.py
+
+import cv2
+import pytest
+
+from utils.near_duplicates import NearDuplicateIndex, hamming, perceptual_hashes, pixel_thumbnail
+
+
+def jpeg(image, quality=70):
+    return cv2.imdecode(cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], cv2.IMREAD_COLOR)
+
+
+def with_lesion(image):
+    # A small bright lesion: the hashes barely move, the pixels do
+    return cv2.circle(image.copy(), (100, 125), 12, (255, 255, 255), -1)
+
+
+def gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def indexed(image, **limits):
+    index = NearDuplicateIndex(**limits)
+    index.add(perceptual_hashes(gray(image)), 'liver', 'v1', 'key-1', pixel_thumbnail(gray(image)))
+    return index
+
+
+def test_reencoded_scan_is_found_with_its_pixel_error(scan_image):
+    index = indexed(scan_image)
+    match = index.find(perceptual_hashes(gray(jpeg(scan_image))), 'liver', 'v1', pixel_thumbnail(gray(jpeg(scan_image))))
+    assert match['key'] == 'key-1'
+    assert match['phash_distance'] <= 2
+    assert match['pixel_mse'] < 1
+
+
+def test_matches_stay_within_their_scan_type_and_version(scan_image):
+    index = indexed(scan_image)
+    hashes = perceptual_hashes(gray(scan_image))
+    assert index.find(hashes, 'mri', 'v1') is None
+    assert index.find(hashes, 'liver', 'v2') is None
+    assert index.find(hashes, 'liver', 'v1')['pixel_mse'] is None  # no thumbnail to compare
+
+
+@pytest.mark.parametrize('limits, found', [
+    ({'max_distance': 6, 'max_dhash_distance': 10}, True),
+    ({'max_distance': 0}, False),  # disabled
+])
+def test_distance_thresholds(scan_image, limits, found):
+    index = indexed(scan_image, **limits)
+    assert (index.find(perceptual_hashes(gray(jpeg(scan_image))), 'liver', 'v1') is not None) is found
+
+
+def test_phash_candidate_must_be_confirmed_on_dhash(scan_image):
+    index = indexed(scan_image, max_distance=64, max_dhash_distance=0)
+    phash, dhash = perceptual_hashes(gray(scan_image))
+    flipped = dhash ^ 0b111
+    assert hamming(flipped, dhash) == 3
+    assert index.find((phash, flipped), 'liver', 'v1') is None
+    assert index.find((phash, dhash), 'liver', 'v1') is not None
+
+
+def test_reference_mode_is_the_default_and_reanalyzes(scans_app, analyzer, scan_image):
+    assert scans_app.NEAR_DUP_MODE == 'reference'
+    analyzer.analyze_scan(scan_image.copy(), 'liver')
+
+    result = analyzer.analyze_scan(jpeg(scan_image), 'liver')
+    assert result['cache_hit'] is False
+    assert result['near_duplicate']['phash_distance'] <= scans_app.NEAR_DUP_MAX_DISTANCE
+
+
+def test_reference_embeds_the_earlier_result_and_its_link_resolves(analyzer, client, scan_image):
+    earlier = analyzer.analyze_scan(scan_image.copy(), 'liver')
+
+    reference = analyzer.analyze_scan(jpeg(scan_image), 'liver')['near_duplicate']
+    assert reference['result'] == {field: earlier[field] for field in ('status', 'detected_conditions', 'model_tier')}
+
+    response = client.get(reference['result_url'])
+    assert response.status_code == 200
+    assert response.get_json()['detected_conditions'] == earlier['detected_conditions']
+    assert client.get('/results/unknown').status_code == 404
+
+
+def test_no_reference_once_the_earlier_result_left_the_cache(analyzer, scan_image):
+    analyzer.analyze_scan(scan_image.copy(), 'liver')
+    analyzer.result_cache._memory.clear()
+
+    assert 'near_duplicate' not in analyzer.analyze_scan(jpeg(scan_image), 'liver')
+
+
+def test_return_mode_serves_only_pixel_level_matches(scans_app, analyzer, scan_image, monkeypatch):
+    monkeypatch.setattr(scans_app, 'NEAR_DUP_MODE', 'return')
+    analyzer.analyze_scan(scan_image.copy(), 'liver')
+
+    reencoded = analyzer.analyze_scan(jpeg(scan_image), 'liver')
+    assert reencoded['cache_hit'] is True
+    assert reencoded['near_duplicate']['pixel_mse'] <= scans_app.NEAR_DUP_RETURN_MAX_MSE
+
+    lesion = analyzer.analyze_scan(with_lesion(scan_image), 'liver')
+    assert lesion['cache_hit'] is False
+    assert lesion['near_duplicate']['pixel_mse'] > scans_app.NEAR_DUP_RETURN_MAX_MSE
+
+
+def test_return_mode_needs_the_tight_hash_distances(scans_app, analyzer):
+    match = {'phash_distance': 0, 'dhash_distance': 0, 'pixel_mse': 0.0}
+    assert analyzer.servable_duplicate(match)
+    assert not analyzer.servable_duplicate({**match, 'phash_distance': scans_app.NEAR_DUP_RETURN_MAX_DISTANCE + 1})
+    assert not analyzer.servable_duplicate({**match, 'dhash_distance': scans_app.NEAR_DUP_RETURN_MAX_DHASH_DISTANCE + 1})
+    assert not analyzer.servable_duplicate({**match, 'pixel_mse': None})
@@ -0,0 +1,79 @@
+# tests/test_result_cache.py
+
+from utils.result_cache import ResultCache, content_key
+
+
+def test_content_key_depends_on_pixels_scan_type_and_version(scan_image):
+    key = content_key(scan_image, 'chest', '2:model-a:torch')
+    assert key == content_key(scan_image.copy(), 'chest', '2:model-a:torch')
+    assert key != content_key(scan_image, 'skin', '2:model-a:torch')
+    assert key != content_key(scan_image, 'chest', '2:model-b:torch')
+    changed = scan_image.copy()
+    changed[0, 0] ^= 1
+    assert key != content_key(changed, 'chest', '2:model-a:torch')
+
+
+def test_full_model_result_is_cached_under_the_model_that_ran(scans_app, analyzer, stub_models, scan_image):
+    first = analyzer.analyze_scan(scan_image.copy(), 'chest')
+    second = analyzer.analyze_scan(scan_image.copy(), 'chest')
+
+    assert first['cache_hit'] is False
+    assert first['model_tier'] == analyzer.primary_tier('chest')
+    assert second['cache_hit'] is True
+    model_name = scans_app.MODEL_SPECS['chest']['candidates'][0]
+    assert analyzer.model_version('chest') == f"{scans_app.ANALYZER_VERSION}:{model_name}:torch"
+
+
+def test_cv_fallback_is_not_cached_when_the_model_fails(scans_app, analyzer, scan_image):
+    first = analyzer.analyze_scan(scan_image.copy(), 'chest')
+    second = analyzer.analyze_scan(scan_image.copy(), 'chest')
+
+    assert first['model_tier'] == scans_app.TIER_CV
+    assert second['cache_hit'] is False
+    assert analyzer.result_cache.stats()['stores'] == 0
+    assert analyzer.model_version('chest') is None
+
+
+def test_mri_result_is_keyed_on_the_candidate_that_loaded(scans_app, analyzer, stub_models, scan_image):
+    first_choice, second_choice = scans_app.MODEL_SPECS['mri']['candidates'][:2]
+    stub_models.add(first_choice)
+
+    result = analyzer.analyze_scan(scan_image.copy(), 'mri')
+
+    assert result['ai_model_used'] is True
+    assert analyzer.model_version('mri') == f"{scans_app.ANALYZER_VERSION}:{second_choice}:torch"
+    assert analyzer.analyze_scan(scan_image.copy(), 'mri')['cache_hit'] is True
+
+
+def test_analyzer_version_bump_invalidates_cached_results(scans_app, analyzer, scan_image, monkeypatch):
+    analyzer.analyze_scan(scan_image.copy(), 'liver')
+    assert analyzer.analyze_scan(scan_image.copy(), 'liver')['cache_hit'] is True
+
+    monkeypatch.setattr(scans_app, 'ANALYZER_VERSION', scans_app.ANALYZER_VERSION + '-next')
+    assert analyzer.analyze_scan(scan_image.copy(), 'liver')['cache_hit'] is False
+
+
+def test_exact_hit_skips_perceptual_hashing(scans_app, analyzer, scan_image, monkeypatch):
+    calls = []
+    hashes = scans_app.perceptual_hashes
+    monkeypatch.setattr(scans_app, 'perceptual_hashes', lambda gray: calls.append(gray.shape) or hashes(gray))
+
+    analyzer.analyze_scan(scan_image.copy(), 'liver')
+    hashed = len(calls)
+    assert analyzer.analyze_scan(scan_image.copy(), 'liver')['cache_hit'] is True
+    assert hashed == 1 and len(calls) == hashed
+
+
+
+def test_disk_tier_is_shared_and_pruned(tmp_path):
+    db_path = str(tmp_path / 'results.db')
+    writer = ResultCache(db_path=db_path, ttl_s=60)
+    reader = ResultCache(db_path=db_path, ttl_s=60)  # e.g. another serve.py worker
+
+    writer.put('old', {'status': 'Normal'})
+    writer._db.execute("UPDATE results SET created = created - 3600")
+    writer._pruned_at -= 120
+    writer.put('new', {'status': 'Abnormal'})
+
+    assert reader.get('new') == {'status': 'Abnormal'}
+    assert writer._db.execute("SELECT key FROM results").fetchall() == [('new',)]
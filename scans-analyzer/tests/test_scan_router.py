@@ -0,0 +1,115 @@
+# tests/test_scan_router.py
+
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.scan_router import ScanTypeRouter, fit_centroids, router_features
+
+
+def skin_photo(seed):
+    """Color close-up: skin with a dark mole, a gray backdrop along one edge"""
+    rng = np.random.RandomState(seed)
+    image = np.zeros((300, 400, 3), np.uint8)
+    image[:] = (120 + rng.randint(-15, 15), 150 + rng.randint(-15, 15), 215)
+    image[:, :100] = 180
+    image = cv2.add(image, rng.randint(0, 30, image.shape).astype(np.uint8))
+    return cv2.circle(image, (220 + rng.randint(-40, 40), 150), 30, (40, 50, 90), -1)
+
+
+def brain_mri(seed):
+    """Symmetric bright head on a black surround"""
+    rng = np.random.RandomState(seed)
+    image = np.zeros((256, 256, 3), np.uint8)
+    cv2.ellipse(image, (128, 128), (80, 100), 0, 0, 360, (150, 150, 150), -1)
+    cv2.ellipse(image, (128, 128), (50, 60), 0, 0, 360, (200 + rng.randint(0, 40),) * 3, -1)
+    return cv2.add(image, rng.randint(0, 10, image.shape).astype(np.uint8))
+
+
+def chest_radiograph(seed):
+    """Gray, symmetric, filling a near-square frame"""
+    rng = np.random.RandomState(seed)
+    image = np.full((400, 360, 3), 170, np.uint8)
+    for x in (100, 260):
+        cv2.ellipse(image, (x, 200), (60, 130), 0, 0, 360, (90 + rng.randint(0, 20),) * 3, -1)
+    return cv2.GaussianBlur(image, (0, 0), 3)
+
+
+def radiograph_strip(seed):
+    """A wide, asymmetric radiograph (e.g. a limb)"""
+    rng = np.random.RandomState(seed)
+    image = np.full((200, 600, 3), 140, np.uint8)
+    cv2.rectangle(image, (50 + rng.randint(0, 30), 80), (420, 120), (230, 230, 230), -1)
+    return cv2.GaussianBlur(image, (0, 0), 2)
+
+
+def ultrasound(seed):
+    """Coarse speckle inside a fan on a dark background"""
+    rng = np.random.RandomState(seed)
+    image = np.zeros((300, 400, 3), np.uint8)
+    fan = np.zeros((300, 400), np.uint8)
+    cv2.ellipse(fan, (200, 0), (280, 280), 0, 50, 130, 255, -1)
+    speckle = cv2.resize(rng.randint(0, 220, (15, 20)).astype(np.uint8), (400, 300), interpolation=cv2.INTER_NEAREST)
+    image[fan > 0] = np.repeat(speckle[fan > 0][:, None], 3, axis=1)
+    return image
+
+
+FAMILIES = {
+    'skin': skin_photo,
+    'mri': brain_mri,
+    'chest': chest_radiograph,
+    'xray': radiograph_strip,
+    'heart': ultrasound,
+}
+
+
+@pytest.mark.parametrize('scan_type, make, candidates', [
+    ('skin', skin_photo, {'skin'}),
+    ('mri', brain_mri, {'mri'}),
+    ('chest', chest_radiograph, {'chest'}),
+    ('xray', radiograph_strip, {'xray'}),
+    ('heart', ultrasound, {'heart', 'kidney', 'liver'}),  # ultrasound organs are not separable
+])
+def test_heuristic_routes_each_modality_family(scan_type, make, candidates):
+    routing = ScanTypeRouter().route(make(0))
+
+    assert routing['method'] == 'heuristic'
+    assert routing['scan_type'] in candidates
+    assert set(routing['scores']) <= {'skin', 'mri', 'chest', 'xray', 'heart', 'kidney', 'liver'}
+
+
+def test_ultrasound_is_routed_with_low_confidence():
+    assert ScanTypeRouter().route(ultrasound(0))['confidence'] < 0.5
+
+
+@pytest.fixture
+def centroid_router(tmp_path):
+    features = {
+        scan_type: [router_features(make(seed))[0] for seed in range(6)]
+        for scan_type, make in FAMILIES.items()
+    }
+    path = tmp_path / 'router.json'
+    path.write_text(json.dumps(fit_centroids(features)))
+    return ScanTypeRouter(str(path), ood_factor=3)
+
+
+@pytest.mark.parametrize('scan_type', list(FAMILIES))
+def test_centroid_model_routes_unseen_samples(centroid_router, scan_type):
+    routing = centroid_router.route(FAMILIES[scan_type](100))
+
+    assert routing['method'] == 'centroids'
+    assert routing['scan_type'] == scan_type
+
+
+def test_out_of_distribution_image_falls_back_to_the_heuristic(centroid_router):
+    noise = np.random.RandomState(0).randint(0, 256, (300, 300, 3)).astype(np.uint8)
+    assert centroid_router.route(noise)['method'] == 'heuristic_ood'
+
+
+def test_incompatible_model_is_refused(tmp_path):
+    path = tmp_path / 'router.json'
+    path.write_text(json.dumps({'version': 0, 'thumb_size': 64, 'classes': {}}))
+    with pytest.raises(ValueError, match='retrain'):
+        ScanTypeRouter(str(path))
@@ -0,0 +1,104 @@
+# tests/test_scheduler.py
+
+import io
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import PriorityScheduler, SchedulerBusy
+from utils.tiers import TierController
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = PriorityScheduler(1, {}, {'normal': 0})
+    with scheduler.slot('normal'):
+        with pytest.raises(SchedulerBusy) as busy:
+            with scheduler.slot('normal'):
+                pass
+    assert busy.value.priority == 'normal'
+    assert busy.value.retry_after >= 1
+    assert scheduler.stats()['classes']['normal']['rejected'] == 1
+
+
+def test_wait_past_max_wait_is_rejected():
+    scheduler = PriorityScheduler(1, {}, {'normal': 4}, max_wait_s=0.05)
+    with scheduler.slot('normal'):
+        with pytest.raises(SchedulerBusy, match='waited over'):
+            with scheduler.slot('normal'):
+                pass
+    assert scheduler.stats()['classes']['normal']['timed_out'] == 1
+
+
+def test_higher_class_is_served_first():
+    scheduler = PriorityScheduler(1, {}, {'urgent': 4, 'bulk': 4})
+    order = []
+
+    def run(priority):
+        with scheduler.slot(priority):
+            order.append(priority)
+
+    with scheduler.slot('normal'):
+        waiters = [threading.Thread(target=run, args=(priority,)) for priority in ('bulk', 'urgent')]
+        for waiter in waiters:
+            waiter.start()
+            time.sleep(0.05)
+    for waiter in waiters:
+        waiter.join()
+    assert order == ['urgent', 'bulk']
+
+
+def test_analyze_answers_429_when_the_scheduler_is_full(analyzer, client, scan_png, monkeypatch):
+    monkeypatch.setattr(analyzer, 'scheduler', PriorityScheduler(1, {}, {'normal': 0}))
+    with analyzer.scheduler.slot('normal'):
+        response = client.post('/analyze', data={'scan_type': 'liver', 'file': (io.BytesIO(scan_png), 'scan.png')})
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert 'error' in response.get_json()
+    assert client.post('/analyze', data={'scan_type': 'liver', 'file': (io.BytesIO(scan_png), 'scan.png')}).status_code == 200
+
+
+def wait_in_background(scheduler, priority, scan_type, count):
+    """Start `count` threads queued for a slot and wait until they are all waiting"""
+    def wait_for_slot():
+        with scheduler.slot(priority, scan_type=scan_type):
+            pass
+
+    waiters = [threading.Thread(target=wait_for_slot) for _ in range(count)]
+    for waiter in waiters:
+        waiter.start()
+    deadline = time.time() + 2
+    while scheduler.queued_for(scan_type) < count and time.time() < deadline:
+        time.sleep(0.01)
+    return waiters
+
+
+def test_scheduler_backlog_steps_the_tier_down():
+    scheduler = PriorityScheduler(1, {}, {'bulk': 8}, {'skin': 'bulk'})
+    tiers = TierController({'skin': ['large', 'base', 'cv']}, queue_high=3, queue_low=1, dwell_s=0,
+                           backlog=scheduler.queued_for)
+
+    with scheduler.slot('bulk', scan_type='skin'):
+        waiters = wait_in_background(scheduler, 'bulk', 'skin', 2)
+        # Only one analysis can be in flight: the step-down comes from the two waiting
+        assert tiers.begin('skin') == 'base'
+        tiers.end('skin')
+    for waiter in waiters:
+        waiter.join()
+
+
+def test_backlog_of_another_scan_type_in_the_same_class_does_not_step_down():
+    scheduler = PriorityScheduler(1, {}, {'urgent': 8}, {'xray': 'urgent', 'chest': 'urgent'})
+    tiers = TierController({'chest': ['base', 'cv'], 'xray': ['base', 'cv']}, queue_high=3, queue_low=1,
+                           dwell_s=0, backlog=scheduler.queued_for)
+
+    with scheduler.slot('urgent', scan_type='xray'):
+        waiters = wait_in_background(scheduler, 'urgent', 'xray', 3)
+        assert scheduler.queued('urgent') == 3
+        assert tiers.begin('chest') == 'base'
+        assert tiers.begin('xray') == 'cv'
+        tiers.end('chest')
+        tiers.end('xray')
+    for waiter in waiters:
+        waiter.join()
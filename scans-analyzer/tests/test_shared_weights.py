@@ -0,0 +1,65 @@
+# tests/test_shared_weights.py
+
+import os
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from transformers import ViTConfig, ViTForImageClassification, ViTImageProcessor, pipeline
+
+from utils.shared_weights import map_shared_weights, model_revision
+
+
+def tiny_vit(seed=0):
+    torch.manual_seed(seed)
+    config = ViTConfig(image_size=32, patch_size=16, hidden_size=32, num_hidden_layers=1,
+                       num_attention_heads=2, intermediate_size=64, num_labels=3)
+    model = ViTForImageClassification(config).eval()
+    return pipeline('image-classification', model=model, image_processor=ViTImageProcessor(size={'height': 32, 'width': 32}), device=-1)
+
+
+def mapped_files(tensor):
+    """Files mapped at the tensor's address, from /proc/self/maps"""
+    address = tensor.data_ptr()
+    files = set()
+    with open('/proc/self/maps') as maps:
+        for line in maps:
+            fields = line.split()
+            start, end = (int(bound, 16) for bound in fields[0].split('-'))
+            if start <= address < end and len(fields) > 5:
+                files.add(fields[5])
+    return files
+
+
+@pytest.fixture
+def image():
+    return Image.fromarray(np.random.RandomState(0).randint(0, 255, (32, 32, 3), dtype=np.uint8))
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason='needs /proc/self/maps')
+def test_parameters_are_mmap_backed_and_outputs_unchanged(tmp_path, image):
+    model = tiny_vit()
+    before = model(image)
+
+    report = map_shared_weights(model, 'org/tiny', str(tmp_path))
+
+    assert report['created'] is True
+    for parameter in model.model.parameters():
+        assert mapped_files(parameter) == {report['path']}
+    assert model(image) == before
+
+
+def test_weights_file_is_keyed_on_the_revision(tmp_path):
+    first = map_shared_weights(tiny_vit(seed=0), 'org/tiny', str(tmp_path))
+    assert map_shared_weights(tiny_vit(seed=0), 'org/tiny', str(tmp_path))['created'] is False
+
+    # Same name, different weights (a new upload of the model): never the stale file
+    updated = tiny_vit(seed=1)
+    report = map_shared_weights(updated, 'org/tiny', str(tmp_path))
+    assert report['created'] is True
+    assert report['path'] != first['path']
+
+    updated.model.config._commit_hash = 'abc123'
+    assert model_revision(updated.model) == 'abc123'
+    assert os.path.basename(os.path.dirname(map_shared_weights(updated, 'org/tiny', str(tmp_path))['path'])) == 'abc123'
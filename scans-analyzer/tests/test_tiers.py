@@ -0,0 +1,135 @@
+# tests/test_tiers.py
+
+import pytest
+
+import utils.tiers as tiers_module
+from utils.tiers import TIER_CV, TierController, expand_tier_specs, tier_key, tier_ladder
+
+LADDER = ['large', 'base', TIER_CV]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(tiers_module, 'time', clock)
+    return clock
+
+
+def controller(backlog=0, **limits):
+    settings = {'queue_high': 4, 'queue_low': 1, 'p95_high_ms': 1000, 'p95_low_ms': 200,
+                'window_s': 30, 'cooldown_s': 30, 'dwell_s': 2, 'min_samples': 3, **limits}
+    depth = {'backlog': backlog}
+    changes = []
+    tiers = TierController({'skin': LADDER}, backlog=lambda scan_type: depth['backlog'],
+                           on_change=lambda scan_type, level, direction: changes.append(direction), **settings)
+    return tiers, depth, changes
+
+
+def tier_now(tiers):
+    tier = tiers.begin('skin')
+    tiers.end('skin')
+    return tier
+
+
+def test_queue_depth_steps_down_one_tier_per_dwell(clock):
+    tiers, depth, changes = controller(backlog=4)
+
+    assert tier_now(tiers) == 'base'
+    clock.now += 1
+    assert tier_now(tiers) == 'base'  # still within dwell_s of the last change
+    clock.now += 1
+    assert tier_now(tiers) == TIER_CV
+    clock.now += 10
+    assert tier_now(tiers) == TIER_CV  # nothing below cv
+    assert changes == ['down', 'down']
+
+
+def test_p95_latency_steps_down(clock):
+    tiers, depth, changes = controller()
+    for _ in range(3):
+        tiers.begin('skin')
+        tiers.end('skin', seconds=2.0)
+
+    assert tier_now(tiers) == 'base'
+    assert tiers.stats()['scan_types']['skin']['p95_ms'] is None  # samples are dropped on a change
+
+
+def test_step_up_waits_for_the_cooldown(clock):
+    tiers, depth, changes = controller(backlog=4)
+    assert tier_now(tiers) == 'base'
+
+    depth['backlog'] = 0
+    clock.now += 29
+    assert tier_now(tiers) == 'base'
+    clock.now += 1
+    assert tier_now(tiers) == 'large'
+    assert changes == ['down', 'up']
+
+
+def test_no_step_up_between_the_low_and_high_marks(clock):
+    tiers, depth, changes = controller(backlog=4)
+    assert tier_now(tiers) == 'base'
+
+    depth['backlog'] = 2  # above queue_low, below queue_high
+    clock.now += 60
+    assert tier_now(tiers) == 'base'
+
+
+def test_slow_samples_block_the_step_up(clock):
+    tiers, depth, changes = controller(backlog=4)
+    assert tier_now(tiers) == 'base'
+    depth['backlog'] = 0
+    for _ in range(3):
+        tiers.begin('skin')
+        tiers.end('skin', seconds=0.5)  # between p95_low_ms and p95_high_ms
+
+    clock.now += 20  # samples stay within window_s
+    assert tier_now(tiers) == 'base'
+    clock.now += 15  # samples aged out of the window
+    assert tier_now(tiers) == 'large'
+
+
+def test_disabled_controller_keeps_the_primary_tier(clock):
+    tiers, depth, changes = controller(backlog=100, enabled=False)
+    assert tier_now(tiers) == 'large'
+    assert tiers.begin('unknown') == TIER_CV
+
+
+def test_tier_specs_and_keys():
+    specs = {'skin': {'tier': 'large', 'description': 'Skin', 'fallback': None, 'candidates': ['a'],
+                      'lighter_tiers': [('base', ['b'])]}}
+    assert tier_ladder(specs['skin']) == LADDER[:2] + [TIER_CV]
+    assert tier_key('skin', 'large', specs) == 'skin'
+    assert tier_key('skin', 'base', specs) == 'skin@base'
+    assert expand_tier_specs(specs)['skin@base']['candidates'] == ['b']
+
+
+def test_analysis_that_fails_in_tier_selection_leaves_nothing_in_flight(scans_app, analyzer, scan_image, monkeypatch):
+    def broken_tier_key(*args):
+        raise RuntimeError('tier lookup failed')
+
+    monkeypatch.setattr(scans_app, 'tier_key', broken_tier_key)
+    with pytest.raises(RuntimeError):
+        analyzer.analyze_scan(scan_image, 'skin')
+    assert analyzer.tiers.stats()['scan_types']['skin']['in_flight'] == 0
+
+
+def test_lighter_tiers_load_on_their_own_thread(scans_app, analyzer, stub_models, monkeypatch):
+    ladder = tier_ladder(scans_app.MODEL_SPECS['skin'])
+    monkeypatch.setattr(analyzer.tiers, 'begin', lambda scan_type: ladder[1])
+    loads = []
+    monkeypatch.setattr(analyzer.executor, 'submit', lambda *args: loads.append('ocr pool'))
+
+    assert analyzer.select_tier('skin') == TIER_CV  # lighter model not resident yet
+    analyzer.tier_loader.submit(lambda: None).result(timeout=5)  # queued after the load
+
+    assert loads == []
+    assert analyzer.model_manager.is_resident(tier_key('skin', ladder[1], scans_app.MODEL_SPECS))
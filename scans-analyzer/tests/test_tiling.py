@@ -0,0 +1,75 @@
+# tests/test_tiling.py
+
+import numpy as np
+import pytest
+
+from utils.tiling import aggregate_tiles, tile_grid
+
+
+def covered(tiles, height, width):
+    mask = np.zeros((height, width), bool)
+    for y0, y1, x0, x1 in tiles:
+        mask[y0:y1, x0:x1] = True
+    return mask
+
+
+@pytest.mark.parametrize('height, width', [(512, 512), (1000, 700), (2048, 3000), (513, 1537), (300, 200)])
+def test_tiles_cover_the_image_and_stay_inside_it(height, width):
+    tiles = tile_grid(height, width, tile_size=512, overlap=0.25, max_tiles=16)
+
+    assert covered(tiles, height, width).all()
+    assert all(0 <= y0 < y1 <= height and 0 <= x0 < x1 <= width for y0, y1, x0, x1 in tiles)
+    assert len(set(tiles)) == len(tiles)
+
+
+def test_small_image_is_one_tile():
+    assert tile_grid(300, 200) == [(0, 300, 0, 200)]
+
+
+def test_neighbouring_tiles_overlap():
+    tiles = sorted(tile_grid(512, 1200, tile_size=512, overlap=0.25), key=lambda tile: tile[2])
+
+    assert len(tiles) == 3
+    for (_, _, _, left_end), (_, _, right_start, _) in zip(tiles, tiles[1:]):
+        assert left_end - right_start >= 512 * 0.25
+
+
+@pytest.mark.parametrize('max_tiles', [1, 4, 16])
+def test_tiles_grow_to_stay_within_max_tiles(max_tiles):
+    tiles = tile_grid(6000, 6000, tile_size=512, overlap=0.25, max_tiles=max_tiles)
+
+    assert len(tiles) <= max_tiles
+    assert tiles[0][1] - tiles[0][0] > 512
+    assert covered(tiles, 6000, 6000).all()
+
+
+def result(status, **scores):
+    return {'status': status, 'confidence_scores': scores}
+
+
+def test_aggregate_builds_the_heatmap_and_finding_summary():
+    tiles = [
+        ((0, 512, 0, 512), result('Abnormal', Lesion=0.8)),
+        ((0, 512, 384, 896), result('Abnormal', Lesion=0.6, Mass=0.9)),
+        ((0, 512, 768, 1024), result('Normal')),
+    ]
+
+    summary = aggregate_tiles(tiles, (512, 1024), cells=32)
+
+    assert summary['findings'] == {'Lesion': {'tiles': 2, 'max_confidence': 0.8},
+                                   'Mass': {'tiles': 1, 'max_confidence': 0.9}}
+    assert [tile['score'] for tile in summary['tiles']] == [0.8, 0.9, 0.0]
+    assert summary['tiles'][1]['box'] == [384, 0, 896, 512]
+    heatmap = np.array(summary['heatmap']['values'])
+    assert heatmap.shape == (summary['heatmap']['rows'], summary['heatmap']['cols']) == (16, 32)
+    assert summary['heatmap']['cell_px'] == 32.0
+    assert heatmap[0, 0] == pytest.approx(0.8)
+    assert heatmap[0, 13] == pytest.approx((0.8 + 0.9) / 2)  # overlap is averaged
+    assert heatmap[0, 31] == 0.0
+    assert summary['max_score'] == pytest.approx(0.9)
+
+
+def test_aggregate_of_no_tiles_is_empty():
+    summary = aggregate_tiles([], (100, 100))
+    assert summary['tiles'] == [] and summary['findings'] == {}
+    assert summary['max_score'] == 0.0
@@ -0,0 +1,80 @@
+# tests/test_uploads.py
+
+import io
+
+import pytest
+
+from utils.uploads import SpooledRequest, UploadSpool, in_memory_spool, spool_stream, upload_storage
+
+
+@pytest.fixture
+def upload_limit(scans_app, monkeypatch):
+    """A 64 kB MAX_CONTENT_LENGTH"""
+    monkeypatch.setitem(scans_app.app.config, 'MAX_CONTENT_LENGTH', 64 * 1024)
+    return 64 * 1024
+
+
+def multipart(filename, data, boundary='scans-boundary'):
+    return b''.join([
+        f'--{boundary}\r\n'.encode(),
+        b'Content-Disposition: form-data; name="scan_type"\r\n\r\nliver\r\n',
+        f'--{boundary}\r\n'.encode(),
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode(),
+        b'Content-Type: application/octet-stream\r\n\r\n',
+        data,
+        f'\r\n--{boundary}--\r\n'.encode(),
+    ]), f'multipart/form-data; boundary={boundary}'
+
+
+def test_oversized_content_length_is_rejected_before_the_body_is_read(client, upload_limit):
+    body, content_type = multipart('big.png', b'\0' * (2 * upload_limit))
+    stream = io.BytesIO(body)
+
+    response = client.post('/analyze', input_stream=stream, content_type=content_type,
+                           content_length=len(body))
+
+    assert response.status_code == 413
+    assert 'limit' in response.get_json()['error']
+    assert stream.tell() == 0
+
+
+def test_oversized_chunked_body_is_cut_off_at_the_limit(client, upload_limit):
+    body, content_type = multipart('big.png', b'\0' * (2 * upload_limit))
+
+    # No usable Content-Length: the server de-chunks and marks the input as terminated
+    response = client.post('/analyze', input_stream=io.BytesIO(body), content_type=content_type,
+                           headers={'Transfer-Encoding': 'chunked'},
+                           environ_overrides={'wsgi.input_terminated': True})
+
+    assert response.status_code == 413
+    assert 'limit' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('spool_max_size, storage', [(1 << 20, 'memory'), (1024, 'disk')])
+def test_upload_storage_follows_the_spool_threshold(client, scan_png, monkeypatch, spool_max_size, storage):
+    monkeypatch.setattr(SpooledRequest, 'spool_max_size', spool_max_size)
+
+    response = client.post('/analyze', data={'scan_type': 'liver', 'file': (io.BytesIO(scan_png), 'scan.png')})
+
+    assert response.status_code == 200
+    assert response.get_json()['decode']['upload'] == {'bytes': len(scan_png), 'storage': storage}
+
+
+def test_spool_records_its_rollover(tmp_path):
+    spool = spool_stream(io.BytesIO(b'x' * 100), max_size=1024, dir=str(tmp_path))
+    assert in_memory_spool(spool)
+    assert upload_storage(spool) == ('memory', 100)
+
+    spool.seek(0, io.SEEK_END)
+    spool.write(b'x' * 2048)
+    assert spool.on_disk and not in_memory_spool(spool)
+    assert upload_storage(spool) == ('disk', 2148)
+    assert list(tmp_path.iterdir()) == []  # unlinked temp file
+    spool.close()
+
+
+def test_fileno_rolls_an_in_memory_spool_over():
+    spool = UploadSpool(max_size=1024)
+    spool.fileno()
+    assert spool.on_disk
+    spool.close()
@@ -0,0 +1,38 @@
+# tests/test_validation.py
+
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def slow_ocr(scans_app, analyzer, monkeypatch):
+    """OCR that blocks until released, under a 50 ms budget"""
+    release = threading.Event()
+    monkeypatch.setattr(scans_app, 'OCR_TIMEOUT_S', 0.05)
+    monkeypatch.setattr(analyzer, 'ocr_text', lambda image: release.wait(5) and 'liver')
+    yield release
+    release.set()
+
+
+def test_ocr_over_the_budget_is_skipped_and_not_cached(analyzer, slow_ocr, scan_image):
+    result = analyzer.analyze_scan(scan_image.copy(), 'liver')
+
+    assert result['validation_status'] == 'skipped'
+    assert result['image_validated'] is True
+    assert 'budget' in result['validation_message']
+    assert analyzer.result_cache.stats()['memory_entries'] == 0
+
+    slow_ocr.set()
+    assert analyzer.analyze_scan(scan_image.copy(), 'liver')['cache_hit'] is False
+
+
+def test_ocr_within_the_budget_completes_and_is_cached(scans_app, analyzer, scan_image, monkeypatch):
+    monkeypatch.setattr(scans_app, 'OCR_TIMEOUT_S', 2.0)
+    monkeypatch.setattr(analyzer, 'ocr_text', lambda image: 'abdominal liver')
+
+    result = analyzer.analyze_scan(scan_image.copy(), 'liver')
+
+    assert result['validation_status'] == 'completed'
+    assert "'liver'" in result['validation_message']
+    assert analyzer.analyze_scan(scan_image.copy(), 'liver')['cache_hit'] is True
@@ -0,0 +1,66 @@
+# tests/test_video.py
+
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmark import synthetic_scan
+from utils.preprocessing import ANALYSIS_SIZE, ScanContext
+from utils.video import HEART_REGION, WALL_REGION, heart_frame_metrics, is_video
+from utils.volume import resize_stack
+
+
+def ftyp(brand):
+    return b'\x00\x00\x00\x1cftyp' + brand + b'\x00\x00\x02\x00'
+
+
+@pytest.mark.parametrize('head', [
+    ftyp(b'isom'), ftyp(b'mp42'), ftyp(b'qt  '), ftyp(b'M4V '), ftyp(b'3gp5'),
+    b'RIFF\x00\x00\x00\x00AVI LIST',
+    b'\x1a\x45\xdf\xa3\x01\x00\x00\x00\x00\x00\x00\x1f',
+])
+def test_video_containers_are_detected(head):
+    assert is_video(head)
+    stream = io.BytesIO(head)
+    assert is_video(stream) and stream.tell() == 0
+
+
+@pytest.mark.parametrize('brand', [b'heic', b'heix', b'mif1', b'msf1', b'avif', b'avis'])
+def test_heic_and_avif_stills_are_not_video(brand):
+    assert not is_video(ftyp(brand))
+
+
+def test_clip_written_by_opencv_is_detected(tmp_path):
+    path = str(tmp_path / 'clip.mp4')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 10, (64, 64))
+    if not writer.isOpened():
+        pytest.skip('no mp4v encoder in this OpenCV build')
+    writer.write(np.zeros((64, 64, 3), np.uint8))
+    writer.release()
+    with open(path, 'rb') as clip:
+        assert is_video(clip.read())
+
+
+def still_metrics(frame):
+    """analyze_heart's two metrics, the way it computes them"""
+    stats = ScanContext.of(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)).features('heart')
+    return {'heart_area': stats.count('>', 0.4, *HEART_REGION), 'wall_intensity': stats.mean(*WALL_REGION)}
+
+
+@pytest.mark.parametrize('frame', [
+    cv2.cvtColor(synthetic_scan(300, 260, 3), cv2.COLOR_BGR2GRAY),
+    np.full((240, 320), 230, np.uint8),  # bright enough for both heart findings
+])
+def test_frame_metrics_match_analyze_heart_on_a_still(analyzer, frame):
+    metrics = heart_frame_metrics(resize_stack(frame[None], ANALYSIS_SIZE))
+    findings, _ = analyzer.heart_findings(metrics['heart_area'][0], metrics['wall_intensity'][0])
+
+    still = analyzer.analyze_heart(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+
+    assert still['detected_conditions'] == (findings or ['Normal cardiac structure'])
+    stats = still_metrics(frame)
+    assert metrics['heart_area'][0] == stats['heart_area']
+    assert metrics['wall_intensity'][0] == pytest.approx(stats['wall_intensity'], abs=1e-9)
+
@@ -0,0 +1,62 @@
+# tests/test_volume.py
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmark import synthetic_scan
+from utils.preprocessing import ANALYSIS_SIZE, ScanContext
+from utils.volume import iter_array_chunks, mri_slice_metrics, resize_stack
+
+
+@pytest.fixture
+def volume():
+    """Six gray slices at a size the analysis resizes from"""
+    return np.stack([cv2.cvtColor(synthetic_scan(300, 260, seed), cv2.COLOR_BGR2GRAY) for seed in range(6)])
+
+
+def test_slice_metrics_match_the_single_image_analyzer(volume):
+    metrics = mri_slice_metrics(resize_stack(volume, ANALYSIS_SIZE))
+
+    for i, slice_ in enumerate(volume):
+        ctx = ScanContext(cv2.cvtColor(slice_, cv2.COLOR_GRAY2BGR))
+        processed = ctx.processed('mri')
+        stats = ctx.features('mri')
+        height, width = processed.shape
+        # The same expressions as analyze_mri
+        symmetry_diff = np.mean(np.abs(processed[:, :width // 2] - np.fliplr(processed[:, width // 2:])))
+        mean, std = stats.mean(), stats.std()
+
+        assert metrics['symmetry_diff'][i] == pytest.approx(symmetry_diff, abs=1e-9)
+        assert metrics['mean'][i] == pytest.approx(mean, abs=1e-9)
+        assert metrics['std'][i] == pytest.approx(std, abs=1e-6)
+        assert metrics['abnormal_regions'][i] == stats.count('>', mean + 2 * std)
+        assert metrics['center_mean'][i] == pytest.approx(
+            stats.mean(height // 3, 2 * height // 3, width // 3, 2 * width // 3), abs=1e-9)
+
+
+def test_volume_slices_get_the_single_image_findings(analyzer, volume):
+    result = analyzer.analyze_mri_volume(iter_array_chunks(volume, chunk=4))
+
+    for entry, slice_ in zip(result['slices'], volume):
+        single = analyzer.analyze_mri(ScanContext(cv2.cvtColor(slice_, cv2.COLOR_GRAY2BGR)))
+        expected = [] if single['status'] == 'Normal' else single['detected_conditions']
+        assert entry['detected_conditions'] == expected
+
+
+def test_model_use_is_reported_per_slice_when_a_later_chunk_fails(analyzer, stub_models, volume, monkeypatch):
+    run_model = analyzer._run_model
+    calls = []
+
+    def fail_after_first_chunk(scan_type, images):
+        calls.append(len(images))
+        if len(calls) > 1:
+            raise RuntimeError('model crashed')
+        return run_model(scan_type, images)
+
+    monkeypatch.setattr(analyzer, '_run_model', fail_after_first_chunk)
+    result = analyzer.analyze_mri_volume(iter_array_chunks(volume, chunk=4))
+
+    assert [entry['ai_model_used'] for entry in result['slices']] == [True] * 4 + [False] * 2
+    assert result['ai_model_used'] is True
+    assert result['model_scored_slices'] == 4
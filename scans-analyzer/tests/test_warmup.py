@@ -0,0 +1,47 @@
+# tests/test_warmup.py
+
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def fresh_readiness(analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer, 'ready', threading.Event())
+    monkeypatch.setattr(analyzer, 'warmup_report', {'state': 'pending'})
+    return analyzer
+
+
+def test_warm_up_loads_the_primary_models_before_readiness(scans_app, fresh_readiness, stub_models, client):
+    analyzer = fresh_readiness
+    assert analyzer.model_manager.resident() == []
+
+    report = analyzer.warm_up(sizes=[64])
+
+    assert report['state'] == 'done'
+    assert sorted(analyzer.model_manager.resident()) == sorted(scans_app.MODEL_SPECS)
+    assert client.get('/ready').status_code == 200
+
+
+def test_not_ready_while_a_warm_up_model_is_missing(scans_app, fresh_readiness, stub_models, client, monkeypatch):
+    analyzer = fresh_readiness
+    monkeypatch.setattr(scans_app, 'WARMUP_MODELS', 'chest,skin')
+    for name in scans_app.MODEL_SPECS['skin']['candidates']:
+        stub_models.add(name)
+
+    report = analyzer.warm_up(sizes=[64])
+
+    assert report['state'] == 'waiting_for_models'
+    assert report['missing_models'] == ['skin']
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()['warmup']['missing_models'] == ['skin']
+
+
+def test_none_only_warms_resident_models(scans_app, fresh_readiness, stub_models, monkeypatch):
+    analyzer = fresh_readiness
+    monkeypatch.setattr(scans_app, 'WARMUP_MODELS', 'none')
+
+    assert analyzer.warm_up(sizes=[64])['state'] == 'done'
+    assert analyzer.model_manager.resident() == []
+    assert analyzer.ready.is_set()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Fit the nearest-centroid scan type router used by scan_type=auto.
+
+The data directory holds one folder of example images per scan type
+(mri/, xray/, chest/, kidney/, heart/, skin/, liver/); folders for other
+names are ignored. A few dozen images per type are enough.
+
+Examples:
+    python train_router.py data/scans                       # writes router_centroids.json
+    python train_router.py data/scans --output /models/router.json --holdout 0.2
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+SCAN_TYPES = ['mri', 'xray', 'chest', 'kidney', 'heart', 'skin', 'liver']
+
+
+def load_features(data_dir):
+    from utils.decoding import decode_image
+    from utils.dicom import decode_dicom, is_dicom
+    from utils.scan_router import router_features
+
+    features = {}
+    for scan_type in SCAN_TYPES:
+        folder = os.path.join(data_dir, scan_type)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, name), 'rb') as image_file:
+                data = image_file.read()
+            image, _ = decode_dicom(data) if is_dicom(data) else decode_image(data)
+            if image is None:
+                print(f"⚠️ Skipping unreadable {scan_type}/{name}", file=sys.stderr)
+                continue
+            features.setdefault(scan_type, []).append(router_features(image)[0])
+    return features
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit the scan type router from labelled example images')
+    parser.add_argument('data_dir', help='Folder with one sub-folder of images per scan type')
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'router_centroids.json'))
+    parser.add_argument('--holdout', type=float, default=0.0, help='Fraction of each type held out to report accuracy')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from utils.scan_router import ScanTypeRouter, fit_centroids
+
+    features = load_features(args.data_dir)
+    if len(features) < 2:
+        parser.error(f"need example images for at least two scan types under {args.data_dir}")
+
+    rng = np.random.RandomState(args.seed)
+    train, held_out = {}, []
+    for scan_type, vectors in features.items():
+        order = rng.permutation(len(vectors))
+        cut = int(len(vectors) * args.holdout)
+        train[scan_type] = [vectors[i] for i in order[cut:]]
+        held_out += [(scan_type, vectors[i]) for i in order[:cut]]
+
+    model = fit_centroids(train)
+    with open(args.output, 'w') as output:
+        json.dump(model, output)
+    counts = ', '.join(f"{scan_type}: {len(vectors)}" for scan_type, vectors in train.items())
+    print(f"✅ Router model written to {args.output} ({counts})", file=sys.stderr)
+
+    if held_out:
+        router = ScanTypeRouter(args.output)
+        correct = sum(router.nearest(vector) == scan_type for scan_type, vector in held_out)
+        print(f"📊 Held-out accuracy: {correct / len(held_out):.1%} ({len(held_out)} images)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
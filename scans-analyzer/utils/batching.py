@@ -0,0 +1,121 @@
+# utils/batching.py
+
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchingQueue:
+    """Collect single-image inference requests and run them as one batched call.
+
+    Requests arriving within `window_ms` of the first queued item (or until
+    `max_batch` items are waiting) are handed to `infer_fn` as a list, and each
+    caller gets its own slice of the output back through a Future.
+    """
+
+    def __init__(self, name, infer_fn, window_ms=20, max_batch=8):
+        self.name = name
+        self.infer_fn = infer_fn
+        self.window_ms = window_ms
+        self.max_batch = max(1, int(max_batch))
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._queue_wait_ms = 0.0
+        self._infer_ms = 0.0
+
+    @property
+    def enabled(self):
+        return self.window_ms > 0 and self.max_batch > 1
+
+    def submit(self, item):
+        """Queue one item and return a Future resolving to its result"""
+        future = Future()
+        with self._cond:
+            self._ensure_worker()
+            self._pending.append((item, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def __call__(self, item, timeout=None):
+        if not self.enabled:
+            return self.infer_fn([item])[0]
+        return self.submit(item).result(timeout=timeout)
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name=f"batcher-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # Hold the batch open until the window closes or it is full
+            deadline = self._pending[0][2] + self.window_ms / 1000.0
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            items = [item for item, _, _ in batch]
+            started = time.perf_counter()
+
+            try:
+                results = self.infer_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"Batch returned {len(results)} results for {len(items)} inputs"
+                    )
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                finished = time.perf_counter()
+                with self._cond:
+                    self._batches += 1
+                    self._items += len(batch)
+                    self._largest_batch = max(self._largest_batch, len(batch))
+                    self._queue_wait_ms += sum((started - queued) * 1000 for _, _, queued in batch)
+                    self._infer_ms += (finished - started) * 1000
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        with self._cond:
+            batches = self._batches or 1
+            items = self._items or 1
+            return {
+                'enabled': self.enabled,
+                'window_ms': self.window_ms,
+                'max_batch': self.max_batch,
+                'pending': len(self._pending),
+                'batches_run': self._batches,
+                'items_processed': self._items,
+                'avg_batch_size': round(self._items / batches, 2),
+                'largest_batch': self._largest_batch,
+                'avg_queue_wait_ms': round(self._queue_wait_ms / items, 2),
+                'avg_batch_infer_ms': round(self._infer_ms / batches, 2),
+            }
@@ -0,0 +1,161 @@
+# utils/cv_pipeline.py
+
+import contextlib
+import threading
+
+import cv2
+import numpy as np
+
+# Edge / threshold chain of each analyzer, fixed per scan type
+PIPELINE_SETTINGS = {
+    'mri': {'canny': (30, 100)},
+    'xray': {'blur': (5, 5), 'canny': (50, 150), 'sobel': True},
+    'chest': {},
+    'kidney': {},
+    'heart': {},
+    'skin': {'canny': (50, 150)},
+    'liver': {},
+}
+
+
+class Workspace:
+    """CLAHE objects and scratch buffers of every pipeline, used by one analysis at a time"""
+
+    def __init__(self):
+        self.clahe = {}  # scan type -> cv2.CLAHE (not thread-safe)
+        self.buffers = {}  # (scan type, name) -> array
+
+
+class WorkspacePool:
+    """Bounded free list of Workspaces, each checked out for one whole analysis.
+
+    Werkzeug serves every request on a new thread, so per-thread state was
+    rebuilt on every /analyze call. A workspace is handed from one analysis to
+    the next regardless of the thread. At most `max_idle` workspaces are kept;
+    analyses beyond that many at once get a fresh one that is dropped after.
+    """
+
+    def __init__(self, max_idle=32):
+        self.max_idle = max_idle
+        self._free = []
+        self._lock = threading.Lock()
+        self._current = threading.local()
+        self._counters = {'checkouts': 0, 'created': 0, 'dropped': 0}
+
+    def current(self):
+        return getattr(self._current, 'workspace', None)
+
+    @contextlib.contextmanager
+    def checkout(self):
+        """Make a workspace current on this thread (nested checkouts share it)"""
+        workspace = self.current()
+        if workspace is not None:
+            yield workspace
+            return
+        with self._lock:
+            workspace = self._free.pop() if self._free else None
+            self._counters['checkouts'] += 1
+            self._counters['created'] += workspace is None
+        workspace = workspace or Workspace()
+        self._current.workspace = workspace
+        try:
+            yield workspace
+        finally:
+            self._current.workspace = None
+            with self._lock:
+                if len(self._free) < self.max_idle:
+                    self._free.append(workspace)
+                else:
+                    self._counters['dropped'] += 1
+
+    def run(self, fn, *args):
+        """fn(*args) with a workspace checked out, e.g. on a pool thread"""
+        with self.checkout():
+            return fn(*args)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, 'idle': len(self._free), 'max_idle': self.max_idle}
+
+
+class ScanPipeline:
+    """One scan type's OpenCV chain, configured once and shared by all threads.
+
+    analysis_view() is CLAHE (when `enhance`) + resize of the grayscale image to
+    the analysis size; edges() is [blur] -> Canny [| |Sobel d2/dxdy|] and
+    otsu() an Otsu threshold. Everything stays uint8 / int16: no float64
+    intermediates. CLAHE objects (they are not thread-safe) and scratch buffers
+    come from the workspace the analysis has checked out of `workspaces`, and
+    are reused while the input shape repeats. Outside a checkout every call
+    allocates its own.
+
+    Arrays returned by edges() and otsu() are those scratch buffers: they are
+    only valid until the same analysis calls the method again, so callers must
+    consume (or copy) them right away. analysis_view() returns a new array.
+    """
+
+    def __init__(self, scan_type, size, enhance=False, clip_limit=2.0, tile_grid=(8, 8),
+                 blur=None, canny=None, sobel=False, workspaces=None):
+        self.scan_type = scan_type
+        self.size = size  # (w, h)
+        self.enhance = enhance
+        self.clip_limit = clip_limit
+        self.tile_grid = tile_grid
+        self.blur = blur
+        self.canny = canny
+        self.sobel = sobel
+        self.workspaces = workspaces
+
+    def _workspace(self):
+        return self.workspaces.current() if self.workspaces is not None else None
+
+    def _clahe(self):
+        workspace = self._workspace()
+        clahe = workspace.clahe.get(self.scan_type) if workspace is not None else None
+        if clahe is None:
+            clahe = cv2.createCLAHE(clipLimit=self.clip_limit, tileGridSize=self.tile_grid)
+            if workspace is not None:
+                workspace.clahe[self.scan_type] = clahe
+        return clahe
+
+    def _buffer(self, name, like, dtype=None):
+        """Scratch array shaped like `like` from the current workspace, reallocated only when the shape changes"""
+        workspace = self._workspace()
+        dtype = dtype or like.dtype
+        if workspace is None:
+            return np.empty(like.shape, dtype)
+        key = (self.scan_type, name)
+        buffer = workspace.buffers.get(key)
+        if buffer is None or buffer.shape != like.shape or buffer.dtype != dtype:
+            buffer = workspace.buffers[key] = np.empty(like.shape, dtype)
+        return buffer
+
+    def enhance_contrast(self, gray, out=None):
+        """CLAHE of a uint8 grayscale image, into `out` when given"""
+        return self._clahe().apply(gray, dst=out if out is not None else np.empty_like(gray))
+
+    def analysis_view(self, gray):
+        """uint8 analysis-size view: [CLAHE ->] resize; the full-size CLAHE result is scratch"""
+        source = self.enhance_contrast(gray, self._buffer('clahe', gray)) if self.enhance else gray
+        out = np.empty((self.size[1], self.size[0]), np.uint8)
+        cv2.resize(source, self.size, dst=out)
+        return out
+
+    def edges(self, view):
+        """Edge map of an analysis view (scratch buffer, see the class docstring)"""
+        low, high = self.canny or (50, 150)
+        source = view
+        if self.blur:
+            source = cv2.GaussianBlur(view, self.blur, 0, dst=self._buffer('blur', view))
+        edges = cv2.Canny(source, low, high, edges=self._buffer('edges', view))
+        if self.sobel:
+            # Mixed derivative in int16, saturated to uint8 (|d| > 255 clips to 255)
+            gradient = cv2.Sobel(source, cv2.CV_16S, 1, 1, dst=self._buffer('sobel', view, np.int16), ksize=3)
+            magnitude = cv2.convertScaleAbs(gradient, dst=self._buffer('sobel_abs', view))
+            cv2.bitwise_or(edges, magnitude, dst=edges)
+        return edges
+
+    def otsu(self, view):
+        """Otsu binary mask of an analysis view (scratch buffer, see the class docstring)"""
+        _, binary = cv2.threshold(view, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=self._buffer('otsu', view))
+        return binary
@@ -0,0 +1,57 @@
+# utils/decoding.py
+
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# OpenCV decodes JPEGs at 1/2, 1/4, 1/8 scale via libjpeg DCT scaling
+REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def image_dimensions(data):
+    """Read (width, height) from the image header without decoding pixels.
+    A memory-mapped upload is read in place rather than copied into a BytesIO."""
+    try:
+        with Image.open(data if hasattr(data, 'read') else io.BytesIO(data)) as header:
+            return header.size
+    except Exception:
+        return None
+
+
+def choose_reduction(width, height, min_side, min_long_side):
+    """Largest power-of-two reduction that keeps both target sizes satisfied"""
+    for factor in sorted(REDUCED_FLAGS, reverse=True):
+        if min(width, height) / factor >= min_side and max(width, height) / factor >= min_long_side:
+            return factor
+    return 1
+
+
+def decode_image(data, min_side=384, min_long_side=0, full_res=False):
+    """Decode upload bytes (or an mmap) to BGR, at reduced resolution when the image is oversized.
+
+    Returns (image, info) where info records the header size and the
+    reduction factor used; image is None when the bytes are not an image.
+    """
+    size = image_dimensions(data)
+    factor = 1
+    if size is not None and not full_res:
+        factor = choose_reduction(size[0], size[1], min_side, min_long_side)
+
+    buffer = np.frombuffer(data, np.uint8)
+    image = cv2.imdecode(buffer, REDUCED_FLAGS.get(factor, cv2.IMREAD_COLOR))
+    if image is None and factor != 1:
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        factor = 1
+
+    info = {
+        'original_size': list(size) if size else None,
+        'decoded_size': [image.shape[1], image.shape[0]] if image is not None else None,
+        'reduction': factor,
+    }
+    return image, info
@@ -0,0 +1,187 @@
+# utils/dicom.py
+
+import importlib.util
+import io
+import mmap
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from utils.uploads import in_memory_spool
+
+# Part 10 files carry a 128-byte preamble followed by the 'DICM' magic
+DICOM_MAGIC_OFFSET = 128
+DICOM_UNAVAILABLE = 'DICOM support requires pydicom (pip install pydicom)'
+
+
+def dicom_available():
+    """True when pydicom is installed (DICOM uploads are refused up front otherwise)"""
+    return importlib.util.find_spec('pydicom') is not None
+
+
+def is_dicom(source):
+    """True for DICOM Part 10 bytes or a seekable stream positioned at the start of one"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:DICOM_MAGIC_OFFSET + 4])
+    else:
+        position = source.tell()
+        head = source.read(DICOM_MAGIC_OFFSET + 4)
+        source.seek(position)
+    return head[DICOM_MAGIC_OFFSET:DICOM_MAGIC_OFFSET + 4] == b'DICM'
+
+
+@contextmanager
+def open_source(source):
+    """File-like view of a DICOM upload: memory-mapped when it lives in a real file"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+        return
+    try:
+        fileno = None if in_memory_spool(source) else source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+    if fileno is None:
+        source.seek(0)
+        yield source
+        return
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+def _frame_item(ds, index, sequence, attribute):
+    """Enhanced multi-frame objects keep per-frame attributes in functional groups"""
+    for groups in (ds.get('PerFrameFunctionalGroupsSequence'), ds.get('SharedFunctionalGroupsSequence')):
+        if not groups:
+            continue
+        group = groups[index] if len(groups) > index else groups[0]
+        items = group.get(sequence)
+        if items and attribute in items[0]:
+            return items[0]
+    return ds if attribute in ds else None
+
+
+def _first(value):
+    return float(value[0]) if hasattr(value, '__len__') and not isinstance(value, str) else float(value)
+
+
+def window_frame(pixels, ds, index=0, window=None):
+    """Map stored values to uint8 with the modality LUT and the VOI window.
+
+    The window comes from `window` (center, width), the DICOM tags, or, when the
+    file has neither, the 0.5-99.5 percentile range. Returns (uint8, window info).
+    """
+    rescale = _frame_item(ds, index, 'PixelValueTransformationSequence', 'RescaleSlope')
+    slope = _first(rescale.RescaleSlope) if rescale is not None else 1.0
+    intercept = _first(rescale.RescaleIntercept) if rescale is not None and 'RescaleIntercept' in rescale else 0.0
+    values = pixels.astype(np.float32) * slope + intercept
+
+    voi = _frame_item(ds, index, 'FrameVOILUTSequence', 'WindowCenter')
+    if window is not None:
+        center, width = window
+        source = 'request'
+    elif voi is not None and 'WindowWidth' in voi:
+        center, width = _first(voi.WindowCenter), _first(voi.WindowWidth)
+        source = 'dicom'
+    else:
+        low, high = np.percentile(values, (0.5, 99.5))
+        center, width = (low + high) / 2, high - low
+        source = 'percentile'
+
+    width = max(float(width), 1.0)
+    scaled = np.clip((values - (center - width / 2)) / width, 0, 1) * 255
+    frame = scaled.astype(np.uint8)
+    if ds.get('PhotometricInterpretation') == 'MONOCHROME1':
+        frame = 255 - frame  # MONOCHROME1 stores bright as low values
+    return frame, {'center': round(float(center), 2), 'width': round(width, 2), 'source': source}
+
+
+def decode_dicom(source, frame=None, window=None):
+    """Decode one frame of a DICOM upload to BGR uint8.
+
+    Only the requested frame (default: the middle one) is read and decoded, so a
+    multi-frame volume is never materialized. Returns (image, info) like
+    decode_image; image is None and info['error'] is set on failure.
+    """
+    try:
+        import pydicom
+        from pydicom.pixels import pixel_array
+    except ImportError:
+        return None, {'format': 'dicom', 'error': DICOM_UNAVAILABLE}
+
+    try:
+        with open_source(source) as fp:
+            ds = pydicom.dcmread(fp, stop_before_pixels=True)
+            frames = int(ds.get('NumberOfFrames') or 1)
+            index = frames // 2 if frame is None else int(frame)
+            if not 0 <= index < frames:
+                return None, {'format': 'dicom', 'frames': frames, 'error': f'Frame {index} out of range (0-{frames - 1})'}
+            fp.seek(0)
+            pixels = pixel_array(fp, index=index)
+    except Exception as e:
+        return None, {'format': 'dicom', 'error': f'Unreadable DICOM: {e}'}
+
+    if pixels.ndim == 3:
+        # Color (RGB / YBR, converted to RGB by pydicom): no windowing
+        image = cv2.cvtColor(pixels.astype(np.uint8), cv2.COLOR_RGB2BGR)
+        window_info = None
+    else:
+        gray, window_info = window_frame(pixels, ds, index, window)
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+    info = {
+        'format': 'dicom',
+        'original_size': [int(ds.Columns), int(ds.Rows)],
+        'decoded_size': [image.shape[1], image.shape[0]],
+        'reduction': 1,
+        'frames': frames,
+        'frame': index,
+        'modality': ds.get('Modality'),
+        'window': window_info,
+    }
+    return image, info
+
+
+@contextmanager
+def open_dicom_frames(source, stride=1, max_frames=None, window=None):
+    """Lazily decode the frames of a multi-frame DICOM, one at a time.
+
+    Yields (info, frames) where frames iterates (index, uint8 gray or RGB frame).
+    Files without window tags share the middle frame's percentile window.
+    """
+    try:
+        import pydicom
+        from pydicom.pixels import iter_pixels, pixel_array
+    except ImportError:
+        raise ValueError(DICOM_UNAVAILABLE)
+
+    with open_source(source) as fp:
+        ds = pydicom.dcmread(fp, stop_before_pixels=True)
+        frames = int(ds.get('NumberOfFrames') or 1)
+        indices = list(range(0, frames, stride))[:max_frames]
+
+        has_window = _frame_item(ds, 0, 'FrameVOILUTSequence', 'WindowWidth') is not None
+        window_info = None
+        if window is None and not has_window and ds.get('SamplesPerPixel', 1) == 1:
+            fp.seek(0)
+            _, window_info = window_frame(pixel_array(fp, index=frames // 2), ds, frames // 2)
+            window = (window_info['center'], window_info['width'])
+
+        def iterate():
+            fp.seek(0)
+            for index, pixels in zip(indices, iter_pixels(fp, indices=indices)):
+                if pixels.ndim == 3:
+                    yield index, pixels.astype(np.uint8)
+                else:
+                    yield index, window_frame(pixels, ds, index, window)[0]
+
+        info = {
+            'format': 'dicom',
+            'frames': frames,
+            'size': [int(ds.Columns), int(ds.Rows)],
+            'modality': ds.get('Modality'),
+            'window': None if ds.get('SamplesPerPixel', 1) != 1 else window_info or (
+                {'center': window[0], 'width': window[1], 'source': 'request'} if window else {'source': 'dicom'}
+            ),
+        }
+        yield info, iterate()
@@ -0,0 +1,82 @@
+# utils/features.py
+
+import threading
+
+import cv2
+import numpy as np
+
+
+class RegionStats:
+    """Summed-area tables answering rectangular mean / std / count in O(1).
+
+    Sum and sum-of-squares tables are built once per image; thresholded count
+    tables are built on first use per (op, threshold) and reused for every
+    region queried with that threshold. Regions are given as slice bounds
+    (y0, y1, x0, x1), with None meaning the image edge, like processed[y0:y1, x0:x1].
+
+    Statistics and thresholds are in units of pixel / `unit`: a uint8 image
+    with unit=255 answers like its float copy in [0, 1] without making one.
+    """
+
+    def __init__(self, image, unit=1):
+        self.image = image
+        self.unit = unit
+        self.height, self.width = image.shape[:2]
+        # Exact int32 sums while a uint8 image cannot overflow them (half the table size)
+        sdepth = cv2.CV_32S if image.dtype == np.uint8 and image.size * 255 < 2 ** 31 else cv2.CV_64F
+        self._sum, self._sqsum = cv2.integral2(image, sdepth=sdepth, sqdepth=cv2.CV_64F)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return self._sum.nbytes + self._sqsum.nbytes + sum(t.nbytes for t in self._counts.values())
+
+    def _bounds(self, y0, y1, x0, x1):
+        y0, y1, _ = slice(y0, y1).indices(self.height)
+        x0, x1, _ = slice(x0, x1).indices(self.width)
+        return y0, max(y0, y1), x0, max(x0, x1)
+
+    @staticmethod
+    def _box(table, y0, y1, x0, x1):
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    def area(self, y0=None, y1=None, x0=None, x1=None):
+        y0, y1, x0, x1 = self._bounds(y0, y1, x0, x1)
+        return (y1 - y0) * (x1 - x0)
+
+    def sum(self, y0=None, y1=None, x0=None, x1=None):
+        return float(self._box(self._sum, *self._bounds(y0, y1, x0, x1))) / self.unit
+
+    def mean(self, y0=None, y1=None, x0=None, x1=None):
+        area = self.area(y0, y1, x0, x1)
+        return self.sum(y0, y1, x0, x1) / area if area else 0.0
+
+    def var(self, y0=None, y1=None, x0=None, x1=None):
+        bounds = self._bounds(y0, y1, x0, x1)
+        area = (bounds[1] - bounds[0]) * (bounds[3] - bounds[2])
+        if not area:
+            return 0.0
+        mean = self._box(self._sum, *bounds) / area / self.unit
+        return max(0.0, float(self._box(self._sqsum, *bounds) / area / (self.unit * self.unit) - mean * mean))
+
+    def std(self, y0=None, y1=None, x0=None, x1=None):
+        return float(np.sqrt(self.var(y0, y1, x0, x1)))
+
+    def count(self, op, threshold, y0=None, y1=None, x0=None, x1=None):
+        """Number of pixels with `pixel op threshold` ('>' or '<') in the region"""
+        key = (op, float(threshold))
+        with self._lock:
+            table = self._counts.get(key)
+            if table is None:
+                if self.image.dtype == np.uint8 and self.unit != 1:
+                    # Per-value lookup so `v / unit > threshold` is decided exactly as on the float copy
+                    values = np.arange(256) / self.unit
+                    lut = (values > threshold if op == '>' else values < threshold).astype(np.uint8)
+                    mask = cv2.LUT(self.image, lut)
+                else:
+                    mask = (self.image > threshold if op == '>' else self.image < threshold).view(np.uint8)
+                table = cv2.integral(mask, sdepth=cv2.CV_32S)
+                self._counts[key] = table
+        return int(self._box(table, *self._bounds(y0, y1, x0, x1)))
@@ -0,0 +1,287 @@
+# utils/jobs.py
+
+import ipaddress
+import json
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+def is_public_address(address):
+    return ipaddress.ip_address(address.split('%')[0]).is_global
+
+
+class PinnedAddressAdapter(HTTPAdapter):
+    """Connects to an address resolved (and validated) beforehand instead of
+    resolving the URL's host again, keeping that host in the Host header and,
+    for https, in SNI and certificate verification"""
+
+    def __init__(self, hostname, address, **kwargs):
+        self.hostname = hostname
+        self.address = address
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parsed = urlparse(request.url)
+        request = request.copy()
+        request.headers['Host'] = parsed.netloc.rpartition('@')[2]
+        ip = ipaddress.ip_address(self.address.split('%')[0])
+        host = f"[{self.address}]" if ip.version == 6 else self.address
+        request.url = parsed._replace(netloc=f"{host}:{parsed.port}" if parsed.port else host).geturl()
+        return super().send(request, **kwargs)
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if host_params['scheme'] == 'https':
+            pool_kwargs['server_hostname'] = self.hostname
+            pool_kwargs['assert_hostname'] = self.hostname
+        return host_params, pool_kwargs
+
+
+class JobQueue:
+    """Bounded local job queue served by a fixed pool of worker threads.
+
+    `worker_fn(payload)` returns a result dict (containing 'error' on failure).
+    Finished jobs are kept for `result_ttl_s` so clients can poll them, and an
+    optional webhook is POSTed the final job state. Webhooks must resolve to
+    public addresses only, unless their host is in `webhook_allow_hosts`, so
+    a job cannot make the service call its own network. The worker threads start
+    with the first submit(), in the process that serves it: a pre-fork parent
+    never starts threads its workers would inherit dead.
+
+    Jobs run in the process that accepted them. With `db_path`, every state
+    change is also written to a sqlite file, so any process sharing the file
+    (serve.py workers behind one socket) can answer a status lookup.
+    """
+
+    def __init__(self, worker_fn, workers=2, max_queue=100, result_ttl_s=3600, webhook_timeout_s=5,
+                 on_phase=None, on_state=None, webhook_allow_hosts=(), db_path=None):
+        self.worker_fn = worker_fn
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl_s = result_ttl_s
+        self.webhook_timeout_s = webhook_timeout_s
+        self.webhook_allow_hosts = {host.lower() for host in webhook_allow_hosts}
+        self.on_phase = on_phase  # callback(phase, seconds) for metrics
+        self.on_state = on_state  # callback(queue_depth, busy_workers) for metrics
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        self._totals_ms = {'queue_wait': 0.0, 'run': 0.0}
+        self._threads = []
+        self._expired_at = 0.0
+
+        self.db_path = db_path
+        self._db = None  # opened on first use, like the threads: never in a pre-fork parent
+
+    def start(self):
+        """Start the worker threads that are not running (idempotent)"""
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for index in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._work, name=f"scans-job-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def valid_webhook(self, url):
+        """http(s) URL of an allowlisted host, or of one that only resolves to public addresses"""
+        return self.webhook_address(url) is not None
+
+    def webhook_address(self, url):
+        """The validated address to deliver to: '' for an allowlisted host (resolved
+        normally), None when the destination is not allowed"""
+        try:
+            parsed = urlparse(url)
+            host, port = parsed.hostname, parsed.port
+        except ValueError:
+            return None
+        if parsed.scheme not in ('http', 'https') or not host:
+            return None
+        if host.lower() in self.webhook_allow_hosts:
+            return ''
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(host, port or 443, proto=socket.IPPROTO_TCP)]
+        except (socket.gaierror, UnicodeError):
+            return None
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            return None
+        return addresses[0]
+
+    def submit(self, payload, webhook_url=None, metadata=None):
+        """Queue a job and return its public view; raises JobQueueFull when at capacity"""
+        self.start()
+        self._expire()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'created_at': time.time(),
+            'metadata': metadata or {},
+            'webhook': {'url': webhook_url} if webhook_url else None,
+            '_payload': payload,
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+        try:
+            self._queue.put_nowait(job['id'])
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job['id']]
+                self._counters['rejected'] += 1
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} jobs waiting)")
+        with self._lock:
+            self._counters['submitted'] += 1
+            self._publish(job)
+        self._report_state()
+        return self.get(job['id'])
+
+    def get(self, job_id):
+        """Public view of a job accepted by this process or, with a db, by any process sharing it"""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return self._public(job)
+            if self._store() is not None:
+                row = self._db.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+            return None
+
+    @staticmethod
+    def _public(job):
+        return {key: value for key, value in job.items() if not key.startswith('_')}
+
+    def _store(self):
+        """The shared sqlite connection, or None without a db_path (caller holds the lock)"""
+        if self._db is None and self.db_path:
+            # Several processes write to it: WAL lets readers run alongside the writer
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, finished_at REAL, job TEXT)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _publish(self, job):
+        """Write the job's public view to the shared db (caller holds the lock)"""
+        if self._store() is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs (id, finished_at, job) VALUES (?, ?, ?)",
+            (job['id'], job.get('finished_at'), json.dumps(self._public(job), default=str))
+        )
+        self._db.commit()
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+                job['queue_wait_ms'] = round((job['started_at'] - job['created_at']) * 1000, 1)
+                payload = job.pop('_payload')
+                self._busy += 1
+                self._publish(job)
+            self._report_state()
+
+            try:
+                result = self.worker_fn(payload)
+            except Exception as e:
+                result = {'error': str(e)}
+            del payload
+
+            with self._lock:
+                job['finished_at'] = time.time()
+                job['run_ms'] = round((job['finished_at'] - job['started_at']) * 1000, 1)
+                job['status'] = 'failed' if 'error' in result else 'done'
+                job['result'] = result
+                self._busy -= 1
+                self._counters['failed' if 'error' in result else 'completed'] += 1
+                self._totals_ms['queue_wait'] += job['queue_wait_ms']
+                self._totals_ms['run'] += job['run_ms']
+                self._publish(job)
+                public = self._public(job)
+            self._report_state()
+
+            if self.on_phase:
+                self.on_phase('queue_wait', job['queue_wait_ms'] / 1000)
+                self.on_phase('run', job['run_ms'] / 1000)
+
+            if job['webhook']:
+                self._notify(job, public)
+            self._expire()
+
+    def _report_state(self):
+        if self.on_state:
+            self.on_state(self._queue.qsize(), self._busy)
+
+    def _notify(self, job, public):
+        # Checked again at delivery: the host may resolve differently by now. The
+        # request then goes to the address that was checked, a second lookup could
+        # return another one (DNS rebinding). Redirects are not followed, they
+        # could point anywhere
+        url = job['webhook']['url']
+        try:
+            address = self.webhook_address(url)
+            if address is None:
+                raise ValueError('webhook destination is not allowed')
+            with requests.Session() as session:
+                if address:
+                    parsed = urlparse(url)
+                    session.mount(f"{parsed.scheme}://", PinnedAddressAdapter(parsed.hostname, address))
+                response = session.post(url, json=public, timeout=self.webhook_timeout_s, allow_redirects=False)
+            outcome = {'status_code': response.status_code}
+        except Exception as e:
+            outcome = {'error': str(e)}
+        with self._lock:
+            job['webhook'].update(outcome, delivered_at=time.time())
+            self._publish(job)
+
+    def _expire(self):
+        """Drop finished jobs past the TTL (at most once a second: runs on every lookup)"""
+        now = time.time()
+        cutoff = now - self.result_ttl_s
+        with self._lock:
+            if now - self._expired_at < 1.0:
+                return
+            self._expired_at = now
+            expired = [job_id for job_id, job in self._jobs.items() if job.get('finished_at', time.time()) < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            if self._store() is not None:
+                self._db.execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,))
+                self._db.commit()
+
+    def stats(self):
+        self._expire()
+        with self._lock:
+            finished = (self._counters['completed'] + self._counters['failed']) or 1
+            return {
+                'workers': self.workers,
+                'busy_workers': self._busy,
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'tracked_jobs': len(self._jobs),
+                'shared_store': self.db_path,
+                **self._counters,
+                'avg_queue_wait_ms': round(self._totals_ms['queue_wait'] / finished, 1),
+                'avg_run_ms': round(self._totals_ms['run'] / finished, 1),
+            }
@@ -0,0 +1,116 @@
+# utils/metrics.py
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# 1 ms .. 30 s; OCR and the ViT-large model sit in the upper buckets on CPU
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    'scans_stage_seconds',
+    'Time spent in each scan analysis stage',
+    ['stage', 'scan_type'],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter(
+    'scans_requests_total',
+    'Scan analysis requests by outcome',
+    ['scan_type', 'outcome']
+)
+CACHE_LOOKUPS = Counter(
+    'scans_cache_lookups_total',
+    'Result cache lookups',
+    ['scan_type', 'result']
+)
+ROUTER_DECISIONS = Counter(
+    'scans_router_decisions_total',
+    'scan_type=auto routing decisions',
+    ['scan_type', 'method']
+)
+TIER_REQUESTS = Counter(
+    'scans_model_tier_requests_total',
+    'Analyses by the model tier that served them',
+    ['scan_type', 'tier']
+)
+TIER_CHANGES = Counter(
+    'scans_model_tier_changes_total',
+    'Load-driven model tier steps',
+    ['scan_type', 'direction']
+)
+# 0 = primary model; max: under serve.py the most degraded worker is reported
+TIER_LEVEL = Gauge('scans_model_tier_level', 'Tiers stepped down from the primary model', ['scan_type'], multiprocess_mode='max')
+# 64 kB .. 1 GB
+MEMORY_BUCKETS = tuple(float(2 ** power) for power in range(16, 31, 2))
+UPLOAD_BYTES = Histogram(
+    'scans_upload_bytes',
+    'Upload size by where it was held while decoding (bytes, memory spool or disk spool)',
+    ['storage'],
+    buckets=MEMORY_BUCKETS
+)
+REQUEST_MEMORY = Histogram(
+    'scans_request_memory_bytes',
+    'Bytes held by one analysis: upload kept in memory, decoded image and derived views',
+    ['scan_type'],
+    buckets=MEMORY_BUCKETS
+)
+INFLIGHT_MEMORY = Gauge(
+    'scans_inflight_memory_bytes',
+    'Upload and decoded image bytes held by analyses in flight',
+    multiprocess_mode='livesum'
+)
+BATCH_SIZE = Histogram(
+    'scans_model_batch_size',
+    'Images per batched model call',
+    ['scan_type'],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+JOB_SECONDS = Histogram(
+    'scans_job_seconds',
+    'Async job time spent queued and running',
+    ['phase'],
+    buckets=LATENCY_BUCKETS + (60.0, 120.0, 300.0)
+)
+# livesum: under serve.py each worker process reports its own queue
+SCHEDULER_WAIT = Histogram(
+    'scans_scheduler_queue_wait_seconds',
+    'Time an analysis waited for a scheduler slot',
+    ['priority'],
+    buckets=LATENCY_BUCKETS
+)
+SCHEDULER_REJECTED = Counter(
+    'scans_scheduler_rejected_total',
+    'Requests turned away with 429 (queue full or waited too long)',
+    ['priority', 'reason']
+)
+SCHEDULER_QUEUED = Gauge('scans_scheduler_queued', 'Analyses waiting for a slot', ['priority'], multiprocess_mode='livesum')
+SCHEDULER_RUNNING = Gauge('scans_scheduler_running', 'Analyses holding a slot', ['priority'], multiprocess_mode='livesum')
+JOB_QUEUE_DEPTH = Gauge('scans_job_queue_depth', 'Async jobs waiting for a worker', multiprocess_mode='livesum')
+JOB_WORKERS_BUSY = Gauge('scans_job_workers_busy', 'Async job workers currently running a job', multiprocess_mode='livesum')
+
+
+@contextmanager
+def stage_timer(stage, scan_type, timings=None):
+    """Observe a stage in the Prometheus histogram and optionally in a per-request dict (ms)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=stage, scan_type=scan_type).observe(elapsed)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed * 1000, 3)
+
+
+def render_metrics():
+    """Prometheus text exposition for the /metrics endpoint.
+
+    Under serve.py (PROMETHEUS_MULTIPROC_DIR set) this aggregates every worker process.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
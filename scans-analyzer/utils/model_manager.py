@@ -0,0 +1,182 @@
+# utils/model_manager.py
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+
+def model_size_mb(model):
+    """Approximate resident weight size of an HF pipeline (parameters + buffers)"""
+    if hasattr(model, 'size_mb'):
+        return model.size_mb
+    torch_model = getattr(model, 'model', None)
+    if torch_model is None or not hasattr(torch_model, 'parameters'):
+        return 0.0
+    total = sum(p.numel() * p.element_size() for p in torch_model.parameters())
+    total += sum(b.numel() * b.element_size() for b in torch_model.buffers())
+    return total / (1024 * 1024)
+
+
+class ModelManager:
+    """Load models on first use and keep the resident set under a RAM budget.
+
+    `specs` maps a scan type to {'candidates': [model names tried in order], ...}.
+    `loader(scan_type, model_name)` builds the model. When the summed weight
+    size exceeds `memory_budget_mb`, the least recently used models are evicted.
+    """
+
+    def __init__(self, specs, loader, memory_budget_mb=0, retry_after_s=300, max_events=100):
+        self.specs = specs
+        self.loader = loader
+        self.memory_budget_mb = memory_budget_mb
+        self.retry_after_s = retry_after_s
+
+        self._resident = OrderedDict()  # scan_type -> {'model', 'name', 'size_mb', ...}
+        self._failures = {}  # scan_type -> (timestamp, error)
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.RLock()
+        self._load_locks = {scan_type: threading.Lock() for scan_type in specs}
+
+    def has_model(self, scan_type):
+        """True when an AI model is configured for the scan type and has not recently failed"""
+        if scan_type not in self.specs:
+            return False
+        failure = self._failures.get(scan_type)
+        return failure is None or time.time() - failure[0] > self.retry_after_s
+
+    def is_resident(self, scan_type):
+        with self._lock:
+            return scan_type in self._resident
+
+    def get(self, scan_type):
+        """Return the model for a scan type, loading it on first use"""
+        with self._lock:
+            entry = self._resident.get(scan_type)
+            if entry is not None:
+                self._resident.move_to_end(scan_type)
+                entry['last_used'] = time.time()
+                entry['uses'] += 1
+                return entry['model']
+
+        if not self.has_model(scan_type):
+            return None
+
+        with self._load_locks[scan_type]:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                if scan_type in self._resident:
+                    return self.get(scan_type)
+            return self._load(scan_type)
+
+    def preload(self, scan_types=None):
+        for scan_type in scan_types or list(self.specs):
+            self.get(scan_type)
+
+    def _load(self, scan_type):
+        errors = []
+        for model_name in self.specs[scan_type]['candidates']:
+            started = time.perf_counter()
+            try:
+                print(f"⏳ Loading {scan_type} model: {model_name}...")
+                model = self.loader(scan_type, model_name)
+            except Exception as e:
+                print(f"❌ {scan_type} model {model_name}: FAILED - {e}")
+                errors.append(f"{model_name}: {e}")
+                continue
+
+            size_mb = model_size_mb(model)
+            duration_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._resident[scan_type] = {
+                    'model': model,
+                    'name': model_name,
+                    'size_mb': size_mb,
+                    'loaded_at': time.time(),
+                    'last_used': time.time(),
+                    'uses': 1,
+                }
+                self._failures.pop(scan_type, None)
+                self._record('load', scan_type, model_name, size_mb=size_mb, duration_ms=duration_ms)
+                self._enforce_budget(keep=scan_type)
+            print(f"✅ {scan_type} model LOADED ({model_name}, {size_mb:.0f} MB, {duration_ms:.0f} ms)")
+            return model
+
+        with self._lock:
+            self._failures[scan_type] = (time.time(), '; '.join(errors))
+            self._record('load_failed', scan_type, None, error='; '.join(errors))
+        return None
+
+    def _enforce_budget(self, keep):
+        if not self.memory_budget_mb:
+            return
+        while self.resident_mb() > self.memory_budget_mb:
+            victim = next((st for st in self._resident if st != keep), None)
+            if victim is None:
+                break
+            self.evict(victim, reason='memory budget')
+
+    def evict(self, scan_type, reason='manual'):
+        with self._lock:
+            entry = self._resident.pop(scan_type, None)
+            if entry is None:
+                return False
+            self._record('evict', scan_type, entry['name'], size_mb=entry['size_mb'], reason=reason)
+        print(f"♻️ Evicted {scan_type} model ({entry['name']}) - {reason}")
+        return True
+
+    def replace(self, scan_type, model):
+        """Swap a resident model for another build of the same weights (e.g. an ONNX session)"""
+        with self._lock:
+            entry = self._resident.get(scan_type)
+            if entry is None or entry['model'] is model:
+                return False
+            entry['model'] = model
+            entry['size_mb'] = model_size_mb(model)
+            self._record('replace', scan_type, entry['name'], size_mb=entry['size_mb'])
+            return True
+
+    def resident_mb(self):
+        with self._lock:
+            return sum(entry['size_mb'] for entry in self._resident.values())
+
+    def resident(self):
+        with self._lock:
+            return list(self._resident)
+
+    def models(self):
+        """Resident models by scan type, without counting as a use"""
+        with self._lock:
+            return {scan_type: entry['model'] for scan_type, entry in self._resident.items()}
+
+    def model_name(self, scan_type):
+        with self._lock:
+            entry = self._resident.get(scan_type)
+            return entry['name'] if entry else None
+
+    def _record(self, event, scan_type, model_name, **extra):
+        self._events.append({
+            'event': event,
+            'scan_type': scan_type,
+            'model': model_name,
+            'at': datetime.now(timezone.utc).isoformat(),
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in extra.items()},
+        })
+
+    def stats(self):
+        with self._lock:
+            return {
+                'memory_budget_mb': self.memory_budget_mb or None,
+                'resident_mb': round(self.resident_mb(), 1),
+                'resident': {
+                    scan_type: {
+                        'model': entry['name'],
+                        'size_mb': round(entry['size_mb'], 1),
+                        'uses': entry['uses'],
+                        'idle_s': round(time.time() - entry['last_used'], 1),
+                    }
+                    for scan_type, entry in self._resident.items()
+                },
+                'failed': {scan_type: error for scan_type, (_, error) in self._failures.items()},
+                'events': list(self._events),
+            }
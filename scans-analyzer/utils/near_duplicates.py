@@ -0,0 +1,184 @@
+# utils/near_duplicates.py
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
+
+
+def dhash(gray, size=8):
+    """Difference hash: sign of horizontal gradients on a (size+1) x size thumbnail"""
+    thumb = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(thumb[:, 1:] > thumb[:, :-1])
+
+
+def phash(gray, size=8, highfreq_factor=4):
+    """DCT hash: low-frequency DCT coefficients above their median"""
+    side = size * highfreq_factor
+    thumb = cv2.resize(gray, (side, side), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(thumb)[:size, :size]
+    return _bits_to_int(low > np.median(low.flatten()[1:]))  # DC term skews the median
+
+
+def perceptual_hashes(gray):
+    """(pHash, dHash) of a grayscale image; both survive re-encoding, resizing and mild crops"""
+    return phash(gray), dhash(gray)
+
+
+def pixel_thumbnail(gray, size=32):
+    """Small area-averaged grayscale thumbnail for a pixel-level comparison of two matches"""
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def pixel_mse(a, b):
+    return float(np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2))
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes for Hamming-radius queries.
+
+    Only the subtrees whose edge distance lies within [d - radius, d + radius]
+    of the query can hold matches (triangle inequality), so a lookup visits a
+    small fraction of the nodes.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, ids, {distance: child}]
+        self.size = 0
+
+    def add(self, value, item_id):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item_id], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item_id], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """[(distance, item_id)] for every stored hash within `radius` bits"""
+        matches = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                matches.extend((distance, item_id) for item_id in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return matches
+
+
+class NearDuplicateIndex:
+    """Perceptual-hash index of analyzed scans, keyed by scan type and model version.
+
+    Candidates are found on pHash within `max_distance` bits and confirmed on
+    dHash within `max_dhash_distance`. Entries added with a pixel thumbnail
+    also report the thumbnails' mean squared error, so callers can demand a
+    pixel-level match before trusting one. Entries beyond `max_entries` are
+    dropped oldest-first; the trees are rebuilt once dropped entries outnumber
+    live ones.
+    """
+
+    def __init__(self, max_distance=6, max_dhash_distance=10, max_entries=10000):
+        self.max_distance = max_distance
+        self.max_dhash_distance = max_dhash_distance
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()  # id -> (namespace, phash, dhash, key, thumbnail)
+        self._trees = {}  # (scan_type, version) -> BKTree
+        self._next_id = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._counters = {'lookups': 0, 'matches': 0, 'added': 0}
+
+    @property
+    def enabled(self):
+        return self.max_distance > 0 and self.max_entries > 0
+
+    def add(self, hashes, scan_type, version, key, thumbnail=None):
+        if not self.enabled:
+            return
+        namespace = (scan_type, version)
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+            self._entries[item_id] = (namespace, hashes[0], hashes[1], key, thumbnail)
+            self._trees.setdefault(namespace, BKTree()).add(hashes[0], item_id)
+            self._counters['added'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._dropped += 1
+            if self._dropped > len(self._entries):
+                self._rebuild()
+
+    def find(self, hashes, scan_type, version, thumbnail=None):
+        """Closest earlier scan as {'key', 'phash_distance', 'dhash_distance', 'pixel_mse'}, or None.
+        pixel_mse is None unless both this scan and the match have a thumbnail."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._counters['lookups'] += 1
+            tree = self._trees.get((scan_type, version))
+            if tree is None:
+                return None
+            best = None
+            for distance, item_id in tree.search(hashes[0], self.max_distance):
+                entry = self._entries.get(item_id)
+                if entry is None:
+                    continue
+                dhash_distance = hamming(hashes[1], entry[2])
+                if dhash_distance > self.max_dhash_distance:
+                    continue
+                candidate = (distance, dhash_distance, item_id)
+                if best is None or candidate < best:
+                    best = candidate
+            if best is None:
+                return None
+            self._counters['matches'] += 1
+            self._entries.move_to_end(best[2])
+            match = self._entries[best[2]]
+            mse = None
+            if thumbnail is not None and match[4] is not None and thumbnail.shape == match[4].shape:
+                mse = round(pixel_mse(thumbnail, match[4]), 2)
+            return {
+                'key': match[3],
+                'phash_distance': best[0],
+                'dhash_distance': best[1],
+                'pixel_mse': mse,
+            }
+
+    def _rebuild(self):
+        self._trees = {}
+        for item_id, (namespace, phash_value, *_) in self._entries.items():
+            self._trees.setdefault(namespace, BKTree()).add(phash_value, item_id)
+        self._dropped = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'max_distance': self.max_distance,
+                'max_dhash_distance': self.max_dhash_distance,
+            }
@@ -0,0 +1,182 @@
+# utils/onnx_backend.py
+
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def parse_backends(raw):
+    """Parse 'skin:onnx-int8,chest:onnx' into {'skin': 'onnx-int8', 'chest': 'onnx'}"""
+    backends = {}
+    for entry in filter(None, (part.strip() for part in raw.split(','))):
+        scan_type, _, backend = entry.partition(':')
+        if backend not in BACKENDS:
+            print(f"⚠️ Unknown inference backend '{backend}' for {scan_type}, using torch")
+            continue
+        backends[scan_type] = backend
+    return backends
+
+
+class OnnxImageClassifier:
+    """ONNX Runtime stand-in for an HF image-classification pipeline.
+
+    Reuses the pipeline's image processor and label map, and returns the same
+    [{'label', 'score'}, ...] structure (a list of those for list inputs).
+    """
+
+    def __init__(self, session, image_processor, config, path, top_k=5):
+        self.session = session
+        self.image_processor = image_processor
+        self.id2label = config.id2label
+        self.multi_label = getattr(config, 'problem_type', None) == 'multi_label_classification'
+        self.path = path
+        self.size_mb = os.path.getsize(path) / (1024 * 1024)
+        self.top_k = top_k
+        self.input_name = session.get_inputs()[0].name
+
+    def reset_after_fork(self, intra_op_threads=None):
+        """ORT thread pools do not survive fork(); open a fresh session in the child"""
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+
+    def probabilities(self, images):
+        pixel_values = self.image_processor(images=images, return_tensors='np')['pixel_values']
+        logits = self.session.run(None, {self.input_name: pixel_values.astype(np.float32)})[0]
+        if self.multi_label:
+            return 1 / (1 + np.exp(-logits))
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def __call__(self, images, batch_size=None, top_k=None):
+        single = isinstance(images, Image.Image)
+        batch = [images] if single else list(images)
+        top_k = min(top_k or self.top_k, len(self.id2label))
+
+        results = []
+        for probs in self.probabilities(batch):
+            order = np.argsort(probs)[::-1][:top_k]
+            results.append([{'label': self.id2label[int(i)], 'score': float(probs[i])} for i in order])
+        return results[0] if single else results
+
+
+def export_onnx(hf_pipeline, model_name, cache_dir, quantize=False):
+    """Export the pipeline's torch model to ONNX once, reusing cached artifacts"""
+    import torch
+
+    model_dir = os.path.join(cache_dir, model_name.replace('/', '__'))
+    os.makedirs(model_dir, exist_ok=True)
+    fp32_path = os.path.join(model_dir, 'model.onnx')
+    int8_path = os.path.join(model_dir, 'model.int8.onnx')
+
+    if not os.path.exists(fp32_path):
+        size = hf_pipeline.image_processor.size
+        height = size.get('height') or size.get('shortest_edge', 224)
+        width = size.get('width') or size.get('shortest_edge', 224)
+        channels = getattr(hf_pipeline.model.config, 'num_channels', 3)
+        dummy = torch.randn(1, channels, height, width)
+
+        def export(tmp_path):
+            with torch.no_grad():
+                torch.onnx.export(
+                    hf_pipeline.model.eval(),
+                    (dummy,),
+                    tmp_path,
+                    input_names=['pixel_values'],
+                    output_names=['logits'],
+                    dynamic_axes={'pixel_values': {0: 'batch'}, 'logits': {0: 'batch'}},
+                    opset_version=17,
+                    dynamo=False
+                )
+        _write_atomically(fp32_path, export)
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        _write_atomically(int8_path, lambda tmp_path: quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8))
+    return int8_path
+
+
+def _write_atomically(path, write):
+    """Write through a per-process temp file and rename it into place, so
+    serve.py workers exporting the same model never write to the same file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _time_ms(fn, repeats=3):
+    fn()  # first call pays one-off allocation cost
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) * 1000 / repeats
+
+
+def parity_check(hf_pipeline, classifier, samples=4, seed=0):
+    """Compare class probabilities of the torch pipeline and the ONNX classifier"""
+    import torch
+
+    rng = np.random.RandomState(seed)
+    images = [Image.fromarray(rng.randint(0, 255, (384, 384, 3), dtype=np.uint8)) for _ in range(samples)]
+
+    with torch.no_grad():
+        inputs = hf_pipeline.image_processor(images=images, return_tensors='pt')
+        logits = hf_pipeline.model(**inputs).logits
+        if classifier.multi_label:
+            torch_probs = torch.sigmoid(logits).numpy()
+        else:
+            torch_probs = torch.softmax(logits, dim=-1).numpy()
+    onnx_probs = classifier.probabilities(images)
+
+    return {
+        'max_abs_diff': float(np.max(np.abs(torch_probs - onnx_probs))),
+        'top1_agreement': float(np.mean(torch_probs.argmax(-1) == onnx_probs.argmax(-1))),
+        'torch_latency_ms': round(_time_ms(lambda: hf_pipeline(images[0])), 1),
+        'onnx_latency_ms': round(_time_ms(lambda: classifier(images[0])), 1),
+    }
+
+
+def build_onnx_classifier(hf_pipeline, model_name, cache_dir, quantize=False, tolerance=0.1):
+    """Export (or reuse) an ONNX artifact and verify it against the torch pipeline.
+
+    Returns (classifier or None, report). None means parity failed and the
+    caller should keep the torch pipeline.
+    """
+    import onnxruntime as ort
+
+    started = time.perf_counter()
+    path = export_onnx(hf_pipeline, model_name, cache_dir, quantize=quantize)
+    session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+    classifier = OnnxImageClassifier(session, hf_pipeline.image_processor, hf_pipeline.model.config, path)
+
+    torch_mb = sum(p.numel() * p.element_size() for p in hf_pipeline.model.parameters()) / (1024 * 1024)
+    parity = parity_check(hf_pipeline, classifier)
+    passed = parity['max_abs_diff'] <= tolerance
+
+    report = {
+        'backend': 'onnx-int8' if quantize else 'onnx',
+        'artifact': path,
+        'parity_passed': passed,
+        'parity_tolerance': tolerance,
+        **{k: round(v, 4) if isinstance(v, float) else v for k, v in parity.items()},
+        'latency_delta_ms': round(parity['onnx_latency_ms'] - parity['torch_latency_ms'], 1),
+        'torch_weights_mb': round(torch_mb, 1),
+        'onnx_weights_mb': round(classifier.size_mb, 1),
+        'memory_delta_mb': round(classifier.size_mb - torch_mb, 1),
+        'build_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+    return (classifier if passed else None), report
@@ -0,0 +1,108 @@
+# utils/preprocessing.py
+
+import threading
+
+import cv2
+from PIL import Image
+
+from utils.cv_pipeline import PIPELINE_SETTINGS, ScanPipeline, WorkspacePool
+from utils.features import RegionStats
+
+# Scan types that get CLAHE contrast enhancement before analysis
+CLAHE_SCAN_TYPES = ('chest', 'xray')
+ANALYSIS_SIZE = (224, 224)
+
+# Built once at import, shared by every request (buffers and CLAHE objects come
+# from the workspace each analysis checks out of WORKSPACES)
+WORKSPACES = WorkspacePool()
+SCAN_PIPELINES = {
+    scan_type: ScanPipeline(scan_type, ANALYSIS_SIZE, enhance=scan_type in CLAHE_SCAN_TYPES,
+                            workspaces=WORKSPACES, **settings)
+    for scan_type, settings in PIPELINE_SETTINGS.items()
+}
+DEFAULT_PIPELINE = ScanPipeline('default', ANALYSIS_SIZE, workspaces=WORKSPACES)
+
+
+def pipeline_for(scan_type):
+    return SCAN_PIPELINES.get(scan_type, DEFAULT_PIPELINE)
+
+
+class ScanContext:
+    """Per-request image views, each computed at most once.
+
+    Validation, the HF models and every analyze_* method read from the same
+    context instead of re-running cvtColor / CLAHE / resize / dtype casts.
+    """
+
+    def __init__(self, image, timings=None):
+        self.image = image  # BGR uint8, as decoded
+        self.timings = timings if timings is not None else {}  # stage -> ms
+        self.model_tier = None  # set per request by the tier controller; None = primary tier
+        self.model_used = None  # name of the model whose predictions the analysis used
+        self._views = {}
+        self._lock = threading.RLock()  # OCR runs on another thread
+
+    @classmethod
+    def of(cls, image):
+        return image if isinstance(image, cls) else cls(image)
+
+    def nbytes(self):
+        """Memory held by the decoded image and every view derived from it"""
+        with self._lock:
+            views = list(self._views.values())
+        total = self.image.nbytes
+        for view in views:
+            if isinstance(view, Image.Image):
+                total += view.width * view.height * len(view.getbands())
+            else:
+                total += getattr(view, 'nbytes', 0)
+        return total
+
+    def _memo(self, key, compute):
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = compute()
+            return self._views[key]
+
+    @property
+    def gray(self):
+        return self._memo('gray', lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def rgb_pil(self):
+        """Full-resolution RGB PIL image for the HF pipelines"""
+        return self._memo('rgb_pil', lambda: Image.fromarray(cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)))
+
+    def ocr_gray(self, max_side):
+        """Grayscale copy no larger than max_side on its longest edge"""
+        def compute():
+            gray = self.gray
+            height, width = gray.shape
+            scale = max_side / max(height, width)
+            if scale >= 1:
+                return gray
+            return cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        return self._memo(('ocr_gray', max_side), compute)
+
+    def processed_uint8(self, scan_type):
+        """224x224 uint8 analysis view, CLAHE-enhanced for chest/xray (the scan type's pipeline)"""
+        enhanced = scan_type in CLAHE_SCAN_TYPES
+        return self._memo(('processed_uint8', enhanced), lambda: pipeline_for(scan_type).analysis_view(self.gray))
+
+    def processed(self, scan_type):
+        """processed_uint8() as floats in [0, 1], for the analyzers that read pixel regions"""
+        enhanced = scan_type in CLAHE_SCAN_TYPES
+        return self._memo(('processed', enhanced), lambda: self.processed_uint8(scan_type) / 255.0)
+
+    def processed_pil(self, scan_type):
+        """processed() as an RGB PIL image for the HF pipelines"""
+        enhanced = scan_type in CLAHE_SCAN_TYPES
+        return self._memo(
+            ('processed_pil', enhanced),
+            lambda: Image.fromarray(self.processed_uint8(scan_type)).convert('RGB')
+        )
+
+    def features(self, scan_type):
+        """Summed-area tables over processed_uint8() for O(1) region statistics in [0, 1] units"""
+        enhanced = scan_type in CLAHE_SCAN_TYPES
+        return self._memo(('features', enhanced), lambda: RegionStats(self.processed_uint8(scan_type), unit=255))
@@ -0,0 +1,115 @@
+# utils/result_cache.py
+
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_key(image, scan_type, model_version):
+    """Hash decoded pixels together with the scan type and model version"""
+    digest = hashlib.sha256()
+    digest.update(f"{scan_type}|{model_version}|{image.shape}|{image.dtype}|".encode())
+    digest.update(memoryview(image if image.flags['C_CONTIGUOUS'] else image.copy()))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier analysis result cache: in-memory LRU plus optional sqlite file.
+
+    Entries older than `ttl_s` are treated as misses on both tiers.
+    """
+
+    def __init__(self, max_entries=512, db_path=None, ttl_s=86400):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+
+        self._memory = OrderedDict()  # key -> (created, result)
+        self._lock = threading.Lock()
+        self._db = None
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'expired': 0}
+
+        self._pruned_at = time.time()
+
+        if db_path:
+            # serve.py workers share the file: WAL lets readers run alongside the writer
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, scan_type TEXT, created REAL, result TEXT)"
+            )
+            self._db.commit()
+
+    def _expired(self, created):
+        return self.ttl_s and time.time() - created > self.ttl_s
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry[0]):
+                    del self._memory[key]
+                    self._counters['expired'] += 1
+                else:
+                    self._memory.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return copy.deepcopy(entry[1])
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, result FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if self._expired(row[0]):
+                        self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                        self._db.commit()
+                        self._counters['expired'] += 1
+                    else:
+                        result = json.loads(row[1])
+                        self._remember(key, row[0], result)
+                        self._counters['disk_hits'] += 1
+                        return copy.deepcopy(result)
+
+            self._counters['misses'] += 1
+            return None
+
+    def put(self, key, result, scan_type=None):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, copy.deepcopy(result))
+            self._counters['stores'] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, scan_type, created, result) VALUES (?, ?, ?, ?)",
+                    (key, scan_type, created, json.dumps(result))
+                )
+                # Expired rows nobody asks for again are dropped every minute or so
+                if self.ttl_s and created - self._pruned_at > 60:
+                    self._db.execute("DELETE FROM results WHERE created < ?", (created - self.ttl_s,))
+                    self._pruned_at = created
+                self._db.commit()
+
+    def _remember(self, key, created, result):
+        self._memory[key] = (created, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            hits = self._counters['memory_hits'] + self._counters['disk_hits']
+            lookups = hits + self._counters['misses']
+            return {
+                **self._counters,
+                'hits': hits,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'max_entries': self.max_entries,
+                'disk_tier': self.db_path,
+                'ttl_s': self.ttl_s,
+            }
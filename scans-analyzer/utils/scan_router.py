@@ -0,0 +1,164 @@
+# utils/scan_router.py
+
+import json
+import os
+
+import cv2
+import numpy as np
+
+ROUTER_THUMB_SIZE = 64
+ROUTER_MODEL_VERSION = 1
+
+
+def router_features(image):
+    """(feature vector, named summary stats) of a BGR image, from a 64x64 thumbnail.
+
+    Intensity histogram, a 4x4 layout of mean brightness, color saturation,
+    edge density, left-right symmetry, dark background share and aspect ratio:
+    enough to tell scan modalities apart in about a millisecond.
+    """
+    height, width = image.shape[:2]
+    # Subsample large images before the area resize, which otherwise reads every pixel
+    step = max(1, min(height, width) // (4 * ROUTER_THUMB_SIZE))
+    size = (ROUTER_THUMB_SIZE, ROUTER_THUMB_SIZE)
+    thumb = cv2.resize(image[::step, ::step], size, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    saturation = cv2.cvtColor(thumb, cv2.COLOR_BGR2HSV)[:, :, 1] / 255.0
+    values = gray / 255.0
+
+    histogram = cv2.calcHist([gray], [0], None, [16], [0, 256]).ravel() / gray.size
+    layout = cv2.resize(gray, (4, 4), interpolation=cv2.INTER_AREA).ravel() / 255.0
+    quarter = ROUTER_THUMB_SIZE // 4
+    center = values[quarter:-quarter, quarter:-quarter]
+    border_mean = (values.sum() - center.sum()) / (values.size - center.size)
+
+    stats = {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'saturation': float(saturation.mean()),
+        'saturation_std': float(saturation.std()),
+        'edge_density': float(np.count_nonzero(cv2.Canny(gray, 50, 150)) / gray.size),
+        'symmetry_diff': float(np.abs(values - values[:, ::-1]).mean()),
+        'dark_fraction': float(np.count_nonzero(gray < 20) / gray.size),
+        'center_contrast': float(center.mean() - border_mean),
+        'log_aspect': float(np.log(width / height)),
+    }
+    vector = np.concatenate([histogram, layout, np.array(list(stats.values()))]).astype(np.float32)
+    return vector, stats
+
+
+def heuristic_route(stats):
+    """{scan_type: probability} from hand-set rules, used when no centroid model is loaded.
+
+    Only modality families are separable this way: color photos (skin),
+    brain MRI (black surround, symmetric, bright center), radiographs
+    (gray, filling the frame) and ultrasound (speckle inside a dark fan).
+    """
+    if stats['saturation'] > 0.15 and stats['saturation_std'] > 0.05:
+        return {'skin': 0.7, 'liver': 0.1, 'kidney': 0.1, 'heart': 0.1}
+    if stats['dark_fraction'] > 0.3:
+        if stats['symmetry_diff'] < 0.1 and stats['center_contrast'] > 0.1:
+            return {'mri': 0.7, 'heart': 0.1, 'kidney': 0.1, 'liver': 0.1}
+        return {'heart': 0.34, 'kidney': 0.33, 'liver': 0.33}
+    if 0.8 <= np.exp(stats['log_aspect']) <= 1.5 and stats['symmetry_diff'] < 0.12:
+        return {'chest': 0.55, 'xray': 0.45}
+    return {'xray': 0.6, 'chest': 0.4}
+
+
+def fit_centroids(features_by_type):
+    """Nearest-centroid model from {scan_type: [feature vectors]}.
+
+    Features are standardized with the pooled per-feature std; each class keeps
+    its centroid and the 99th percentile distance of its own samples, beyond
+    which an image is treated as out of distribution.
+    """
+    all_features = np.concatenate([np.asarray(v, np.float64) for v in features_by_type.values()])
+    scale = all_features.std(axis=0)
+    scale[scale < 1e-6] = 1.0
+    classes = {}
+    for scan_type, vectors in features_by_type.items():
+        vectors = np.asarray(vectors, np.float64) / scale
+        centroid = vectors.mean(axis=0)
+        distances = np.linalg.norm(vectors - centroid, axis=1)
+        classes[scan_type] = {
+            'centroid': centroid.round(6).tolist(),
+            'radius': round(float(np.percentile(distances, 99)), 4),
+            'samples': len(vectors),
+        }
+    return {
+        'version': ROUTER_MODEL_VERSION,
+        'thumb_size': ROUTER_THUMB_SIZE,
+        'scale': scale.round(6).tolist(),
+        'classes': classes,
+    }
+
+
+class ScanTypeRouter:
+    """Picks the scan type of an image for scan_type=auto.
+
+    Uses a nearest-centroid model over router_features() when one is loaded
+    (see train_router.py) and falls back to heuristic_route() otherwise, or
+    when the image is farther from every centroid than `ood_factor` times
+    that class's training radius.
+    """
+
+    def __init__(self, model_path=None, ood_factor=1.5):
+        self.model_path = model_path
+        self.ood_factor = ood_factor
+        self.model = None
+        if model_path and os.path.exists(model_path):
+            self.load(model_path)
+
+    def load(self, path):
+        with open(path) as model_file:
+            model = json.load(model_file)
+        if model.get('version') != ROUTER_MODEL_VERSION or model.get('thumb_size') != ROUTER_THUMB_SIZE:
+            raise ValueError(f"{path}: incompatible router model, retrain with train_router.py")
+        self.model = model
+        self._labels = list(model['classes'])
+        self._scale = np.array(model['scale'], np.float64)
+        self._centroids = np.array([c['centroid'] for c in model['classes'].values()], np.float64)
+        self._radii = np.array([c['radius'] for c in model['classes'].values()], np.float64)
+
+    def distances(self, vector):
+        """Standardized distance from a feature vector to every class centroid"""
+        return np.linalg.norm(vector / self._scale - self._centroids, axis=1)
+
+    def nearest(self, vector):
+        return self._labels[int(self.distances(vector).argmin())]
+
+    @property
+    def method(self):
+        return 'centroids' if self.model is not None else 'heuristic'
+
+    def route(self, image):
+        """{'scan_type', 'confidence', 'method', 'scores'} for a BGR image"""
+        vector, stats = router_features(image)
+        method = 'heuristic'
+        probabilities = None
+        if self.model is not None:
+            distances = self.distances(vector)
+            nearest = int(distances.argmin())
+            if distances[nearest] <= self.ood_factor * max(self._radii[nearest], 1e-6):
+                weights = np.exp(-(distances - distances[nearest]))
+                probabilities = dict(zip(self._labels, weights / weights.sum()))
+                method = 'centroids'
+            else:
+                method = 'heuristic_ood'
+        if probabilities is None:
+            probabilities = heuristic_route(stats)
+
+        ranked = sorted(probabilities.items(), key=lambda item: item[1], reverse=True)
+        return {
+            'scan_type': ranked[0][0],
+            'confidence': round(float(ranked[0][1]), 3),
+            'method': method,
+            'scores': {scan_type: round(float(p), 3) for scan_type, p in ranked[:3]},
+        }
+
+    def stats(self):
+        return {
+            'method': self.method,
+            'model_path': self.model_path,
+            'classes': {k: v['samples'] for k, v in self.model['classes'].items()} if self.model else None,
+        }
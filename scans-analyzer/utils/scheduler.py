@@ -0,0 +1,197 @@
+# utils/scheduler.py
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Highest priority first: a free slot always goes to the first class with a waiter under its limit
+PRIORITY_CLASSES = ('urgent', 'normal', 'bulk')
+DEFAULT_PRIORITY = 'normal'
+
+
+class SchedulerBusy(Exception):
+    """Raised when a priority class's queue is full or a request waited past max_wait_s"""
+
+    def __init__(self, message, priority, retry_after):
+        super().__init__(message)
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+def parse_class_map(raw, convert=str):
+    """Parse 'chest:urgent,skin:bulk' (or 'bulk:2') into a dict, dropping malformed entries"""
+    mapping = {}
+    for entry in filter(None, (part.strip() for part in raw.split(','))):
+        key, _, value = entry.partition(':')
+        try:
+            mapping[key.strip()] = convert(value.strip())
+        except ValueError:
+            print(f"⚠️ Ignoring scheduler setting '{entry}'")
+    return mapping
+
+
+class PriorityScheduler:
+    """Admission control and priority ordering for analyses.
+
+    `slots` analyses run at once in total and each class at most
+    `concurrency[class]` of them. Waiting requests queue per class; when a slot
+    frees up it goes to the highest class with a waiter that is under its own
+    limit, FIFO within a class. A request is rejected with SchedulerBusy when
+    its class already has `queue_limits[class]` waiters, or when it waited
+    longer than `max_wait_s`. slots=0 disables scheduling (no waits, no limits).
+    """
+
+    def __init__(self, slots, concurrency, queue_limits, scan_type_classes=None, max_wait_s=30,
+                 on_wait=None, on_state=None, on_reject=None):
+        self.slots = slots
+        self.concurrency = {name: concurrency.get(name, slots) for name in PRIORITY_CLASSES}
+        self.queue_limits = {name: queue_limits.get(name, 0) for name in PRIORITY_CLASSES}
+        self.scan_type_classes = {}
+        for scan_type, name in (scan_type_classes or {}).items():
+            if name in PRIORITY_CLASSES:
+                self.scan_type_classes[scan_type] = name
+            else:
+                print(f"⚠️ Unknown priority class '{name}' for {scan_type}, using {DEFAULT_PRIORITY}")
+        self.max_wait_s = max_wait_s
+        self.on_wait = on_wait  # callback(priority, seconds) for metrics
+        self.on_state = on_state  # callback(priority, queued, running) for metrics
+        self.on_reject = on_reject  # callback(priority, reason) for metrics
+
+        self._lock = threading.Lock()
+        self._waiting = {name: deque() for name in PRIORITY_CLASSES}
+        self._running = {name: 0 for name in PRIORITY_CLASSES}
+        self._counters = {name: {'admitted': 0, 'rejected': 0, 'timed_out': 0} for name in PRIORITY_CLASSES}
+        self._waits = {name: deque(maxlen=512) for name in PRIORITY_CLASSES}  # recent waits (s)
+        self._service_s = {name: None for name in PRIORITY_CLASSES}  # EWMA of time holding a slot
+
+    @property
+    def enabled(self):
+        return self.slots > 0
+
+    def priority_for(self, scan_type, requested=None):
+        """Class of a request: an explicit (header) class if valid, else the scan type's"""
+        if requested in PRIORITY_CLASSES:
+            return requested
+        return self.scan_type_classes.get(scan_type, DEFAULT_PRIORITY)
+
+    def queued(self, priority):
+        """Requests of a class waiting for a slot"""
+        with self._lock:
+            return len(self._waiting[priority])
+
+    def queued_for(self, scan_type):
+        """Requests of one scan type waiting for a slot, whatever their class"""
+        with self._lock:
+            return sum(ticket['scan_type'] == scan_type for waiting in self._waiting.values() for ticket in waiting)
+
+    def _dispatch(self):
+        """Grant free slots to waiters, highest class first (caller holds the lock)"""
+        while sum(self._running.values()) < self.slots:
+            for name in PRIORITY_CLASSES:
+                if self._waiting[name] and self._running[name] < self.concurrency[name]:
+                    ticket = self._waiting[name].popleft()
+                    ticket['granted'] = True
+                    self._running[name] += 1
+                    ticket['event'].set()
+                    self._report(name)
+                    break
+            else:
+                return
+
+    def _report(self, priority):
+        if self.on_state:
+            self.on_state(priority, len(self._waiting[priority]), self._running[priority])
+
+    def _retry_after(self, priority):
+        """Seconds until the class's queue has likely drained by one request (at least 1)"""
+        service_s = self._service_s[priority] or 1.0
+        ahead = len(self._waiting[priority]) + 1
+        return max(1, math.ceil(ahead * service_s / max(1, self.concurrency[priority])))
+
+    def _reject(self, priority, reason, message):
+        self._counters[priority]['timed_out' if reason == 'timeout' else 'rejected'] += 1
+        retry_after = self._retry_after(priority)
+        if self.on_reject:
+            self.on_reject(priority, reason)
+        return SchedulerBusy(message, priority, retry_after)
+
+    @contextmanager
+    def slot(self, priority, admit=True, scan_type=None):
+        """Hold one analysis slot of `priority` for the duration of the block.
+
+        Yields the queue wait in seconds. With admit=False the caller is
+        never rejected (batch items and queued jobs, already bounded by their
+        own pools): it waits for a slot without a queue limit or deadline.
+        `scan_type` is only recorded, for queued_for().
+        """
+        if not self.enabled:
+            yield 0.0
+            return
+
+        ticket = {'event': threading.Event(), 'granted': False, 'scan_type': scan_type}
+        started = time.perf_counter()
+        with self._lock:
+            if admit and len(self._waiting[priority]) >= self.queue_limits[priority] and (
+                self._waiting[priority] or sum(self._running.values()) >= self.slots
+                or self._running[priority] >= self.concurrency[priority]
+            ):
+                raise self._reject(priority, 'queue_full',
+                                   f"Too many {priority} requests waiting ({len(self._waiting[priority])})")
+            self._waiting[priority].append(ticket)
+            self._dispatch()
+            self._report(priority)
+
+        if not ticket['event'].wait(self.max_wait_s if admit and self.max_wait_s else None):
+            with self._lock:
+                if not ticket['granted']:
+                    self._waiting[priority].remove(ticket)
+                    self._report(priority)
+                    raise self._reject(priority, 'timeout',
+                                       f"{priority} request waited over {self.max_wait_s:g} s for a slot")
+
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._counters[priority]['admitted'] += 1
+            self._waits[priority].append(waited)
+        if self.on_wait:
+            self.on_wait(priority, waited)
+
+        held_from = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            held = time.perf_counter() - held_from
+            with self._lock:
+                self._running[priority] -= 1
+                previous = self._service_s[priority]
+                self._service_s[priority] = held if previous is None else 0.8 * previous + 0.2 * held
+                self._report(priority)
+                self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            classes = {}
+            for name in PRIORITY_CLASSES:
+                waits = list(self._waits[name])
+                classes[name] = {
+                    'running': self._running[name],
+                    'queued': len(self._waiting[name]),
+                    'concurrency': self.concurrency[name],
+                    'queue_limit': self.queue_limits[name],
+                    **self._counters[name],
+                    'queue_wait_ms': {
+                        'mean': round(float(np.mean(waits)) * 1000, 1),
+                        'p95': round(float(np.percentile(waits, 95)) * 1000, 1),
+                    } if waits else None,
+                }
+            return {
+                'enabled': self.enabled,
+                'slots': self.slots,
+                'max_wait_s': self.max_wait_s,
+                'scan_type_classes': self.scan_type_classes,
+                'classes': classes,
+            }
@@ -0,0 +1,153 @@
+# utils/tiers.py
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Last rung of every ladder: computer vision only, no model call
+TIER_CV = 'cv'
+
+
+def tier_ladder(spec):
+    """Tier names from most to least expensive, e.g. ['large', 'base', 'cv']"""
+    return [spec.get('tier', 'base')] + [name for name, _ in spec.get('lighter_tiers', [])] + [TIER_CV]
+
+
+def tier_key(scan_type, tier, specs):
+    """Model manager / batcher key of a model tier: the scan type itself for the
+    primary tier (so cache versions and backend settings keep their keys), else 'skin@base'"""
+    if tier is None or tier == specs[scan_type].get('tier', 'base'):
+        return scan_type
+    return f"{scan_type}@{tier}"
+
+
+def expand_tier_specs(specs):
+    """MODEL_SPECS plus one entry per lighter tier, keyed by tier_key()"""
+    expanded = dict(specs)
+    for scan_type, spec in specs.items():
+        for tier, candidates in spec.get('lighter_tiers', []):
+            expanded[tier_key(scan_type, tier, specs)] = {
+                'candidates': candidates,
+                'description': f"{spec['description']} ({tier} tier)",
+                'fallback': spec['fallback'],
+            }
+    return expanded
+
+
+class TierController:
+    """Load-adaptive tier level per scan type (0 = most expensive tier).
+
+    Every analysis calls begin() / end(). Its queue depth is the analyses in
+    flight plus `backlog(scan_type)`, the requests still waiting upstream (an
+    admission scheduler caps the in-flight count, so the wait shows up there).
+    The level steps down one tier when the depth reaches `queue_high` or the p95
+    latency of the last `window_s` reaches `p95_high_ms`, and steps back up once
+    both stay under `queue_low` / `p95_low_ms` for `cooldown_s`. Latency
+    samples are dropped on every change so each tier is judged on its own requests.
+    """
+
+    def __init__(self, ladders, queue_high=32, queue_low=8, p95_high_ms=5000, p95_low_ms=1500,
+                 window_s=30, cooldown_s=30, dwell_s=2, min_samples=5, enabled=True, on_change=None,
+                 backlog=None):
+        self.ladders = ladders  # scan_type -> tier names
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.p95_high_ms = p95_high_ms
+        self.p95_low_ms = p95_low_ms
+        self.window_s = window_s
+        self.cooldown_s = cooldown_s
+        self.dwell_s = dwell_s
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self.on_change = on_change
+        self.backlog = backlog  # callable(scan_type) -> requests waiting to start
+
+        self._lock = threading.Lock()
+        self._state = {
+            scan_type: {'level': 0, 'changed_at': 0.0, 'in_flight': 0, 'samples': deque(), 'changes': 0}
+            for scan_type in ladders
+        }
+
+    def _p95_ms(self, state, now):
+        samples = state['samples']
+        while samples and now - samples[0][0] > self.window_s:
+            samples.popleft()
+        if len(samples) < self.min_samples:
+            return None
+        return float(np.percentile([ms for _, ms in samples], 95))
+
+    def begin(self, scan_type):
+        """Count an analysis as in flight and return the tier it should use"""
+        state = self._state.get(scan_type)
+        if state is None:
+            return TIER_CV
+        with self._lock:
+            state['in_flight'] += 1
+            if self.enabled:
+                self._adjust(scan_type, state, time.time())
+            return self.ladders[scan_type][state['level']]
+
+    def end(self, scan_type, seconds=None):
+        """Analysis finished; `seconds` is recorded when it did the full work (no cache hit)"""
+        state = self._state.get(scan_type)
+        if state is None:
+            return
+        with self._lock:
+            state['in_flight'] -= 1
+            if seconds is not None:
+                state['samples'].append((time.time(), seconds * 1000))
+
+    def _depth(self, scan_type, state):
+        return state['in_flight'] + (self.backlog(scan_type) if self.backlog else 0)
+
+    def _adjust(self, scan_type, state, now):
+        p95 = self._p95_ms(state, now)
+        since_change = now - state['changed_at']
+        depth = self._depth(scan_type, state)
+        overloaded = depth >= self.queue_high or (p95 is not None and p95 >= self.p95_high_ms)
+        calm = depth <= self.queue_low and (p95 is None or p95 <= self.p95_low_ms)
+
+        level = state['level']
+        if overloaded and level < len(self.ladders[scan_type]) - 1 and since_change >= self.dwell_s:
+            level += 1
+        elif calm and level > 0 and since_change >= self.cooldown_s:
+            level -= 1
+        if level == state['level']:
+            return
+
+        tiers = self.ladders[scan_type]
+        direction = 'down' if level > state['level'] else 'up'
+        print(f"{'⬇️' if direction == 'down' else '⬆️'} {scan_type} tier {tiers[state['level']]} -> {tiers[level]} "
+              f"(queue depth {depth}, p95 {p95 if p95 is None else round(p95)} ms)")
+        state.update(level=level, changed_at=now, changes=state['changes'] + 1)
+        state['samples'].clear()
+        if self.on_change:
+            self.on_change(scan_type, level, direction)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            scan_types = {}
+            for scan_type, state in self._state.items():
+                p95 = self._p95_ms(state, now)
+                scan_types[scan_type] = {
+                    'tier': self.ladders[scan_type][state['level']],
+                    'ladder': self.ladders[scan_type],
+                    'in_flight': state['in_flight'],
+                    'queue_depth': self._depth(scan_type, state),
+                    'p95_ms': round(p95, 1) if p95 is not None else None,
+                    'changes': state['changes'],
+                }
+            return {
+                'enabled': self.enabled,
+                'thresholds': {
+                    'queue_high': self.queue_high,
+                    'queue_low': self.queue_low,
+                    'p95_high_ms': self.p95_high_ms,
+                    'p95_low_ms': self.p95_low_ms,
+                    'cooldown_s': self.cooldown_s,
+                },
+                'scan_types': scan_types,
+            }
@@ -0,0 +1,88 @@
+# utils/tiling.py
+
+import numpy as np
+
+# Scan types whose analyzers are meaningful on a crop of the image
+TILED_SCAN_TYPES = ('skin', 'xray')
+
+
+def _starts(length, size, stride):
+    if length <= size:
+        return [0]
+    starts = list(range(0, length - size, stride))
+    return starts + [length - size]
+
+
+def tile_grid(height, width, tile_size=512, overlap=0.25, max_tiles=16):
+    """Overlapping (y0, y1, x0, x1) tiles covering the image.
+
+    Tiles grow beyond `tile_size` when more than `max_tiles` would be needed,
+    so latency stays bounded on very large images.
+    """
+    size = max(1, tile_size)
+    while True:
+        stride = max(1, int(size * (1 - overlap)))
+        ys = _starts(height, size, stride)
+        xs = _starts(width, size, stride)
+        if len(ys) * len(xs) <= max_tiles or size >= max(height, width):
+            break
+        size = int(size * 1.25) + 1
+    return [
+        (y, min(y + size, height), x, min(x + size, width))
+        for y in ys
+        for x in xs
+    ]
+
+
+def tile_score(result):
+    """Abnormality score of one tile: its strongest confidence when abnormal"""
+    if result.get('status') != 'Abnormal' or not result.get('confidence_scores'):
+        return 0.0
+    return float(max(result['confidence_scores'].values()))
+
+
+def aggregate_tiles(tiles, shape, cells=32):
+    """Merge per-tile analyzer results into a heat map and per-finding summary.
+
+    `tiles` is a list of ((y0, y1, x0, x1), result). The heat map has at most
+    `cells` cells on the long side; overlapping tiles are averaged.
+    """
+    height, width = shape[:2]
+    scale = cells / max(height, width)
+    rows, cols = max(1, round(height * scale)), max(1, round(width * scale))
+    total = np.zeros((rows, cols), np.float32)
+    coverage = np.zeros((rows, cols), np.float32)
+
+    findings = {}
+    summary = []
+    for (y0, y1, x0, x1), result in tiles:
+        score = tile_score(result)
+        r0, r1 = int(y0 * scale), max(int(y0 * scale) + 1, round(y1 * scale))
+        c0, c1 = int(x0 * scale), max(int(x0 * scale) + 1, round(x1 * scale))
+        total[r0:r1, c0:c1] += score
+        coverage[r0:r1, c0:c1] += 1
+
+        labels = list(result.get('confidence_scores', {}))
+        for label, confidence in result.get('confidence_scores', {}).items():
+            entry = findings.setdefault(label, {'tiles': 0, 'max_confidence': 0.0})
+            entry['tiles'] += 1
+            entry['max_confidence'] = round(max(entry['max_confidence'], float(confidence)), 3)
+        summary.append({
+            'box': [x0, y0, x1, y1],
+            'score': round(score, 3),
+            'status': result.get('status'),
+            'findings': labels,
+        })
+
+    heatmap = np.divide(total, coverage, out=np.zeros_like(total), where=coverage > 0)
+    return {
+        'tiles': summary,
+        'findings': findings,
+        'heatmap': {
+            'rows': rows,
+            'cols': cols,
+            'cell_px': round(1 / scale, 1),
+            'values': np.round(heatmap, 3).tolist(),
+        },
+        'max_score': round(float(heatmap.max()), 3) if tiles else 0.0,
+    }
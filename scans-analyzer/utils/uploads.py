@@ -0,0 +1,95 @@
+# utils/uploads.py
+
+import io
+import mmap
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from flask import Request
+
+
+class UploadSpool(tempfile.SpooledTemporaryFile):
+    """SpooledTemporaryFile that records its rollover to disk itself: the
+    standard class only keeps it in a private attribute"""
+
+    on_disk = False
+
+    def rollover(self):
+        super().rollover()
+        self.on_disk = True
+
+
+class SpooledRequest(Request):
+    """Multipart file parts stay in memory up to `spool_max_size` bytes and roll
+    over to a temp file beyond it (werkzeug's own threshold is fixed at 500 kB)"""
+
+    spool_max_size = 1024 * 1024
+    spool_dir = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(max_size=self.spool_max_size, mode='rb+', dir=self.spool_dir)
+
+
+def spool_stream(stream, max_size, dir=None):
+    """Copy a stream into an UploadSpool the caller owns (rewound)"""
+    spool = UploadSpool(max_size=max_size, mode='rb+', dir=dir)
+    shutil.copyfileobj(stream, spool)
+    spool.seek(0)
+    return spool
+
+
+def in_memory_spool(source):
+    """True for an UploadSpool that has not rolled over: fileno() would spill it to disk"""
+    return isinstance(source, UploadSpool) and not source.on_disk
+
+
+def upload_storage(source):
+    """(where the upload is held, size in bytes): 'bytes', 'memory' or 'disk'"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return 'bytes', len(source)
+    position = source.tell()
+    source.seek(0, io.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    if isinstance(source, UploadSpool):
+        return ('disk' if source.on_disk else 'memory'), size
+    try:
+        source.fileno()
+        return 'disk', size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return 'memory', size
+
+
+@contextmanager
+def upload_view(source):
+    """Bytes-like view of an upload for the decoders.
+
+    Bytes pass through and uploads spooled to disk are memory-mapped, so
+    neither is copied into a new Python object; in-memory spools (below the
+    spool threshold) are read out.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield source
+        return
+    try:
+        fileno = None if in_memory_spool(source) else source.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+    if fileno is None:
+        source.seek(0)
+        yield source.read()
+        return
+
+    size = upload_storage(source)[1]
+    if not size:
+        yield b''
+        return
+    mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    try:
+        yield mapped
+    finally:
+        try:
+            mapped.close()
+        except BufferError:
+            pass  # a decoder still holds a view; the map is released with it
@@ -0,0 +1,120 @@
+# utils/video.py
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from utils.uploads import upload_storage
+
+# Regions of the 224x224 heart view read by analyze_heart (y0, y1, x0, x1)
+HEART_REGION = (80, 144, 80, 144)
+WALL_REGION = (100, 124, 100, 124)
+
+# ISO-BMFF major brands of video files; HEIC / AVIF stills share the 'ftyp' box
+# under their own brands (heic, mif1, avif, ...)
+VIDEO_BRAND_PREFIXES = (b'iso', b'mp4', b'mp7', b'avc', b'qt  ', b'M4V', b'3gp', b'3g2', b'dash', b'mmp4', b'f4v')
+
+
+def is_video(source):
+    """True for MP4 / MOV, AVI and Matroska / WebM bytes or a seekable stream at their start"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:12])
+    else:
+        position = source.tell()
+        head = source.read(12)
+        source.seek(position)
+    return (
+        (head[4:8] == b'ftyp' and head[8:12].startswith(VIDEO_BRAND_PREFIXES))
+        or (head[:4] == b'RIFF' and head[8:12] == b'AVI ')
+        or head[:4] == b'\x1a\x45\xdf\xa3'
+    )
+
+
+@contextmanager
+def video_path(source):
+    """Filesystem path for cv2.VideoCapture.
+
+    An upload spooled to disk is opened in place through /proc/self/fd; bytes
+    and in-memory spools are streamed into a temp file first.
+    """
+    if not isinstance(source, (bytes, bytearray, memoryview)) and upload_storage(source)[0] == 'disk':
+        path = f"/proc/self/fd/{source.fileno()}"
+        if os.path.exists(path):
+            yield path
+            return
+
+    with tempfile.NamedTemporaryFile(suffix='.video') as copy:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            copy.write(source)
+        else:
+            source.seek(0)
+            shutil.copyfileobj(source, copy)
+        copy.flush()
+        yield copy.name
+
+
+@contextmanager
+def open_video_frames(source, stride=1, max_frames=None):
+    """Decode a clip lazily, one frame at a time.
+
+    Yields (info, frames) where frames iterates (frame index, uint8 gray frame)
+    for every `stride`-th frame. Skipped frames are only grabbed, never
+    converted, and at most one decoded frame is alive at a time.
+    """
+    with video_path(source) as path:
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise ValueError('Unreadable video clip')
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            fourcc = int(capture.get(cv2.CAP_PROP_FOURCC))
+            info = {
+                'format': 'video',
+                'codec': fourcc.to_bytes(4, 'little').decode('ascii', 'replace').strip('\x00') or None,
+                'fps': round(fps, 3) if fps > 0 else None,
+                'frames': frame_count if frame_count > 0 else None,
+                'size': [int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))],
+            }
+
+            def iterate():
+                index = sampled = 0
+                while max_frames is None or sampled < max_frames:
+                    if index % stride:
+                        if not capture.grab():
+                            return
+                    else:
+                        ok, frame = capture.read()
+                        if not ok:
+                            return
+                        yield index, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                        sampled += 1
+                    index += 1
+
+            yield info, iterate()
+        finally:
+            capture.release()
+
+
+def heart_frame_metrics(stack, threshold=0.4):
+    """analyze_heart's metrics for every frame of a (N, 224, 224) uint8 stack.
+
+    heart_area counts pixels brighter than `threshold` (in [0, 1] units) in
+    HEART_REGION; wall_intensity is the mean of WALL_REGION. Both are
+    reductions over the frame axis on the uint8 pixels, no float copy.
+    """
+    count = len(stack)
+    # Largest pixel value v with v / 255 <= threshold, so `> cut` matches the float comparison exactly
+    cut = int(np.count_nonzero(np.arange(256) / 255.0 <= threshold)) - 1
+    y0, y1, x0, x1 = HEART_REGION
+    heart = stack[:, y0:y1, x0:x1]
+    y0, y1, x0, x1 = WALL_REGION
+    wall = stack[:, y0:y1, x0:x1]
+    return {
+        'heart_area': np.count_nonzero(heart > cut, axis=(1, 2)),
+        'wall_intensity': wall.reshape(count, -1).sum(axis=1, dtype=np.uint64) / (255.0 * wall[0].size),
+    }